@@ -0,0 +1,404 @@
+"""Load-benchmark the HTTP API and compare it with a stored baseline.
+
+Seeds books, users and borrowings, then drives the real endpoints one
+request at a time: in-process through the Django test client against a
+throwaway database, or with --url against a running local server. In
+that case the dataset is seeded into the database from the settings, so
+point it at a server running on a disposable database.
+
+The circulation statistics are rebuilt after seeding. The catalog cache
+is invalidated before every "book list" and "book detail" request, so
+they measure the database path; "book list cached" measures cache hits.
+With --url the server only sees the invalidation when it shares the
+benchmark's CACHE_BACKEND, otherwise those scenarios hit its cache too.
+
+Records requests per second, p50/p95/p99 latency and, in-process,
+database queries per request. --save writes the results as a JSON
+baseline; --baseline compares with one and exits with status 1 when a
+scenario got slower or issues more queries than before.
+
+    python -m benchmarks.api --save benchmarks/api-baseline.json
+    python -m benchmarks.api --baseline benchmarks/api-baseline.json
+"""
+import argparse
+import itertools
+import json
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+from io import StringIO
+
+from benchmarks.utils import benchmark_database, percentile, setup_django
+
+PASSWORD = "benchmark-password"
+
+# Scenarios run with the catalog cache invalidated before each request
+UNCACHED_SCENARIOS = ("book list", "book detail")
+
+
+def seed(books, users, borrowings, returns):
+    """Create the dataset and return the ids the scenarios need"""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from django.core.management import call_command
+
+    from books_service.models import Book, Cover
+    from borrowings_service.models import Borrowing
+
+    rng = random.Random(0)
+    password = make_password(PASSWORD)
+    user_model = get_user_model()
+    prefix = f"bench-{time.time_ns()}"
+    created_users = user_model.objects.bulk_create(
+        user_model(email=f"{prefix}-{index}@mail.com", password=password)
+        for index in range(users)
+    )
+    staff = user_model.objects.create_superuser(
+        email=f"{prefix}-staff@mail.com", password=PASSWORD
+    )
+    created_books = Book.objects.bulk_create(
+        (
+            Book(
+                title=f"Book {index}",
+                author=f"Author {index % 1000}",
+                cover=Cover.HARD,
+                inventory=1000,
+                total_copies=1000,
+                daily_fee="1.00",
+            )
+            for index in range(books)
+        ),
+        batch_size=2000,
+    )
+    user = created_users[0]
+    today = date.today()
+    history = [
+        Borrowing(
+            borrow_date=today - timedelta(days=30),
+            expected_return_date=today - timedelta(days=20),
+            actual_return_date=(
+                today - timedelta(days=25) if index % 2 else None
+            ),
+            book=rng.choice(created_books),
+            user=rng.choice(created_users),
+        )
+        for index in range(borrowings)
+    ]
+    to_return = [
+        Borrowing(
+            borrow_date=today,
+            expected_return_date=today + timedelta(days=7),
+            book=rng.choice(created_books),
+            user=user,
+        )
+        for _ in range(returns)
+    ]
+    Borrowing.objects.bulk_create(history, batch_size=2000)
+    Borrowing.objects.bulk_create(to_return, batch_size=2000)
+    call_command("rebuild_stats", stdout=StringIO())
+
+    return {
+        "user": user,
+        "staff": staff,
+        "book_ids": [book.id for book in created_books],
+        "return_ids": [borrowing.id for borrowing in to_return],
+    }
+
+
+def build_scenarios(data):
+    """Return (name, role, method, path factory, body factory) tuples"""
+    book_ids = itertools.cycle(data["book_ids"])
+    return_ids = iter(data["return_ids"])
+    user_id = data["user"].id
+    today = date.today()
+
+    def get(path):
+        return lambda: path, lambda: None
+
+    return [
+        ("book list", None, "GET", *get("/books/")),
+        ("book list cached", None, "GET", *get("/books/")),
+        (
+            "book detail",
+            None,
+            "GET",
+            lambda: f"/books/{next(book_ids)}/",
+            lambda: None,
+        ),
+        ("borrowing list", "user", "GET", *get("/borrowings/")),
+        (
+            "borrowing list active",
+            "user",
+            "GET",
+            *get("/borrowings/?is_active=active"),
+        ),
+        (
+            "borrowing list returned",
+            "user",
+            "GET",
+            *get("/borrowings/?is_active=returned"),
+        ),
+        ("staff borrowing list", "staff", "GET", *get("/borrowings/")),
+        ("staff book stats", "staff", "GET", *get("/stats/books/")),
+        (
+            "staff borrowing list by user",
+            "staff",
+            "GET",
+            *get(f"/borrowings/?user_id={user_id}&is_active=active"),
+        ),
+        (
+            "checkout",
+            "user",
+            "POST",
+            lambda: "/borrowings/",
+            lambda: {
+                "book": next(book_ids),
+                "expected_return_date": str(today + timedelta(days=7)),
+            },
+        ),
+        (
+            "return",
+            "user",
+            "POST",
+            lambda: f"/borrowings/{next(return_ids)}/return/",
+            lambda: {"actual_return_date": str(today)},
+        ),
+        (
+            "token obtain",
+            None,
+            "POST",
+            lambda: "/users/token/",
+            lambda: {"email": data["user"].email, "password": PASSWORD},
+        ),
+        (
+            "token refresh",
+            None,
+            "POST",
+            lambda: "/users/token/refresh/",
+            lambda: {"refresh": data["refresh"]},
+        ),
+    ]
+
+
+class InProcessTransport:
+    counts_queries = True
+
+    def __init__(self):
+        from django.test import Client
+
+        self.client = Client()
+
+    def request(self, method, path, body, token):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        headers = {"HTTP_AUTHORIZE": f"Bearer {token}"} if token else {}
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.generic(
+                method,
+                path,
+                json.dumps(body) if body is not None else "",
+                content_type="application/json",
+                **headers,
+            )
+
+        return response.status_code, len(context.captured_queries)
+
+
+class HttpTransport:
+    counts_queries = False
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path, body, token):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorize"] = f"Bearer {token}"
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(body).encode() if body is not None else None,
+            headers=headers,
+            method=method,
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status, None
+        except urllib.error.HTTPError as error:
+            return error.code, None
+
+
+def run_scenario(transport, scenario, tokens, requests, warmup):
+    from books_service.cache import bump_catalog_version
+
+    name, role, method, make_path, make_body = scenario
+    durations = []
+    queries = []
+
+    start = time.perf_counter()
+    for index in range(warmup + requests):
+        path, body = make_path(), make_body()
+        if name in UNCACHED_SCENARIOS:
+            bump_catalog_version()
+        request_start = time.perf_counter()
+        status, query_count = transport.request(
+            method, path, body, tokens.get(role)
+        )
+        if status >= 400:
+            raise SystemExit(f"{name}: {method} {path} returned {status}")
+        if index < warmup:
+            start = time.perf_counter()
+            continue
+        durations.append((time.perf_counter() - request_start) * 1000)
+        queries.append(query_count)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(durations, 0.50), 3),
+        "p95_ms": round(percentile(durations, 0.95), 3),
+        "p99_ms": round(percentile(durations, 0.99), 3),
+        "queries_per_request": (
+            round(sum(queries) / len(queries), 2)
+            if transport.counts_queries
+            else None
+        ),
+    }
+
+
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+
+        if result["requests_per_second"] < (
+            previous["requests_per_second"] * (1 - tolerance)
+        ):
+            regressions.append(
+                f"{name}: {result['requests_per_second']} req/s, "
+                f"baseline {previous['requests_per_second']}"
+            )
+        if result["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {result['p95_ms']} ms, "
+                f"baseline {previous['p95_ms']}"
+            )
+        if (
+            result["queries_per_request"] is not None
+            and previous["queries_per_request"] is not None
+            and result["queries_per_request"]
+            > previous["queries_per_request"]
+        ):
+            regressions.append(
+                f"{name}: {result['queries_per_request']} queries, "
+                f"baseline {previous['queries_per_request']}"
+            )
+
+    return regressions
+
+
+def run(args, transport):
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    data = seed(
+        args.books,
+        args.users,
+        args.borrowings,
+        returns=args.requests + args.warmup,
+    )
+    refresh = RefreshToken.for_user(data["user"])
+    data["refresh"] = str(refresh)
+    tokens = {
+        "user": str(refresh.access_token),
+        "staff": str(RefreshToken.for_user(data["staff"]).access_token),
+    }
+
+    results = {}
+    for scenario in build_scenarios(data):
+        results[scenario[0]] = run_scenario(
+            transport, scenario, tokens, args.requests, args.warmup
+        )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--borrowings", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument(
+        "--url", help="Base URL of a running server, in-process by default"
+    )
+    parser.add_argument("--save", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Compare with this results file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed relative slowdown before flagging a regression",
+    )
+    args = parser.parse_args()
+
+    setup_django()
+
+    if args.url:
+        results = run(args, HttpTransport(args.url))
+    else:
+        from django.test.utils import override_settings
+
+        with benchmark_database(), override_settings(ALLOWED_HOSTS=["*"]):
+            results = run(args, InProcessTransport())
+
+    print(
+        f"{'scenario':>30} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'p99 ms':>9} {'queries':>8}"
+    )
+    for name, result in results.items():
+        queries = result["queries_per_request"]
+        print(
+            f"{name:>30} {result['requests_per_second']:>9.1f} "
+            f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+            f"{result['p99_ms']:>9.2f} "
+            f"{'-' if queries is None else queries:>8}"
+        )
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(
+                {
+                    "dataset": {
+                        "books": args.books,
+                        "users": args.users,
+                        "borrowings": args.borrowings,
+                        "requests": args.requests,
+                    },
+                    "results": results,
+                },
+                file,
+                indent=2,
+            )
+            file.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
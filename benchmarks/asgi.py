@@ -0,0 +1,155 @@
+"""Compare the sync DRF read endpoints with their native async versions.
+
+Fires the same number of concurrent requests at each endpoint pair:
+the sync views through the WSGI handler from a pool of worker threads,
+as a threaded WSGI server would, and the async views through the ASGI
+handler from a single event loop. Prints requests per second and
+per-request p99 latency. The catalog and user caches are disabled so
+both paths do the same database work.
+
+    python -m benchmarks.asgi --concurrency 100 --requests 2000
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.utils import (
+    benchmark_database,
+    percentile,
+    setup_django,
+)
+
+BOOKS = 500
+BORROWINGS = 200
+
+ENDPOINTS = (
+    ("book list", "/books/", "/async/books/"),
+    ("book detail", "/books/1/", "/async/books/1/"),
+    ("borrowing list", "/borrowings/", "/async/borrowings/"),
+    ("borrowing detail", "/borrowings/1/", "/async/borrowings/1/"),
+    ("current user", "/users/me/", "/async/users/me/"),
+)
+
+
+def seed():
+    from django.contrib.auth import get_user_model
+
+    from books_service.models import Book, Cover
+    from borrowings_service.models import Borrowing
+
+    user = get_user_model().objects.create_user(
+        email="benchmark@mail.com", password="benchmark"
+    )
+    books = Book.objects.bulk_create(
+        Book(
+            title=f"Book {index}",
+            author=f"Author {index}",
+            cover=Cover.HARD,
+            inventory=BORROWINGS,
+            total_copies=BORROWINGS,
+            daily_fee="1.00",
+        )
+        for index in range(BOOKS)
+    )
+    Borrowing.objects.bulk_create(
+        Borrowing(
+            borrow_date="2023-01-03",
+            expected_return_date="2023-01-08",
+            book=books[index % BOOKS],
+            user=user,
+        )
+        for index in range(BORROWINGS)
+    )
+
+    return user
+
+
+def run_sync(path, headers, requests, concurrency):
+    from django.db import connection
+    from django.test import Client
+
+    def call(_):
+        start = time.perf_counter()
+        response = Client().get(path, **headers)
+        assert response.status_code == 200, response.content
+        connection.close()
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        durations = list(executor.map(call, range(requests)))
+
+    return time.perf_counter() - start, durations
+
+
+def run_async(path, headers, requests, concurrency):
+    from django.test import AsyncClient
+
+    async def call(client, semaphore):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path, **headers)
+            assert response.status_code == 200, response.content
+            return (time.perf_counter() - start) * 1000
+
+    async def run():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(
+            *(call(client, semaphore) for _ in range(requests))
+        )
+
+    start = time.perf_counter()
+    durations = asyncio.run(run())
+
+    return time.perf_counter() - start, durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.test.utils import override_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    print(
+        f"{'endpoint':>18} {'sync req/s':>11} {'sync p99 ms':>12} "
+        f"{'async req/s':>12} {'async p99 ms':>13}"
+    )
+    with benchmark_database(), override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+            }
+        },
+        ALLOWED_HOSTS=["*"],
+    ):
+        token = f"Bearer {AccessToken.for_user(seed())}"
+        for name, sync_path, async_path in ENDPOINTS:
+            sync_elapsed, sync_durations = run_sync(
+                sync_path,
+                {"HTTP_AUTHORIZE": token},
+                args.requests,
+                args.concurrency,
+            )
+            async_elapsed, async_durations = run_async(
+                async_path,
+                {"AUTHORIZE": token},
+                args.requests,
+                args.concurrency,
+            )
+            print(
+                f"{name:>18} {args.requests / sync_elapsed:>11.1f} "
+                f"{percentile(sync_durations, 0.99):>12.1f} "
+                f"{args.requests / async_elapsed:>12.1f} "
+                f"{percentile(async_durations, 0.99):>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare full-text book search with a case-insensitive scan.
+
+Grows the catalog to each requested size and times the first result
+page of a selective search, with fewer matches than fit on a page,
+through the FTS5 index and through ``icontains``. The index lookup
+should stay nearly flat while the scan grows with the catalog.
+
+    python -m benchmarks.search --sizes 10000,100000,1000000
+"""
+import argparse
+import random
+
+from benchmarks.utils import (
+    benchmark_database,
+    measure,
+    setup_django,
+    summarize,
+)
+
+WORDS = (
+    "river stone garden winter night shadow letter journey silver "
+    "kingdom forest dream harbor mirror storm autumn island song "
+    "empire whisper lantern meadow glass thunder orchard"
+).split()
+NEEDLE = "zyxlophone"
+NEEDLES = 10
+BATCH_SIZE = 10000
+
+
+def seed_books(start, stop):
+    from books_service.models import Book, Cover
+
+    rng = random.Random(start)
+    for batch_start in range(start, stop, BATCH_SIZE):
+        batch_stop = min(batch_start + BATCH_SIZE, stop)
+        books = [
+            Book(
+                title=" ".join(rng.sample(WORDS, 3)).title(),
+                author=f"{rng.choice(WORDS).title()} {index}",
+                cover=Cover.HARD,
+                inventory=1,
+                total_copies=1,
+                daily_fee="1.00",
+            )
+            for index in range(batch_start, batch_stop)
+        ]
+        if batch_start == 0:
+            for book in books[:NEEDLES]:
+                book.title = f"{book.title} {NEEDLE.title()}"
+        Book.objects.bulk_create(books)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    setup_django()
+
+    from books_service.models import Book
+
+    query = NEEDLE[:5]
+
+    def fts_search():
+        list(Book.objects.search(query)[:args.page_size])
+
+    def icontains_search():
+        list(
+            Book.objects.filter(title__icontains=query)
+            .order_by("id")[:args.page_size]
+        )
+
+    print(f"{'books':>10} {'fts median ms':>15} {'icontains median ms':>20}")
+    with benchmark_database():
+        seeded = 0
+        for size in sizes:
+            seed_books(seeded, size)
+            seeded = size
+            fts = summarize(measure(fts_search, args.repeat))
+            icontains = summarize(measure(icontains_search, args.repeat))
+            print(
+                f"{size:>10} {fts['median_ms']:>15.3f} "
+                f"{icontains['median_ms']:>20.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
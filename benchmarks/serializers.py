@@ -0,0 +1,123 @@
+"""Compare DRF serializers with the values_list() fast path.
+
+Renders the same books and borrowings both ways, from the query to the
+JSON bytes, and prints the median time per 10k rows. The outputs are
+checked to be byte-identical first.
+
+    python -m benchmarks.serializers --rows 10000
+"""
+import argparse
+
+from benchmarks.utils import (
+    benchmark_database,
+    measure,
+    setup_django,
+    summarize,
+)
+
+
+def seed(rows):
+    from django.contrib.auth import get_user_model
+
+    from books_service.models import Book, Cover
+    from borrowings_service.models import Borrowing
+
+    user = get_user_model().objects.create_user(
+        email="benchmark@mail.com",
+        password="benchmark",
+        first_name="Bob",
+        last_name="Smith",
+    )
+    books = Book.objects.bulk_create(
+        (
+            Book(
+                title=f"Book {index}",
+                author=f"Author {index}",
+                cover=Cover.HARD,
+                inventory=3,
+                total_copies=4,
+                daily_fee="1.25",
+            )
+            for index in range(rows)
+        ),
+        batch_size=2000,
+    )
+    Borrowing.objects.bulk_create(
+        (
+            Borrowing(
+                borrow_date="2023-01-03",
+                expected_return_date="2023-01-08",
+                actual_return_date="2023-01-07" if index % 2 else None,
+                book=book,
+                user=user,
+            )
+            for index, book in enumerate(books)
+        ),
+        batch_size=2000,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from rest_framework.renderers import JSONRenderer
+
+    from books_service.models import Book
+    from books_service.serializers import BookSerializer
+    from books_service.views import BookViewSet
+    from borrowings_service.models import Borrowing
+    from borrowings_service.serializers import BorrowingSerializer
+    from borrowings_service.views import BORROWING_VALUES
+
+    cases = (
+        (
+            "books",
+            Book.objects.order_by("id"),
+            BookSerializer,
+            BookViewSet.values_renderer,
+        ),
+        (
+            "borrowings",
+            Borrowing.objects.select_related("book", "user").order_by("id"),
+            BorrowingSerializer,
+            BORROWING_VALUES,
+        ),
+    )
+    renderer = JSONRenderer()
+    per_10k = 10000 / args.rows
+
+    print(
+        f"{'list':>12} {'serializer ms/10k':>18} "
+        f"{'values ms/10k':>14} {'speedup':>8}"
+    )
+    with benchmark_database():
+        seed(args.rows)
+        for name, queryset, serializer_class, values_renderer in cases:
+
+            def serialize():
+                return renderer.render(
+                    serializer_class(queryset.all(), many=True).data
+                )
+
+            def render_values():
+                return renderer.render(
+                    values_renderer.render(values_renderer.values(queryset))
+                )
+
+            assert serialize() == render_values(), f"{name} output differs"
+
+            slow = summarize(measure(serialize, args.repeat))["median_ms"]
+            fast = summarize(measure(render_values, args.repeat))["median_ms"]
+            print(
+                f"{name:>12} {slow * per_10k:>18.1f} "
+                f"{fast * per_10k:>14.1f} {slow / fast:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Compare mixed read/write throughput of the SQLite database profiles.
+
+For each profile in settings.DATABASE_PROFILES a fresh database file is
+migrated and seeded, then worker threads run a mix of catalog reads and
+checkouts through the real serializer, closing connections after every
+operation the way Django does after every request. Prints operations
+per second, p99 latency and how many operations failed with "database
+is locked".
+
+    python -m benchmarks.sqlite --threads 16 --operations 4000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.utils import percentile, setup_django
+
+BOOKS = 1000
+
+
+def use_profile(profile, name):
+    """Point the default database at a new file with the given profile"""
+    from django.conf import settings
+    from django.db import connections
+
+    connections.close_all()
+    del connections["default"]
+    database = connections.settings["default"]
+    database.clear()
+    database.update(
+        connections.configure_settings(
+            {"default": {"NAME": name, **settings.DATABASE_PROFILES[profile]}}
+        )["default"]
+    )
+
+
+def seed():
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    from books_service.models import Book, Cover
+
+    call_command("migrate", verbosity=0)
+    Book.objects.bulk_create(
+        Book(
+            title=f"Book {index}",
+            author=f"Author {index}",
+            cover=Cover.HARD,
+            inventory=1000,
+            total_copies=1000,
+            daily_fee="1.00",
+        )
+        for index in range(BOOKS)
+    )
+
+    return get_user_model().objects.create_user(
+        email="benchmark@mail.com", password="benchmark"
+    )
+
+
+def run(threads, operations, write_ratio, user):
+    from django.db import OperationalError, close_old_connections
+
+    from books_service.models import Book
+    from borrowings_service.serializers import BorrowingCreateSerializer
+
+    def read(rng):
+        list(Book.objects.filter(pk__gte=rng.randint(1, BOOKS))[:20])
+
+    def write(rng):
+        serializer = BorrowingCreateSerializer(
+            data={
+                "book": rng.randint(1, BOOKS),
+                "expected_return_date": "2099-01-01",
+            }
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=user)
+
+    def operation(index):
+        rng = random.Random(index)
+        start = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                write(rng)
+            else:
+                read(rng)
+        except OperationalError as error:
+            if "locked" not in str(error):
+                raise
+            return None
+        finally:
+            close_old_connections()
+
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(operation, range(operations)))
+    elapsed = time.perf_counter() - start
+    durations = [duration for duration in results if duration is not None]
+
+    return {
+        "ops_per_second": len(durations) / elapsed,
+        "p99_ms": percentile(durations, 0.99),
+        "locked": results.count(None),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--operations", type=int, default=4000)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.db import connections
+
+    print(f"{'profile':>10} {'ops/s':>9} {'p99 ms':>9} {'locked':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in settings.DATABASE_PROFILES:
+            use_profile(profile, os.path.join(directory, f"{profile}.db"))
+            user = seed()
+            result = run(
+                args.threads, args.operations, args.write_ratio, user
+            )
+            print(
+                f"{profile:>10} {result['ops_per_second']:>9.1f} "
+                f"{result['p99_ms']:>9.1f} {result['locked']:>7}"
+            )
+        connections.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "library_service.settings")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-of-32-bytes+")
+    django.setup()
+
+
+@contextmanager
+def benchmark_database(alias="default"):
+    """Run the benchmark against a freshly migrated throwaway database"""
+    from django.db import connections
+    from django.test.utils import (
+        setup_test_environment,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    connection = connections[alias]
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True
+    )
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def measure(func, repeat):
+    """Call func repeat times and return the durations in milliseconds"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+
+    return durations
+
+
+def percentile(durations, fraction):
+    ordered = sorted(durations)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+
+    return ordered[index]
+
+
+def summarize(durations):
+    return {
+        "median_ms": round(statistics.median(durations), 3),
+        "p95_ms": round(percentile(durations, 0.95), 3),
+        "p99_ms": round(percentile(durations, 0.99), 3),
+    }
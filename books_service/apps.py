@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BooksServiceConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "books_service"
+
+    def ready(self):
+        from books_service import checks, signals
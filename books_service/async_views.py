@@ -0,0 +1,68 @@
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import NotFound
+from rest_framework.settings import api_settings
+
+from books_service.cache import (
+    catalog_cache_key,
+    get_catalog_payload,
+    set_catalog_payload,
+)
+from books_service.models import Book
+from books_service.search import search_text
+from books_service.serializers import BookSerializer
+from books_service.views import BookViewSet
+from library_service.async_api import async_read_view, json_response, paginate
+from library_service.pagination import RankedPageNumberPagination
+
+
+async def _cached_payload(build, *key_parts):
+    """Return the payload stored in the catalog cache under the key the
+    sync views use, building and storing it when missing"""
+    key = await sync_to_async(catalog_cache_key)(*key_parts)
+    payload = await sync_to_async(get_catalog_payload)(key)
+
+    if payload is None:
+        payload = await build()
+        await sync_to_async(set_catalog_payload)(key, payload)
+
+    return payload
+
+
+@async_read_view(authentication_required=False)
+async def book_list(request):
+    async def build():
+        search = search_text(request.GET)
+        if search is None:
+            queryset = Book.objects.all()
+            pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+        else:
+            queryset = Book.objects.search(search)
+            pagination_class = RankedPageNumberPagination
+
+        renderer = BookViewSet.values_renderer
+
+        return await paginate(
+            request,
+            renderer.values(queryset),
+            renderer.render,
+            pagination_class,
+        )
+
+    page = await _cached_payload(
+        build, "list", request.build_absolute_uri()
+    )
+
+    return json_response(page)
+
+
+@async_read_view(authentication_required=False)
+async def book_detail(request, pk):
+    async def build():
+        try:
+            book = await Book.objects.aget(pk=pk)
+        except Book.DoesNotExist:
+            raise NotFound()
+
+        return BookSerializer(book).data
+
+    return json_response(await _cached_payload(build, "detail", pk))
@@ -0,0 +1,245 @@
+"""Server-Sent Events stream of book availability changes.
+
+Django 4.1 cannot stream from async views, so the stream is a small ASGI
+app that library_service.asgi mounts in front of Django at STREAM_PATH.
+Each event carries the book id and its inventory after a change. Clients
+resume after a reconnect from the Last-Event-ID header, which browsers
+send by themselves, or from the last_event_id query parameter; without
+either the stream starts with the next change.
+
+One AvailabilityPoller per process polls the event table and fans new
+events out to every open stream, so the polling load does not grow with
+the number of clients. Each database access runs between
+close_old_connections() calls, like a request, so a long-lived stream
+never holds on to a broken or expired connection.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+
+from books_service.models import AvailabilityEvent
+
+STREAM_PATH = "/async/books/availability/"
+BATCH_SIZE = 500
+# Milliseconds browsers wait before reconnecting
+RECONNECT_DELAY = 3000
+
+
+def _last_event_id(scope):
+    for name, value in scope["headers"]:
+        if name == b"last-event-id":
+            return value.decode("latin-1")
+
+    query = parse_qs(scope["query_string"].decode("latin-1"))
+
+    return query.get("last_event_id", [None])[-1]
+
+
+def format_event(event_id, book_id, inventory):
+    data = json.dumps({"book": book_id, "inventory": inventory})
+
+    return f"id: {event_id}\nevent: availability\ndata: {data}\n\n"
+
+
+async def _respond(send, status, body):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send(
+        {
+            "type": "http.response.body",
+            "body": json.dumps({"detail": body}).encode(),
+        }
+    )
+
+
+@sync_to_async
+def _latest_event_id():
+    close_old_connections()
+    try:
+        latest = AvailabilityEvent.objects.order_by("-id").first()
+    finally:
+        close_old_connections()
+
+    return latest.id if latest else 0
+
+
+@sync_to_async
+def _fetch_events(after, until=None):
+    """Return up to BATCH_SIZE (id, book id, inventory) rows of the
+    events after the id after, and not past until when given"""
+    close_old_connections()
+    try:
+        events = AvailabilityEvent.objects.filter(id__gt=after)
+        if until is not None:
+            events = events.filter(id__lte=until)
+
+        return list(
+            events.order_by("id").values_list("id", "book_id", "inventory")[
+                :BATCH_SIZE
+            ]
+        )
+    finally:
+        close_old_connections()
+
+
+class AvailabilityPoller:
+    """Poll the event table while any stream is open and put each batch
+    of new events on the queue of every subscribed stream"""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.last_event_id = None
+        self.task = None
+
+    async def subscribe(self):
+        """Return a queue of event batches and the id of the last event
+        before the first batch it will receive"""
+        if self.last_event_id is None:
+            latest = await _latest_event_id()
+            # Another stream may have started the poller meanwhile
+            if self.last_event_id is None:
+                self.last_event_id = latest
+                self.task = asyncio.create_task(self._poll())
+
+        queue = asyncio.Queue()
+        self.subscribers.add(queue)
+
+        return queue, self.last_event_id
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+        if not self.subscribers and self.task is not None:
+            self.task.cancel()
+            self.task = None
+            self.last_event_id = None
+
+    async def _poll(self):
+        while True:
+            try:
+                events = await _fetch_events(self.last_event_id)
+            except DatabaseError:
+                # The connection was closed above; retry on the next poll
+                events = []
+
+            if events:
+                self.last_event_id = events[-1][0]
+                for queue in self.subscribers:
+                    queue.put_nowait(events)
+                if len(events) == BATCH_SIZE:
+                    continue
+
+            await asyncio.sleep(settings.AVAILABILITY_POLL_SECONDS)
+
+
+poller = AvailabilityPoller()
+
+
+async def _wait_for_disconnect(receive, queue, disconnected):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+    disconnected.set()
+    # Wakes the stream up from waiting for events
+    queue.put_nowait(None)
+
+
+async def _send_events(send, events):
+    await send(
+        {
+            "type": "http.response.body",
+            "body": "".join(format_event(*event) for event in events).encode(),
+            "more_body": True,
+        }
+    )
+
+
+async def availability_stream(scope, receive, send):
+    if scope["method"] not in ("GET", "HEAD"):
+        return await _respond(
+            send, 405, f'Method "{scope["method"]}" not allowed.'
+        )
+
+    last_event_id = _last_event_id(scope)
+    if last_event_id is not None:
+        if not last_event_id.isdigit():
+            return await _respond(send, 400, "Invalid last event id.")
+        last_event_id = int(last_event_id)
+
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                # Stop reverse proxies from buffering the stream
+                (b"x-accel-buffering", b"no"),
+            ],
+        }
+    )
+    if scope["method"] == "HEAD":
+        return await send({"type": "http.response.body"})
+
+    queue, live_after = await poller.subscribe()
+    disconnected = asyncio.Event()
+    watcher = asyncio.create_task(
+        _wait_for_disconnect(receive, queue, disconnected)
+    )
+    if last_event_id is None:
+        last_event_id = live_after
+
+    try:
+        await send(
+            {
+                "type": "http.response.body",
+                "body": f"retry: {RECONNECT_DELAY}\n\n".encode(),
+                "more_body": True,
+            }
+        )
+
+        # Catch up to where the poller's batches start
+        while last_event_id < live_after and not disconnected.is_set():
+            events = await _fetch_events(last_event_id, live_after)
+            if not events:
+                break
+            last_event_id = events[-1][0]
+            await _send_events(send, events)
+
+        while not disconnected.is_set():
+            try:
+                events = await asyncio.wait_for(
+                    queue.get(), settings.AVAILABILITY_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                # Comment lines keep idle connections open through proxies
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": b": keep-alive\n\n",
+                        "more_body": True,
+                    }
+                )
+                continue
+
+            if events is None:
+                break
+
+            # A client resuming from an id ahead of the poller skips the
+            # events it has seen
+            events = [event for event in events if event[0] > last_event_id]
+            if events:
+                last_event_id = events[-1][0]
+                await _send_events(send, events)
+    finally:
+        watcher.cancel()
+        poller.unsubscribe(queue)
@@ -0,0 +1,70 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from library_service.routers import reading_from_replicas
+
+CATALOG_VERSION_KEY = "books:catalog:version"
+
+
+def _initial_version():
+    """Start from the clock so a version lost from the cache never comes
+    back to a number whose payloads may still be stored"""
+    return time.time_ns()
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, _initial_version(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+
+    return version
+
+
+def _increment_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.add(CATALOG_VERSION_KEY, _initial_version(), timeout=None)
+
+
+def bump_catalog_version():
+    """Invalidate all cached catalog payloads.
+
+    The version is bumped immediately and once more when the surrounding
+    transaction commits, so a read that runs while the change is still
+    uncommitted cannot store the old rows under the new version.
+    """
+    _increment_catalog_version()
+    transaction.on_commit(_increment_catalog_version)
+
+
+def catalog_cache_key(*parts):
+    """Key a catalog payload under the current catalog version.
+
+    Read the key before querying the database: a change committed in
+    between then lands on a newer version than the stored payload.
+    """
+    digest = hashlib.md5(
+        ":".join(str(part) for part in parts).encode()
+    ).hexdigest()
+
+    return f"books:catalog:{get_catalog_version()}:{digest}"
+
+
+def set_catalog_payload(key, payload):
+    """Store a payload read from the primary. Replica reads may lag
+    behind the version in the key, so they are never stored."""
+    if reading_from_replicas():
+        return
+
+    cache.set(key, payload, settings.CATALOG_CACHE_TIMEOUT)
+
+
+def get_catalog_payload(key):
+    return cache.get(key)
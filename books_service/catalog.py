@@ -0,0 +1,64 @@
+import csv
+import json
+from itertools import islice
+
+CATALOG_FIELDS = (
+    "title",
+    "author",
+    "cover",
+    "inventory",
+    "total_copies",
+    "daily_fee",
+)
+FORMATS = ("csv", "jsonl")
+
+
+def guess_format(path):
+    for file_format in FORMATS:
+        if str(path).endswith(f".{file_format}"):
+            return file_format
+
+    return "csv"
+
+
+def read_rows(file, file_format):
+    """Yield (line number, row) pairs one at a time.
+
+    Rows that cannot be parsed are yielded as None.
+    """
+    if file_format == "csv":
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                yield line_number, None
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class RowWriter:
+    def __init__(self, file, file_format):
+        self.file = file
+        self.file_format = file_format
+
+        if file_format == "csv":
+            self.csv_writer = csv.writer(file)
+            self.csv_writer.writerow(CATALOG_FIELDS)
+
+    def write(self, values):
+        if self.file_format == "csv":
+            self.csv_writer.writerow(values)
+        else:
+            row = dict(zip(CATALOG_FIELDS, values))
+            row["daily_fee"] = str(row["daily_fee"])
+            self.file.write(json.dumps(row) + "\n")
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_CACHES = ("django.core.cache.backends.locmem.LocMemCache",)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Warn when a deployment keeps its caches inside each process, where
+    a book change or a write pin made by one worker is missed by others"""
+    if settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES:
+        return []
+
+    return [
+        Warning(
+            "The default cache is private to each worker process.",
+            hint=(
+                "Set CACHE_BACKEND and CACHE_LOCATION to a cache shared by "
+                "all workers (Redis, Memcached or the database cache), or "
+                "run a single process."
+            ),
+            obj="CACHES",
+            id="books_service.W001",
+        )
+    ]
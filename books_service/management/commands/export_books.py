@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from books_service.catalog import (
+    CATALOG_FIELDS,
+    FORMATS,
+    RowWriter,
+    guess_format,
+)
+from books_service.models import Book
+
+
+class Command(BaseCommand):
+    help = "Stream the book catalog to a CSV or JSONL file"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            default="-",
+            help='File to write, "-" for stdout',
+        )
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or guess_format(options["path"])
+
+        if options["path"] == "-":
+            self.export(self.stdout, file_format, options["chunk_size"])
+            return
+
+        try:
+            with open(options["path"], "w", newline="") as file:
+                exported = self.export(
+                    file, file_format, options["chunk_size"]
+                )
+        except OSError as error:
+            raise CommandError(error)
+
+        self.stdout.write(self.style.SUCCESS(f"Exported {exported} books"))
+
+    @staticmethod
+    def export(file, file_format, chunk_size):
+        writer = RowWriter(file, file_format)
+        rows = (
+            Book.objects.order_by("pk")
+            .values_list(*CATALOG_FIELDS)
+            .iterator(chunk_size=chunk_size)
+        )
+
+        exported = 0
+        for exported, values in enumerate(rows, start=1):
+            writer.write(values)
+
+        return exported
@@ -0,0 +1,129 @@
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+
+from books_service.cache import bump_catalog_version
+from books_service.catalog import (
+    CATALOG_FIELDS,
+    FORMATS,
+    chunked,
+    guess_format,
+    read_rows,
+)
+from books_service.models import AvailabilityEvent, Book
+
+# Form fields enforce the choices, the decimal precision and the
+# positive inventory, which model field validation skips on SQLite
+FORM_FIELDS = {
+    name: Book._meta.get_field(name).formfield() for name in CATALOG_FIELDS
+}
+NATURAL_KEY = ("title", "author")
+UPDATE_FIELDS = tuple(
+    field for field in CATALOG_FIELDS if field not in NATURAL_KEY
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream books from a CSV or JSONL file into the catalog, "
+        "updating books that match on title and author"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help='File to read, "-" for stdin')
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or guess_format(options["path"])
+        self.created = self.updated = self.skipped = 0
+
+        if options["path"] == "-":
+            self.import_file(sys.stdin, file_format, options["chunk_size"])
+        else:
+            try:
+                with open(options["path"], newline="") as file:
+                    self.import_file(file, file_format, options["chunk_size"])
+            except OSError as error:
+                raise CommandError(error)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {self.created}, updated {self.updated}, "
+                f"skipped {self.skipped} books"
+            )
+        )
+
+    def import_file(self, file, file_format, chunk_size):
+        for chunk in chunked(read_rows(file, file_format), chunk_size):
+            books = {}
+
+            for line_number, row in chunk:
+                book = self.clean_row(line_number, row)
+                if book is not None:
+                    books[(book.title, book.author)] = book
+
+            with transaction.atomic():
+                self.upsert(books, chunk_size)
+                if books:
+                    bump_catalog_version()
+
+    def clean_row(self, line_number, row):
+        """Build an unsaved Book from a row, or report why it is invalid"""
+        if not isinstance(row, dict):
+            return self.skip(line_number, "cannot be parsed")
+
+        values = {}
+        for name, field in FORM_FIELDS.items():
+            try:
+                values[name] = field.clean(row.get(name))
+            except ValidationError as error:
+                return self.skip(line_number, f"{name}: {error.messages[0]}")
+
+        if values["total_copies"] is None:
+            values["total_copies"] = values["inventory"]
+
+        return Book(**values)
+
+    def skip(self, line_number, reason):
+        self.skipped += 1
+        self.stderr.write(f"Line {line_number} skipped, {reason}")
+
+    def upsert(self, books, batch_size):
+        # Descending so that the oldest of duplicated books wins
+        existing = {}
+        for pk, title, author in (
+            Book.objects.filter(title__in={title for title, _ in books})
+            .order_by("-pk")
+            .values_list("pk", "title", "author")
+        ):
+            existing[(title, author)] = pk
+
+        created, matched = [], []
+        for key, book in books.items():
+            book.pk = existing.get(key)
+            (created if book.pk is None else matched).append(book)
+
+        Book.objects.bulk_create(created, batch_size=batch_size)
+        # Books matched by natural key carry their primary key and update
+        # the existing row through INSERT ... ON CONFLICT DO UPDATE
+        Book.objects.bulk_create(
+            matched,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=UPDATE_FIELDS,
+        )
+        # The upsert cannot increment, so move the updated books past the
+        # versions staff may hold as ETags separately
+        Book.objects.filter(pk__in=[book.pk for book in matched]).update(
+            version=F("version") + 1
+        )
+        AvailabilityEvent.objects.record(
+            Book.objects.filter(pk__in=[book.pk for book in books.values()])
+        )
+        self.updated += len(matched)
+        self.created += len(created)
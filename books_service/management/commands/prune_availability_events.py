@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from books_service.models import AvailabilityEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete availability events older than the given number of days; "
+        "clients cannot resume from before the oldest remaining event"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=7)
+
+    def handle(self, *args, **options):
+        deleted, _ = AvailabilityEvent.objects.filter(
+            created_at__lt=timezone.now() - timedelta(days=options["days"])
+        ).delete()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} availability events")
+        )
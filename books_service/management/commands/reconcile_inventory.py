@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from books_service.models import Book
+
+
+class Command(BaseCommand):
+    help = (
+        "Check every book's inventory against its total copies minus "
+        "active borrowings and copies kept for ready holds, and report "
+        "or fix the drift"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Reset drifted inventories instead of only reporting them",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        checked = drifted = fixed = 0
+        last_pk = 0
+
+        while True:
+            # Keyset chunks keep every query and transaction short
+            books = list(
+                Book.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .with_active_borrowings()
+                .values_list(
+                    "pk",
+                    "title",
+                    "inventory",
+                    "total_copies",
+                    "active_borrowings",
+                    "ready_holds",
+                )[:options["chunk_size"]]
+            )
+            if not books:
+                break
+
+            last_pk = books[-1][0]
+            checked += len(books)
+            fixable = []
+
+            for pk, title, inventory, total_copies, active, held in books:
+                available = total_copies - active - held
+                if inventory == available:
+                    continue
+
+                drifted += 1
+                self.stdout.write(
+                    f'Book {pk} "{title}": inventory {inventory}, '
+                    f"expected {available} ({total_copies} copies, "
+                    f"{active} borrowed, {held} kept for holds)"
+                )
+                if available >= 0:
+                    fixable.append(pk)
+                else:
+                    self.stderr.write(
+                        f"Book {pk} has more active borrowings and ready "
+                        "holds than copies, fix its total copies by hand"
+                    )
+
+            if options["fix"] and fixable:
+                with transaction.atomic():
+                    fixed += Book.objects.filter(
+                        pk__in=fixable
+                    ).reconcile_inventory()
+
+        summary = f"Checked {checked} books, {drifted} drifted"
+        if options["fix"]:
+            summary += f", fixed {fixed}"
+
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,19 @@
+# Generated by Django 4.1.5 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books_service", "0002_book_search_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["title", "author"], name="book_title_author_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from books_service.search import install_search_index
+
+
+def count_borrowed_copies(apps, schema_editor):
+    Book = apps.get_model("books_service", "Book")
+    Borrowing = apps.get_model("borrowings_service", "Borrowing")
+    active_borrowings = (
+        Borrowing.objects.filter(book=OuterRef("pk"), actual_return_date__isnull=True)
+        .order_by()
+        .values("book")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    Book.objects.update(
+        total_copies=F("inventory") + Coalesce(Subquery(active_borrowings), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books_service", "0003_book_title_author_idx"),
+        ("borrowings_service", "0005_borrowing_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="total_copies",
+            field=models.PositiveIntegerField(blank=True, default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(count_borrowed_copies, migrations.RunPython.noop),
+        # Adding the column rebuilt the table and dropped the search triggers
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.1.5 on 2026-10-18 20:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books_service", "0004_book_total_copies"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AvailabilityEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("inventory", models.PositiveIntegerField()),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="availability_events",
+                        to="books_service.book",
+                    ),
+                ),
+            ],
+        ),
+    ]
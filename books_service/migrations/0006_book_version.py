@@ -0,0 +1,22 @@
+# Generated by Django 4.1.5 on 2026-10-18 20:37
+
+from django.db import migrations, models
+
+from books_service.search import install_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books_service", "0005_availabilityevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        # Adding the column rebuilt the table and dropped the search triggers
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
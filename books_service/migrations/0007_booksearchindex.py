@@ -0,0 +1,42 @@
+# Generated by Django 4.1.5 on 2026-10-18 21:11
+
+import books_service.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books_service", "0006_book_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookSearchIndex",
+            fields=[
+                (
+                    "book",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_index",
+                        serialize=False,
+                        to="books_service.book",
+                    ),
+                ),
+                (
+                    "document",
+                    books_service.search.SearchDocumentField(
+                        db_column="books_service_book_search"
+                    ),
+                ),
+                ("rank", models.FloatField()),
+            ],
+            options={
+                "db_table": "books_service_book_search",
+                "managed": False,
+            },
+        ),
+    ]
@@ -1,18 +1,277 @@
-from django.db import models
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, models, router
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from books_service.cache import bump_catalog_version
+from books_service.search import (
+    SEARCH_TABLE,
+    SearchDocumentField,
+    build_match_query,
+)
+
 
 class Cover(models.TextChoices):
     HARD = "Hard", _("Hard")
     SOFT = "Soft", _("Soft")
 
 
+class BookQuerySet(models.QuerySet):
+    def decrement_inventory(self, amount=1):
+        """Take copies off the shelf with a single conditional UPDATE.
+
+        Only rows that still have enough copies are touched, so the number
+        of affected rows tells the caller whether the checkout succeeded.
+        """
+        updated = self.filter(inventory__gte=amount).update(
+            inventory=F("inventory") - amount, version=F("version") + 1
+        )
+
+        if updated:
+            self._inventory_changed(self)
+
+        return updated
+
+    def decrement_inventory_per_book(self, amounts):
+        """Take amounts[book_id] copies of several books in one UPDATE.
+
+        Books without enough copies are left alone; the caller compares the
+        number of affected rows with len(amounts) and rolls back on a
+        mismatch.
+        """
+        available = Q()
+        for book_id, amount in amounts.items():
+            available |= Q(pk=book_id, inventory__gte=amount)
+
+        updated = self.filter(available).update(
+            inventory=F("inventory") - self._amount_per_book(amounts),
+            version=F("version") + 1,
+        )
+
+        if updated:
+            self._inventory_changed(self.filter(pk__in=amounts))
+
+        return updated
+
+    def increment_inventory_per_book(self, amounts):
+        """Put amounts[book_id] copies of several books back in one UPDATE"""
+        updated = self.filter(pk__in=amounts).update(
+            inventory=F("inventory") + self._amount_per_book(amounts),
+            version=F("version") + 1,
+        )
+
+        if updated:
+            self._inventory_changed(self.filter(pk__in=amounts))
+
+        return updated
+
+    @staticmethod
+    def _amount_per_book(amounts):
+        return Case(
+            *[
+                When(pk=book_id, then=Value(amount))
+                for book_id, amount in amounts.items()
+            ],
+            default=Value(0),
+            output_field=models.PositiveIntegerField(),
+        )
+
+    def with_active_borrowings(self):
+        return self.annotate(
+            active_borrowings=self._active_borrowings(),
+            ready_holds=self._ready_holds(),
+        )
+
+    def reconcile_inventory(self):
+        """Reset inventory to the copies owned minus the active borrowings
+        and the copies kept for ready holds in one UPDATE, so concurrent
+        checkouts cannot slip in between"""
+        updated = self.update(
+            inventory=F("total_copies")
+            - self._active_borrowings()
+            - self._ready_holds(),
+            version=F("version") + 1,
+        )
+
+        if updated:
+            self._inventory_changed(self)
+
+        return updated
+
+    def update_if_version(self, version, **fields):
+        """Write fields with a single conditional UPDATE of the rows still
+        at version, bumping it. No row lock is held while the caller
+        prepares the change; an edit based on a stale read updates
+        nothing, which the caller learns from the returned count.
+        """
+        updated = self.filter(version=version).update(
+            version=F("version") + 1, **fields
+        )
+
+        if updated:
+            if "inventory" in fields:
+                self._inventory_changed(self)
+            else:
+                bump_catalog_version()
+
+        return updated
+
+    @staticmethod
+    def _inventory_changed(books):
+        bump_catalog_version()
+        AvailabilityEvent.objects.record(books)
+
+    def _active_borrowings(self):
+        borrowing = self.model._meta.get_field("borrowings").related_model
+        count = (
+            borrowing.objects.filter(
+                book=OuterRef("pk"), actual_return_date__isnull=True
+            )
+            .order_by()
+            .values("book")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+
+        return Coalesce(Subquery(count), 0)
+
+    def _ready_holds(self):
+        hold = self.model._meta.get_field("holds").related_model
+        count = (
+            hold.objects.ready()
+            .filter(book=OuterRef("pk"))
+            .order_by()
+            .values("book")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+
+        return Coalesce(Subquery(count), 0)
+
+    def search(self, text):
+        """Find books by title and author prefixes, best matches first.
+        Text without words leaves the queryset as it is.
+
+        Uses the FTS5 index kept in sync with the book table by triggers,
+        falling back to a case-insensitive scan on other databases.
+        """
+        match = build_match_query(text)
+
+        if not match:
+            return self
+
+        if connections[self.db].vendor != "sqlite":
+            return self.filter(
+                Q(title__icontains=text) | Q(author__icontains=text)
+            ).order_by("id")
+
+        return (
+            self.filter(search_index__document__match=match)
+            .annotate(search_rank=F("search_index__rank"))
+            .order_by("search_rank", "id")
+        )
+
+
 class Book(models.Model):
     title = models.CharField(max_length=255)
     author = models.CharField(max_length=255)
     cover = models.CharField(max_length=4, choices=Cover.choices)
     inventory = models.PositiveIntegerField()
+    total_copies = models.PositiveIntegerField(blank=True)
     daily_fee = models.DecimalField(max_digits=5, decimal_places=2)
+    # Bumped by every write and served as the book's ETag
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    objects = BookQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["title", "author"], name="book_title_author_idx"
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.total_copies is None:
+            self.total_copies = self.inventory
+
+        if not self._state.adding:
+            # Edits through save(), as in the admin, skip the If-Match
+            # check but still change the ETag
+            self.version += 1
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "version"}
+
+        return super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
+
+
+class BookSearchIndex(models.Model):
+    """Read-only view of the FTS5 index of book titles and authors,
+    which triggers keep in sync with the book table"""
+
+    book = models.OneToOneField(
+        Book,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        related_name="search_index",
+    )
+    document = SearchDocumentField(db_column=SEARCH_TABLE)
+    # BM25 score of the row for the query it matched, lower is better
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = SEARCH_TABLE
+
+
+class AvailabilityEventQuerySet(models.QuerySet):
+    def record(self, books):
+        """Append the current inventory of books as events with a single
+        INSERT ... SELECT, inside the transaction that changed it"""
+        db = router.db_for_write(self.model)
+        rows = (
+            books.using(db)
+            .order_by("pk")
+            .annotate(
+                recorded_at=Value(
+                    timezone.now(), output_field=models.DateTimeField()
+                )
+            )
+            .values_list("pk", "inventory", "recorded_at")
+        )
+        try:
+            sql, params = rows.query.get_compiler(db).as_sql()
+        except EmptyResultSet:
+            return 0
+
+        table = self.model._meta.db_table
+
+        with connections[db].cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (book_id, inventory, created_at) "
+                f"{sql}",
+                params,
+            )
+
+            return cursor.rowcount
+
+
+class AvailabilityEvent(models.Model):
+    """A book's inventory after a change, in the order of the changes.
+
+    The auto-incrementing id is the event id clients resume from.
+    """
+
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="availability_events"
+    )
+    inventory = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = AvailabilityEventQuerySet.as_manager()
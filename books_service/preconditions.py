@@ -0,0 +1,47 @@
+"""ETags and If-Match preconditions for book updates.
+
+A book's ETag is its version. Staff send it back in If-Match, and an
+update based on an older version is refused with 412 instead of silently
+overwriting the newer edit.
+"""
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+IF_MATCH_HEADER = "If-Match"
+
+
+class PreconditionRequired(APIException):
+    status_code = status.HTTP_428_PRECONDITION_REQUIRED
+    default_detail = "Send the book's ETag in the If-Match header."
+    default_code = "precondition_required"
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The book was changed since it was read."
+    default_code = "precondition_failed"
+
+
+def format_etag(version):
+    return f'"{version}"'
+
+
+def if_match_versions(request):
+    """Return the versions listed in If-Match, or None for "*".
+
+    If-Match uses strong comparison, so weak tags never match.
+    """
+    header = request.headers.get(IF_MATCH_HEADER)
+    if header is None:
+        raise PreconditionRequired()
+
+    if header.strip() == "*":
+        return None
+
+    versions = set()
+    for tag in header.split(","):
+        tag = tag.strip()
+        if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit():
+            versions.add(int(tag[1:-1]))
+
+    return versions
@@ -0,0 +1,96 @@
+import re
+
+from django.db import models
+
+SEARCH_TABLE = "books_service_book_search"
+BOOK_TABLE = "books_service_book"
+
+TOKEN_RE = re.compile(r"\w+")
+
+CREATE_SEARCH_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    f"title, author, content='{BOOK_TABLE}', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+CREATE_SEARCH_TRIGGERS_SQL = (
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai "
+    f"AFTER INSERT ON {BOOK_TABLE} BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, title, author) "
+    "VALUES (new.id, new.title, new.author); "
+    "END",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad "
+    f"AFTER DELETE ON {BOOK_TABLE} BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, author) "
+    "VALUES ('delete', old.id, old.title, old.author); "
+    "END",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au "
+    f"AFTER UPDATE OF title, author ON {BOOK_TABLE} BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, author) "
+    "VALUES ('delete', old.id, old.title, old.author); "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, title, author) "
+    "VALUES (new.id, new.title, new.author); "
+    "END",
+)
+
+REBUILD_SEARCH_TABLE_SQL = (
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"
+)
+
+
+class SearchDocumentField(models.TextField):
+    """The hidden FTS5 column named after its table, which matches a
+    query against every indexed column"""
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query matching every word as a prefix"""
+    return " ".join(f'"{token}"*' for token in TOKEN_RE.findall(text))
+
+
+def search_text(query_params):
+    """The ?search= text, or None when it has no words to search for,
+    in which case the catalog is listed as usual"""
+    text = query_params.get("search")
+
+    if text is None or not build_match_query(text):
+        return None
+
+    return text
+
+
+def install_search_index(apps, schema_editor):
+    """Create the full-text index of books and the triggers syncing it.
+
+    Migrations that rebuild the book table drop its triggers, so they
+    have to run this again afterwards.
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    schema_editor.execute(CREATE_SEARCH_TABLE_SQL)
+    for sql in CREATE_SEARCH_TRIGGERS_SQL:
+        schema_editor.execute(sql)
+    schema_editor.execute(REBUILD_SEARCH_TABLE_SQL)
+
+
+def uninstall_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    for suffix in ("ai", "ad", "au"):
+        schema_editor.execute(
+            f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{suffix}"
+        )
+    schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
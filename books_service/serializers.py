@@ -6,4 +6,45 @@ from books_service.models import Book
 class BookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Book
-        fields = ("id", "title", "author", "cover", "inventory", "daily_fee",)
+        fields = (
+            "id",
+            "title",
+            "author",
+            "cover",
+            "inventory",
+            "total_copies",
+            "daily_fee",
+            "version",
+        )
+
+    def validate(self, attrs):
+        """Keep the copies on loan or held out of an edit: changing the
+        inventory changes the total copies by as much, and the other way
+        round, so reconcile_inventory does not undo it"""
+        if self.instance is None:
+            return attrs
+
+        away = self.instance.total_copies - self.instance.inventory
+        inventory = attrs.get("inventory")
+        total_copies = attrs.get("total_copies")
+
+        if inventory is not None and total_copies is not None:
+            if total_copies - inventory != away:
+                raise serializers.ValidationError(
+                    f"Total copies must exceed the inventory by the {away} "
+                    f"copies on loan or held."
+                )
+        elif inventory is not None:
+            attrs["total_copies"] = inventory + away
+        elif total_copies is not None:
+            if total_copies < away:
+                raise serializers.ValidationError(
+                    {
+                        "total_copies": (
+                            f"{away} copies are on loan or held."
+                        )
+                    }
+                )
+            attrs["inventory"] = total_copies - away
+
+        return attrs
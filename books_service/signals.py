@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from books_service.cache import bump_catalog_version
+from books_service.models import AvailabilityEvent, Book
+
+
+@receiver([post_save, post_delete], sender=Book)
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Book)
+def record_availability(sender, instance, **kwargs):
+    AvailabilityEvent.objects.create(
+        book=instance, inventory=instance.inventory
+    )
@@ -0,0 +1,162 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from books_service.models import Book
+from books_service.serializers import BookSerializer
+
+ASYNC_BOOK_LIST_URL = reverse("books_service_async:book-list")
+
+
+def sample_book(**params):
+    defaults = {
+        "title": "Sample book",
+        "author": "Sample author",
+        "cover": "Hard",
+        "inventory": 2,
+        "daily_fee": 2.00,
+    }
+    defaults.update(params)
+
+    return Book.objects.create(**defaults)
+
+
+class AsyncBookAPITests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.books = [sample_book(title=f"Book {i}") for i in range(3)]
+
+    async def test_list_book(self):
+        response = await self.async_client.get(ASYNC_BOOK_LIST_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["results"],
+            BookSerializer(self.books, many=True).data,
+        )
+
+    async def test_list_book_keyset_pages(self):
+        response = await self.async_client.get(
+            ASYNC_BOOK_LIST_URL, {"page_size": 2}
+        )
+        first_page = response.json()
+        response = await self.async_client.get(first_page["next"])
+        second_page = response.json()
+
+        self.assertEqual(
+            [book["id"] for book in first_page["results"]],
+            [self.books[0].id, self.books[1].id],
+        )
+        self.assertEqual(
+            [book["id"] for book in second_page["results"]],
+            [self.books[2].id],
+        )
+        self.assertIsNone(second_page["next"])
+        response = await self.async_client.get(second_page["previous"])
+        self.assertEqual(response.json()["results"], first_page["results"])
+
+    async def test_list_book_pages_match_sync_list(self):
+        sync = await self.async_client.get(
+            reverse("books_service:book-list"), {"page_size": 2}
+        )
+        response = await self.async_client.get(
+            ASYNC_BOOK_LIST_URL, {"page_size": 2}
+        )
+
+        self.assertEqual(response.json()["results"], sync.json()["results"])
+        self.assertEqual(
+            response.json()["next"].split("?")[1],
+            sync.json()["next"].split("?")[1],
+        )
+
+        sync = await self.async_client.get(sync.json()["next"])
+        response = await self.async_client.get(response.json()["next"])
+
+        self.assertEqual(response.json()["results"], sync.json()["results"])
+        self.assertEqual(
+            response.json()["previous"].split("?")[1],
+            sync.json()["previous"].split("?")[1],
+        )
+
+    async def test_search_books(self):
+        response = await self.async_client.get(
+            ASYNC_BOOK_LIST_URL, {"search": "book 1"}
+        )
+
+        self.assertEqual(response.json()["count"], 1)
+        self.assertEqual(
+            response.json()["results"][0]["id"], self.books[1].id
+        )
+
+    async def test_blank_search_lists_books(self):
+        response = await self.async_client.get(
+            f"{ASYNC_BOOK_LIST_URL}?search=%20"
+        )
+
+        self.assertEqual(
+            response.json()["results"],
+            BookSerializer(self.books, many=True).data,
+        )
+
+    async def test_search_pages(self):
+        response = await self.async_client.get(
+            ASYNC_BOOK_LIST_URL, {"search": "book", "page_size": 2}
+        )
+        first_page = response.json()
+        response = await self.async_client.get(first_page["next"])
+        second_page = response.json()
+        missing = await self.async_client.get(
+            ASYNC_BOOK_LIST_URL, {"search": "book", "page": 9}
+        )
+
+        self.assertEqual(first_page["count"], 3)
+        self.assertIsNone(first_page["previous"])
+        self.assertEqual(len(second_page["results"]), 1)
+        self.assertIsNone(second_page["next"])
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_invalid_cursor(self):
+        response = await self.async_client.get(
+            ASYNC_BOOK_LIST_URL, {"cursor": "invalid"}
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    async def test_retrieve_book_shares_catalog_cache(self):
+        await self.async_client.get(
+            reverse("books_service:book-detail", args=[self.books[0].id])
+        )
+        url = reverse(
+            "books_service_async:book-detail", args=[self.books[0].id]
+        )
+
+        # update() sends no signal, so the cached payload stays current
+        await sync_to_async(
+            Book.objects.filter(pk=self.books[0].pk).update
+        )(title="Uncached")
+
+        response = await self.async_client.get(url)
+
+        self.assertEqual(response.json(), BookSerializer(self.books[0]).data)
+
+    async def test_retrieve_book(self):
+        url = reverse(
+            "books_service_async:book-detail", args=[self.books[0].id]
+        )
+
+        response = await self.async_client.get(url)
+
+        self.assertEqual(response.json(), BookSerializer(self.books[0]).data)
+
+    async def test_retrieve_missing_book(self):
+        url = reverse("books_service_async:book-detail", args=[999])
+
+        response = await self.async_client.get(url)
+
+        self.assertEqual(response.status_code, 404)
+
+    async def test_writes_not_allowed(self):
+        response = await self.async_client.post(ASYNC_BOOK_LIST_URL, {})
+
+        self.assertEqual(response.status_code, 405)
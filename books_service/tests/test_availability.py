@@ -0,0 +1,283 @@
+import asyncio
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from books_service import availability
+from books_service.availability import STREAM_PATH, format_event, poller
+from books_service.models import AvailabilityEvent, Book
+from borrowings_service.models import Borrowing
+from library_service.asgi import application
+
+BORROWINGS_URL = reverse("borrowings_service:borrowing-list")
+
+
+def sample_book(**params):
+    defaults = {
+        "title": "Sample book",
+        "author": "Sample author",
+        "cover": "Hard",
+        "inventory": 2,
+        "daily_fee": 2.00,
+    }
+    defaults.update(params)
+
+    return Book.objects.create(**defaults)
+
+
+def events_of(book):
+    return list(
+        AvailabilityEvent.objects.filter(book=book)
+        .order_by("id")
+        .values_list("inventory", flat=True)
+    )
+
+
+def has_event(body):
+    return "event: availability" in body
+
+
+class AvailabilityEventTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com", password="1qazcde3"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.book = sample_book()
+
+    def test_new_book_records_event(self):
+        self.assertEqual(events_of(self.book), [2])
+
+    def test_checkout_records_event(self):
+        self.client.post(
+            BORROWINGS_URL,
+            {"book": self.book.id, "expected_return_date": "2099-01-01"},
+        )
+
+        self.assertEqual(events_of(self.book), [2, 1])
+
+    def test_bulk_checkout_records_event_per_book(self):
+        other = sample_book(title="Other")
+
+        self.client.post(
+            reverse("borrowings_service:borrowing-bulk-checkout"),
+            {
+                "books": [self.book.id, other.id],
+                "expected_return_date": "2099-01-01",
+            },
+        )
+
+        self.assertEqual(events_of(self.book), [2, 1])
+        self.assertEqual(events_of(other), [2, 1])
+
+    def test_return_records_event(self):
+        Book.objects.filter(pk=self.book.pk).update(inventory=1)
+        borrowing = Borrowing.objects.create(
+            expected_return_date="2099-01-01", book=self.book, user=self.user
+        )
+
+        self.client.post(
+            reverse(
+                "borrowings_service:borrowing-return-book",
+                args=[borrowing.id],
+            ),
+            {"actual_return_date": str(date.today())},
+        )
+
+        self.assertEqual(events_of(self.book), [2, 2])
+
+    def test_failed_checkout_records_no_event(self):
+        Book.objects.filter(pk=self.book.pk).update(inventory=0)
+
+        self.client.post(
+            BORROWINGS_URL,
+            {"book": self.book.id, "expected_return_date": "2099-01-01"},
+        )
+
+        self.assertEqual(events_of(self.book), [2])
+
+    def test_staff_edit_records_event(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        self.client.patch(
+            reverse("books_service:book-detail", args=[self.book.id]),
+            {"inventory": 7},
+            HTTP_IF_MATCH='"1"',
+        )
+
+        self.assertEqual(events_of(self.book), [2, 7])
+
+    def test_record_nothing_for_no_books(self):
+        self.assertEqual(
+            AvailabilityEvent.objects.record(Book.objects.none()), 0
+        )
+
+
+@override_settings(AVAILABILITY_POLL_SECONDS=0.01)
+class AvailabilityStreamTests(TestCase):
+    def setUp(self):
+        self.book = sample_book()
+        self.first_event = AvailabilityEvent.objects.get()
+
+    async def stream(
+        self, headers=(), query_string=b"", until=None, method="GET"
+    ):
+        """Run the ASGI application until until(body) holds, then
+        disconnect. Returns the status and the body"""
+        messages = []
+        done = asyncio.Event()
+        requested = False
+
+        def body():
+            return b"".join(
+                message.get("body", b"") for message in messages[1:]
+            ).decode()
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b""}
+
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+            if until is None or until(body()):
+                done.set()
+
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": STREAM_PATH,
+            "query_string": query_string,
+            "headers": list(headers),
+        }
+        await asyncio.wait_for(application(scope, receive, send), 5)
+
+        return messages[0]["status"], body()
+
+    async def test_stream_starts_after_latest_event(self):
+        status, body = await self.stream()
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, "retry: 3000\n\n")
+
+    async def test_stream_sends_new_events(self):
+        async def checkout():
+            await asyncio.sleep(0.05)
+            await sync_to_async(
+                Book.objects.filter(pk=self.book.pk).decrement_inventory
+            )()
+
+        _, (status, body) = await asyncio.gather(
+            checkout(), self.stream(until=has_event)
+        )
+
+        event = await AvailabilityEvent.objects.alatest("id")
+        self.assertEqual(status, 200)
+        self.assertIn(format_event(event.id, self.book.id, 1), body)
+
+    async def test_stream_resumes_from_last_event_id_header(self):
+        await sync_to_async(
+            Book.objects.filter(pk=self.book.pk).decrement_inventory
+        )()
+        event = await AvailabilityEvent.objects.alatest("id")
+
+        _, body = await self.stream(
+            headers=[(b"last-event-id", str(self.first_event.id).encode())],
+            until=has_event,
+        )
+
+        self.assertEqual(
+            body,
+            "retry: 3000\n\n" + format_event(event.id, self.book.id, 1),
+        )
+
+    async def test_stream_resumes_from_query_parameter(self):
+        _, body = await self.stream(
+            query_string=b"last_event_id=0", until=has_event
+        )
+
+        self.assertIn(
+            format_event(self.first_event.id, self.book.id, 2), body
+        )
+
+    async def test_invalid_last_event_id(self):
+        status, _ = await self.stream(query_string=b"last_event_id=abc")
+
+        self.assertEqual(status, 400)
+
+    async def test_post_not_allowed(self):
+        status, _ = await self.stream(method="POST")
+
+        self.assertEqual(status, 405)
+
+    async def test_streams_share_one_poller(self):
+        async def checkout():
+            while len(poller.subscribers) < 2:
+                await asyncio.sleep(0.01)
+            await sync_to_async(
+                Book.objects.filter(pk=self.book.pk).decrement_inventory
+            )()
+
+        with mock.patch.object(
+            availability,
+            "_fetch_events",
+            wraps=availability._fetch_events,
+        ) as fetch:
+            _, (_, first), (_, second) = await asyncio.gather(
+                checkout(),
+                self.stream(until=has_event),
+                self.stream(until=has_event),
+            )
+
+        event = await AvailabilityEvent.objects.alatest("id")
+        expected = format_event(event.id, self.book.id, 1)
+        self.assertIn(expected, first)
+        self.assertIn(expected, second)
+        # Only the poller fetched, neither stream had a backlog
+        self.assertTrue(fetch.called)
+        for call in fetch.call_args_list:
+            self.assertEqual(len(call.args), 1)
+        self.assertEqual(poller.subscribers, set())
+        self.assertIsNone(poller.task)
+
+    async def test_database_access_closes_old_connections(self):
+        with mock.patch.object(
+            availability, "close_old_connections"
+        ) as close_old_connections:
+            await self.stream(query_string=b"last_event_id=0", until=has_event)
+
+        self.assertGreaterEqual(close_old_connections.call_count, 4)
+
+    @override_settings(AVAILABILITY_HEARTBEAT_SECONDS=0.02)
+    async def test_idle_stream_sends_keep_alive(self):
+        _, body = await self.stream(until=lambda body: "keep-alive" in body)
+
+        self.assertEqual(body, "retry: 3000\n\n: keep-alive\n\n")
+
+
+class PruneAvailabilityEventsCommandTests(TestCase):
+    def test_prune_deletes_old_events(self):
+        book = sample_book()
+        AvailabilityEvent.objects.update(
+            created_at=timezone.now() - timedelta(days=8)
+        )
+        AvailabilityEvent.objects.record(Book.objects.filter(pk=book.pk))
+
+        call_command("prune_availability_events", stdout=StringIO())
+
+        self.assertEqual(events_of(book), [2])
+        self.assertEqual(AvailabilityEvent.objects.count(), 1)
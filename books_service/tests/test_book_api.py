@@ -1,15 +1,27 @@
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
+from books_service.cache import get_catalog_version
 from books_service.models import Book
+from books_service.search import SEARCH_TABLE
 from books_service.serializers import BookSerializer
+from books_service.views import BookViewSet
 
 BOOK_LIST_URL = reverse("books_service:book-list")
 
 
+def detail_url(book_id):
+    return reverse("books_service:book-detail", args=[book_id])
+
+
 def sample_book(**params):
     defaults = {
         "title": "Sample book",
@@ -36,7 +48,7 @@ class UnauthenticatedBookAPITests(TestCase):
         serializer = BookSerializer(movies, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data["results"], serializer.data)
 
     def test_create_book(self):
         payload = {
@@ -71,7 +83,7 @@ class AuthenticatedBookAPITests(TestCase):
         serializer = BookSerializer(movies, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data["results"], serializer.data)
 
     def test_create_book(self):
         payload = {
@@ -108,3 +120,418 @@ class AdminUserBookAPITests(TestCase):
         response = self.client.post(BOOK_LIST_URL, payload)
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class BookPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_list_book_paginated_by_cursor(self):
+        books = [sample_book(title=f"Book {i}") for i in range(5)]
+
+        response = self.client.get(BOOK_LIST_URL, {"page_size": 2})
+        first_page_ids = [book["id"] for book in response.data["results"]]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(first_page_ids, [books[0].id, books[1].id])
+        self.assertIsNone(response.data["previous"])
+
+        response = self.client.get(response.data["next"])
+        second_page_ids = [book["id"] for book in response.data["results"]]
+
+        self.assertEqual(second_page_ids, [books[2].id, books[3].id])
+
+    def test_page_stable_under_concurrent_inserts(self):
+        for i in range(3):
+            sample_book(title=f"Book {i}")
+
+        response = self.client.get(BOOK_LIST_URL, {"page_size": 2})
+        next_url = response.data["next"]
+        Book.objects.filter(id=response.data["results"][0]["id"]).delete()
+        sample_book(title="Inserted meanwhile")
+
+        response = self.client.get(next_url)
+        titles = [book["title"] for book in response.data["results"]]
+
+        self.assertEqual(titles, ["Book 2", "Inserted meanwhile"])
+
+    def test_page_size_capped(self):
+        for i in range(5):
+            sample_book(title=f"Book {i}")
+
+        with mock.patch(
+            "library_service.pagination.IdCursorPagination.max_page_size", 3
+        ):
+            response = self.client.get(BOOK_LIST_URL, {"page_size": 1000})
+
+        self.assertEqual(len(response.data["results"]), 3)
+
+
+class BookSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.kobzar = sample_book(title="Kobzar", author="Taras Shevchenko")
+        self.haidamaky = sample_book(
+            title="Haidamaky", author="Taras Shevchenko"
+        )
+        self.forest_song = sample_book(
+            title="The Forest Song", author="Lesya Ukrainka"
+        )
+
+    def search(self, text, **params):
+        return self.client.get(BOOK_LIST_URL, {"search": text, **params})
+
+    def test_search_by_title_and_author(self):
+        response = self.search("Kobzar")
+        ids = [book["id"] for book in response.data["results"]]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ids, [self.kobzar.id])
+
+        response = self.search("shevchenko")
+        ids = {book["id"] for book in response.data["results"]}
+
+        self.assertEqual(ids, {self.kobzar.id, self.haidamaky.id})
+
+    def test_search_matches_word_prefixes(self):
+        response = self.search("ukrain for")
+        ids = [book["id"] for book in response.data["results"]]
+
+        self.assertEqual(ids, [self.forest_song.id])
+
+    def test_search_orders_by_rank(self):
+        best = sample_book(title="Song of songs", author="Song")
+
+        response = self.search("song")
+        ids = [book["id"] for book in response.data["results"]]
+
+        self.assertEqual(ids, [best.id, self.forest_song.id])
+
+    def test_search_index_follows_updates_and_deletes(self):
+        self.kobzar.title = "Zapovit"
+        self.kobzar.save()
+        self.haidamaky.delete()
+
+        self.assertEqual(self.search("kobzar").data["results"], [])
+        self.assertEqual(self.search("haidamaky").data["results"], [])
+        self.assertEqual(
+            [book["id"] for book in self.search("zapo").data["results"]],
+            [self.kobzar.id],
+        )
+
+    def test_search_without_words_lists_all_books(self):
+        for text in ("", " ", "***"):
+            with self.subTest(text=text):
+                response = self.search(text)
+                ids = [book["id"] for book in response.data["results"]]
+
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(
+                    ids,
+                    [self.kobzar.id, self.haidamaky.id, self.forest_song.id],
+                )
+
+    def test_blank_search_in_query_string(self):
+        for query_string in ("search=", "search=%20"):
+            with self.subTest(query_string=query_string):
+                response = self.client.get(f"{BOOK_LIST_URL}?{query_string}")
+
+                self.assertEqual(len(response.data["results"]), 3)
+
+    def test_queryset_search_without_words_returns_queryset(self):
+        queryset = Book.objects.filter(pk=self.kobzar.pk)
+
+        self.assertIs(queryset.search(" "), queryset)
+
+    def test_search_is_paginated(self):
+        response = self.search("taras", page_size=1)
+
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNotNone(response.data["next"])
+
+    def test_search_composes_with_filters(self):
+        books = Book.objects.exclude(pk=self.kobzar.pk).search("taras")
+
+        self.assertEqual(list(books), [self.haidamaky])
+        self.assertEqual(books.count(), 1)
+        self.assertIsInstance(books[0].search_rank, float)
+
+    def test_search_joins_index_by_rowid(self):
+        with connection.cursor() as cursor:
+            sql, params = Book.objects.search("kob").query.sql_with_params()
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = [row[-1] for row in cursor.fetchall()]
+
+        self.assertTrue(
+            plan[0].startswith(f"SCAN {SEARCH_TABLE} VIRTUAL TABLE"), plan
+        )
+        self.assertIn(
+            "SEARCH books_service_book USING INTEGER PRIMARY KEY (rowid=?)",
+            plan,
+        )
+
+
+class BookCatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin.user@mail.com",
+            password="1qazcde3",
+        )
+        self.book = sample_book(inventory=2)
+
+    def test_repeated_reads_do_not_hit_database(self):
+        self.client.get(BOOK_LIST_URL)
+        self.client.get(detail_url(self.book.id))
+
+        with self.assertNumQueries(0):
+            list_response = self.client.get(BOOK_LIST_URL)
+            detail_response = self.client.get(detail_url(self.book.id))
+
+        self.assertEqual(
+            list_response.data["results"],
+            [BookSerializer(self.book).data],
+        )
+        self.assertEqual(detail_response.data, BookSerializer(self.book).data)
+
+    def test_query_parameters_are_cached_separately(self):
+        sample_book(title="Other")
+
+        first_page = self.client.get(BOOK_LIST_URL, {"page_size": 1})
+        full_page = self.client.get(BOOK_LIST_URL)
+
+        self.assertEqual(len(first_page.data["results"]), 1)
+        self.assertEqual(len(full_page.data["results"]), 2)
+
+    def test_book_update_invalidates_cache(self):
+        self.client.get(detail_url(self.book.id))
+        self.client.force_authenticate(self.admin)
+
+        self.client.patch(
+            detail_url(self.book.id),
+            {"title": "Renamed"},
+            HTTP_IF_MATCH='"1"',
+        )
+        response = self.client.get(detail_url(self.book.id))
+
+        self.assertEqual(response.data["title"], "Renamed")
+
+    def test_book_delete_invalidates_cache(self):
+        self.client.get(BOOK_LIST_URL)
+        self.book.delete()
+
+        response = self.client.get(BOOK_LIST_URL)
+
+        self.assertEqual(response.data["results"], [])
+
+    def test_inventory_change_invalidates_cache(self):
+        self.client.get(BOOK_LIST_URL)
+        self.client.get(detail_url(self.book.id))
+
+        Book.objects.filter(pk=self.book.pk).decrement_inventory()
+        list_response = self.client.get(BOOK_LIST_URL)
+        detail_response = self.client.get(detail_url(self.book.id))
+
+        self.assertEqual(list_response.data["results"][0]["inventory"], 1)
+        self.assertEqual(detail_response.data["inventory"], 1)
+
+    def test_catalog_version_bumped_again_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.increment_inventory_per_book({self.book.pk: 1})
+            version_before_commit = get_catalog_version()
+
+        self.assertGreater(get_catalog_version(), version_before_commit)
+
+
+class BookValuesRendererTests(TestCase):
+    def test_values_renderer_matches_serializer_bytes(self):
+        for daily_fee in ("2", "0.5", "999.99"):
+            sample_book(title=f"Fee {daily_fee}", daily_fee=daily_fee)
+        sample_book(title="Soft", cover="Soft", inventory=0)
+        renderer = BookViewSet.values_renderer
+        queryset = Book.objects.order_by("id")
+
+        self.assertEqual(
+            JSONRenderer().render(
+                renderer.render(renderer.values(queryset))
+            ),
+            JSONRenderer().render(BookSerializer(queryset, many=True).data),
+        )
+
+    def test_list_search_pages_render_through_values(self):
+        sample_book(title="Kobzar")
+
+        response = self.client.get(BOOK_LIST_URL, {"search": "kob"})
+
+        self.assertEqual(
+            response.data["results"],
+            BookSerializer(Book.objects.all(), many=True).data,
+        )
+
+
+class BookConcurrencyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_superuser(
+                email="admin.user@mail.com",
+                password="1qazcde3",
+            )
+        )
+        self.book = sample_book(inventory=2)
+
+    def patch(self, data, **headers):
+        return self.client.patch(detail_url(self.book.id), data, **headers)
+
+    def test_detail_carries_etag(self):
+        response = self.client.get(detail_url(self.book.id))
+        cached = self.client.get(detail_url(self.book.id))
+
+        self.assertEqual(response["ETag"], '"1"')
+        self.assertEqual(cached["ETag"], '"1"')
+        self.assertEqual(response.data["version"], 1)
+
+    def test_update_requires_if_match(self):
+        response = self.patch({"title": "Renamed"})
+
+        self.assertEqual(
+            response.status_code, status.HTTP_428_PRECONDITION_REQUIRED
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.title, "Sample book")
+
+    def test_update_with_current_etag(self):
+        response = self.patch({"title": "Renamed"}, HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["ETag"], '"2"')
+        self.assertEqual(response.data["title"], "Renamed")
+        self.assertEqual(response.data["inventory"], 2)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.title, "Renamed")
+        self.assertEqual(self.book.version, 2)
+
+    def test_second_edit_with_same_etag_fails(self):
+        self.patch({"inventory": 5}, HTTP_IF_MATCH='"1"')
+
+        response = self.patch({"inventory": 9}, HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(
+            response.status_code, status.HTTP_412_PRECONDITION_FAILED
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 5)
+
+    def test_checkout_changes_etag(self):
+        Book.objects.filter(pk=self.book.pk).decrement_inventory()
+
+        response = self.patch({"inventory": 9}, HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(
+            response.status_code, status.HTTP_412_PRECONDITION_FAILED
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 1)
+
+    def test_weak_etag_does_not_match(self):
+        response = self.patch({"title": "Renamed"}, HTTP_IF_MATCH='W/"1"')
+
+        self.assertEqual(
+            response.status_code, status.HTTP_412_PRECONDITION_FAILED
+        )
+
+    def test_any_etag_matches(self):
+        response = self.patch({"title": "Renamed"}, HTTP_IF_MATCH="*")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_put_with_etag(self):
+        response = self.client.put(
+            detail_url(self.book.id),
+            {
+                "title": "Kobzar",
+                "author": "Taras Shevchenko",
+                "cover": "Soft",
+                "inventory": 4,
+                "daily_fee": "1.50",
+            },
+            HTTP_IF_MATCH='"0", "1"',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.cover, "Soft")
+        self.assertEqual(self.book.total_copies, 4)
+
+    def test_inventory_edit_changes_total_copies(self):
+        Book.objects.filter(pk=self.book.pk).update(
+            inventory=1, total_copies=3
+        )
+
+        response = self.patch({"inventory": 10}, HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["total_copies"], 12)
+        self.book.refresh_from_db()
+        self.assertEqual(
+            (self.book.inventory, self.book.total_copies), (10, 12)
+        )
+
+    def test_total_copies_edit_changes_inventory(self):
+        Book.objects.filter(pk=self.book.pk).update(
+            inventory=1, total_copies=3
+        )
+
+        response = self.patch({"total_copies": 5}, HTTP_IF_MATCH='"1"')
+        too_few = self.patch({"total_copies": 1}, HTTP_IF_MATCH='"2"')
+        mismatch = self.patch(
+            {"inventory": 4, "total_copies": 4}, HTTP_IF_MATCH='"2"'
+        )
+
+        self.assertEqual(response.data["inventory"], 3)
+        self.assertEqual(too_few.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(mismatch.status_code, status.HTTP_400_BAD_REQUEST)
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.inventory, self.book.total_copies), (3, 5))
+
+    def test_book_changed_after_read_is_not_overwritten(self):
+        """An edit that lands between get_object() and the UPDATE"""
+        get_object = BookViewSet.get_object
+
+        def get_object_then_edit(view):
+            book = get_object(view)
+            Book.objects.increment_inventory_per_book({book.pk: 1})
+
+            return book
+
+        with mock.patch.object(
+            BookViewSet, "get_object", get_object_then_edit
+        ):
+            response = self.patch({"inventory": 9}, HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(
+            response.status_code, status.HTTP_412_PRECONDITION_FAILED
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 3)
+
+    def test_update_does_not_save_whole_row(self):
+        with mock.patch(
+            "django.db.models.Model.save",
+            side_effect=AssertionError("save() called"),
+        ):
+            self.patch({"title": "Renamed"}, HTTP_IF_MATCH='"1"')
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.title, "Renamed")
+
+    def test_admin_save_changes_etag(self):
+        self.book.title = "Renamed"
+        self.book.save()
+
+        response = self.client.get(detail_url(self.book.id))
+
+        self.assertEqual(response["ETag"], '"2"')
@@ -0,0 +1,27 @@
+from django.test import SimpleTestCase, override_settings
+
+from books_service.checks import check_shared_cache
+
+LOCMEM = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+DATABASE_CACHE = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "library_cache",
+    }
+}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    @override_settings(CACHES=LOCMEM)
+    def test_process_local_cache_warns(self):
+        warnings = check_shared_cache(None)
+
+        self.assertEqual(
+            [warning.id for warning in warnings], ["books_service.W001"]
+        )
+
+    @override_settings(CACHES=DATABASE_CACHE)
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
@@ -0,0 +1,302 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from books_service.cache import get_catalog_version
+from books_service.models import AvailabilityEvent, Book
+from borrowings_service.models import Borrowing, Hold, HoldStatus
+
+
+def sample_book(**params):
+    defaults = {
+        "title": "Kobzar",
+        "author": "Taras Shevchenko",
+        "cover": "Hard",
+        "inventory": 2,
+        "daily_fee": "2.00",
+    }
+    defaults.update(params)
+
+    return Book.objects.create(**defaults)
+
+
+class CatalogFileTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write_file(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as file:
+            file.write(content)
+
+        return path
+
+    def read_file(self, name):
+        with open(os.path.join(self.directory, name)) as file:
+            return file.read()
+
+    def import_books(self, path, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            "import_books", path, stdout=stdout, stderr=stderr, **options
+        )
+
+        return stdout.getvalue(), stderr.getvalue()
+
+
+class ImportBooksCommandTests(CatalogFileTestCase):
+    def test_import_csv_creates_and_updates_by_title_and_author(self):
+        existing = sample_book()
+        path = self.write_file(
+            "books.csv",
+            "title,author,cover,inventory,daily_fee\n"
+            "Kobzar,Taras Shevchenko,Soft,5,1.50\n"
+            "Haidamaky,Taras Shevchenko,Hard,3,2.25\n",
+        )
+
+        stdout, _ = self.import_books(path, chunk_size=1)
+        existing.refresh_from_db()
+
+        self.assertIn("Created 1, updated 1, skipped 0", stdout)
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(existing.cover, "Soft")
+        self.assertEqual(existing.inventory, 5)
+        self.assertEqual(existing.daily_fee, Decimal("1.50"))
+        self.assertEqual(existing.version, 2)
+        self.assertTrue(
+            Book.objects.filter(
+                title="Haidamaky", daily_fee=Decimal("2.25")
+            ).exists()
+        )
+
+    def test_import_jsonl(self):
+        path = self.write_file(
+            "books.jsonl",
+            json.dumps({
+                "title": "The Forest Song",
+                "author": "Lesya Ukrainka",
+                "cover": "Soft",
+                "inventory": 4,
+                "daily_fee": "0.99",
+            }) + "\n",
+        )
+
+        self.import_books(path)
+
+        self.assertEqual(
+            Book.objects.get(title="The Forest Song").inventory, 4
+        )
+
+    def test_import_skips_invalid_rows(self):
+        path = self.write_file(
+            "books.csv",
+            "title,author,cover,inventory,daily_fee\n"
+            "Bad cover,Author,Paper,1,1.00\n"
+            "Bad fee,Author,Hard,1,1.005\n"
+            "Too expensive,Author,Hard,1,1000.00\n"
+            "Negative,Author,Hard,-1,1.00\n"
+            "Good,Author,Hard,1,1.00\n",
+        )
+
+        stdout, stderr = self.import_books(path)
+
+        self.assertIn("Created 1, updated 0, skipped 4", stdout)
+        self.assertIn("Line 2 skipped, cover", stderr)
+        self.assertIn("Line 3 skipped, daily_fee", stderr)
+        self.assertEqual(
+            list(Book.objects.values_list("title", flat=True)), ["Good"]
+        )
+
+    def test_import_invalidates_catalog_cache(self):
+        cache.clear()
+        version = get_catalog_version()
+        path = self.write_file(
+            "books.csv",
+            "title,author,cover,inventory,daily_fee\n"
+            "Good,Author,Hard,1,1.00\n",
+        )
+
+        self.import_books(path)
+
+        self.assertNotEqual(get_catalog_version(), version)
+
+
+    def test_import_bumps_catalog_version_per_chunk(self):
+        path = self.write_file(
+            "books.csv",
+            "title,author,cover,inventory,daily_fee\n"
+            "Good,Author,Hard,1,1.00\n"
+            "Better,Author,Hard,1,1.00\n",
+        )
+
+        with mock.patch(
+            "books_service.management.commands.import_books."
+            "bump_catalog_version"
+        ) as bump:
+            self.import_books(path, chunk_size=1)
+
+        self.assertEqual(bump.call_count, 2)
+
+    def test_import_records_events_for_imported_books_only(self):
+        existing = sample_book()
+        namesake = sample_book(author="Another Author")
+        AvailabilityEvent.objects.all().delete()
+        path = self.write_file(
+            "books.csv",
+            "title,author,cover,inventory,daily_fee\n"
+            "Kobzar,Taras Shevchenko,Soft,5,1.50\n"
+            "Haidamaky,Taras Shevchenko,Hard,3,2.25\n",
+        )
+
+        self.import_books(path)
+
+        created = Book.objects.get(title="Haidamaky")
+        self.assertEqual(
+            sorted(
+                AvailabilityEvent.objects.values_list("book_id", "inventory")
+            ),
+            sorted([(existing.id, 5), (created.id, 3)]),
+        )
+        self.assertFalse(
+            AvailabilityEvent.objects.filter(book=namesake).exists()
+        )
+
+
+class ExportBooksCommandTests(CatalogFileTestCase):
+    def test_export_csv_round_trips_through_import(self):
+        sample_book()
+        sample_book(title="Haidamaky", cover="Soft", daily_fee="0.50")
+        path = os.path.join(self.directory, "books.csv")
+
+        call_command("export_books", path, chunk_size=1, stdout=StringIO())
+        Book.objects.all().delete()
+        self.import_books(path)
+
+        self.assertEqual(
+            list(
+                Book.objects.order_by("pk").values_list(
+                    "title", "cover", "daily_fee"
+                )
+            ),
+            [
+                ("Kobzar", "Hard", Decimal("2.00")),
+                ("Haidamaky", "Soft", Decimal("0.50")),
+            ],
+        )
+
+    def test_export_jsonl_to_stdout(self):
+        sample_book()
+        stdout = StringIO()
+
+        call_command("export_books", format="jsonl", stdout=stdout)
+
+        self.assertEqual(
+            json.loads(stdout.getvalue()),
+            {
+                "title": "Kobzar",
+                "author": "Taras Shevchenko",
+                "cover": "Hard",
+                "inventory": 2,
+                "total_copies": 2,
+                "daily_fee": "2.00",
+            },
+        )
+
+
+class ReconcileInventoryCommandTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email="user@mail.com", password="1qazcde3"
+        )
+        self.in_sync = sample_book(title="In sync", inventory=1)
+        self.drifted = sample_book(title="Drifted", inventory=5)
+        self.overbooked = sample_book(title="Overbooked", inventory=0)
+        Book.objects.filter(pk=self.in_sync.pk).update(total_copies=2)
+        Book.objects.filter(pk=self.drifted.pk).update(total_copies=3)
+        for book in (self.in_sync, self.drifted, self.overbooked):
+            Borrowing.objects.create(
+                borrow_date="2023-01-03",
+                expected_return_date="2023-01-08",
+                book=book,
+                user=user,
+            )
+        Borrowing.objects.create(
+            borrow_date="2023-01-03",
+            expected_return_date="2023-01-08",
+            actual_return_date="2023-01-05",
+            book=self.drifted,
+            user=user,
+        )
+
+    def reconcile(self, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            "reconcile_inventory",
+            *args,
+            chunk_size=2,
+            stdout=stdout,
+            stderr=stderr,
+        )
+
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_new_book_owns_its_inventory(self):
+        self.assertEqual(sample_book(inventory=4).total_copies, 4)
+
+    def test_report_drift_without_changing_books(self):
+        stdout, stderr = self.reconcile()
+        self.drifted.refresh_from_db()
+
+        self.assertIn(
+            f'Book {self.drifted.pk} "Drifted": inventory 5, expected 2',
+            stdout,
+        )
+        self.assertIn("Checked 3 books, 2 drifted", stdout)
+        self.assertIn(f"Book {self.overbooked.pk} has more", stderr)
+        self.assertEqual(self.drifted.inventory, 5)
+
+    def test_fix_drift(self):
+        cache.clear()
+        version = get_catalog_version()
+
+        stdout, _ = self.reconcile("--fix")
+
+        self.assertIn("Checked 3 books, 2 drifted, fixed 1", stdout)
+        self.assertEqual(
+            dict(Book.objects.values_list("title", "inventory")),
+            {"In sync": 1, "Drifted": 2, "Overbooked": 0},
+        )
+        self.assertNotEqual(get_catalog_version(), version)
+        self.assertIn("Checked 3 books, 1 drifted", self.reconcile()[0])
+
+    def test_copy_kept_for_ready_hold_is_not_drift(self):
+        held = sample_book(title="Held", inventory=0)
+        Book.objects.filter(pk=held.pk).update(total_copies=1)
+        Hold.objects.create(
+            book=held,
+            user=get_user_model().objects.create_user(
+                email="holder@mail.com", password="1qazcde3"
+            ),
+            status=HoldStatus.READY,
+        )
+
+        stdout, _ = self.reconcile("--fix")
+        held.refresh_from_db()
+
+        self.assertNotIn('"Held"', stdout)
+        self.assertIn("Checked 4 books, 2 drifted, fixed 1", stdout)
+        self.assertEqual(held.inventory, 0)
+
+    def test_check_runs_one_query_per_chunk(self):
+        with self.assertNumQueries(3):
+            self.reconcile()
@@ -30,3 +30,22 @@ class BookModelTests(TestCase):
 
         for field in expected_fields:
             self.assertIn(field, model_fields)
+
+    def test_increment_inventory_per_book(self):
+        other = Book.objects.create(
+            title="Haidamaky",
+            author="Taras Shevchenko",
+            cover="Soft",
+            inventory=1,
+            daily_fee=1.00,
+        )
+
+        updated = Book.objects.increment_inventory_per_book(
+            {self.book.pk: 2, other.pk: 3}
+        )
+
+        self.assertEqual(updated, 2)
+        self.assertEqual(
+            sorted(Book.objects.values_list("inventory", "version")),
+            [(4, 2), (9, 2)],
+        )
@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books_service.models import Book
+from library_service.testing import QueryBudgetMixin
+
+# Maximum queries per (URL name, method) on a cold catalog cache
+QUERY_BUDGETS = {
+    ("book-list", "get"): 1,
+    ("book-list", "post"): 2,
+    ("book-detail", "get"): 1,
+    ("book-detail", "patch"): 5,
+    ("book-detail", "delete"): 7,
+}
+ROWS = 10
+
+
+class BookQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_superuser(
+                email="admin@mail.com", password="1qazcde3"
+            )
+        )
+        self.books = [
+            Book.objects.create(
+                title=f"Book {index}",
+                author="Author",
+                cover="Hard",
+                inventory=5,
+                daily_fee="1.00",
+            )
+            for index in range(ROWS)
+        ]
+
+    def request(self, name, method, args=(), data=None, **extra):
+        budget = QUERY_BUDGETS[(name, method)]
+        url = reverse(f"books_service:{name}", args=args)
+
+        with self.assertMaxQueries(budget):
+            response = getattr(self.client, method)(
+                url, data, format="json", **extra
+            )
+
+        self.assertLess(response.status_code, 400, response.data)
+
+        return response
+
+    def test_every_endpoint_declares_a_budget(self):
+        self.assertBudgetsCoverNamespace(
+            "books_service", {name for name, _ in QUERY_BUDGETS}
+        )
+
+    def test_read_endpoints(self):
+        response = self.request("book-list", "get")
+        self.request("book-detail", "get", [self.books[0].id])
+
+        self.assertEqual(len(response.data["results"]), ROWS)
+
+    def test_write_endpoints(self):
+        self.request(
+            "book-list",
+            "post",
+            data={
+                "title": "Kobzar",
+                "author": "Taras Shevchenko",
+                "cover": "Hard",
+                "inventory": 3,
+                "daily_fee": "1.00",
+            },
+        )
+        self.request(
+            "book-detail",
+            "patch",
+            [self.books[0].id],
+            {"inventory": 1},
+            HTTP_IF_MATCH='"1"',
+        )
+        self.request("book-detail", "delete", [self.books[1].id])
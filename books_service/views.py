@@ -1,11 +1,145 @@
-from rest_framework import viewsets
+from django.db import transaction
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from rest_framework import status, viewsets
+from rest_framework.response import Response
 
+from books_service.cache import (
+    catalog_cache_key,
+    get_catalog_payload,
+    set_catalog_payload,
+)
 from books_service.models import Book
 from books_service.permissions import IsAdminOrReadOnly
+from books_service.preconditions import (
+    IF_MATCH_HEADER,
+    PreconditionFailed,
+    format_etag,
+    if_match_versions,
+)
+from books_service.search import search_text
 from books_service.serializers import BookSerializer
+from library_service.fastpath import ValuesListModelMixin, ValuesRenderer
+from library_service.pagination import RankedPageNumberPagination
 
+# Actions whose response is a single book and carries its ETag
+ETAG_ACTIONS = ("create", "retrieve", "update", "partial_update")
 
-class BookViewSet(viewsets.ModelViewSet):
+IF_MATCH_PARAMETER = OpenApiParameter(
+    IF_MATCH_HEADER,
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.HEADER,
+    required=True,
+    description="ETag of the book as last read (ex. \"3\")",
+)
+
+
+class BookViewSet(ValuesListModelMixin, viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAdminOrReadOnly]
+    values_renderer = ValuesRenderer(BookSerializer)
+    read_from_replicas = True
+
+    def _get_search_text(self):
+        if self.action != "list":
+            return None
+
+        return search_text(self.request.query_params)
+
+    def get_queryset(self):
+        queryset = self.queryset
+        search = self._get_search_text()
+
+        if search is not None:
+            queryset = queryset.search(search)
+
+        return queryset
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if self._get_search_text() is not None:
+                self._paginator = RankedPageNumberPagination()
+            else:
+                self._paginator = super().paginator
+
+        return self._paginator
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "search",
+                type=OpenApiTypes.STR,
+                description="Search by title and author word prefixes, "
+                            "best matches first (ex. ?search=shev kob)",
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        key = catalog_cache_key("list", request.build_absolute_uri())
+        payload = get_catalog_payload(key)
+
+        if payload is None:
+            response = super().list(request, *args, **kwargs)
+            set_catalog_payload(key, response.data)
+
+            return response
+
+        return Response(payload)
+
+    def retrieve(self, request, *args, **kwargs):
+        key = catalog_cache_key("detail", kwargs["pk"])
+        payload = get_catalog_payload(key)
+
+        if payload is None:
+            response = super().retrieve(request, *args, **kwargs)
+            set_catalog_payload(key, response.data)
+
+            return response
+
+        return Response(payload)
+
+    @extend_schema(parameters=[IF_MATCH_PARAMETER])
+    def update(self, request, *args, **kwargs):
+        """Apply the edit only if the book is still at a version listed
+        in If-Match"""
+        versions = if_match_versions(request)
+        partial = kwargs.pop("partial", False)
+        book = self.get_object()
+
+        if versions is not None and book.version not in versions:
+            raise PreconditionFailed()
+
+        serializer = self.get_serializer(
+            book, data=request.data, partial=partial
+        )
+        serializer.is_valid(raise_exception=True)
+        fields = serializer.validated_data
+
+        # Writes only the sent columns, and nothing if the book changed
+        # since get_object() read it
+        with transaction.atomic():
+            updated = Book.objects.filter(pk=book.pk).update_if_version(
+                book.version, **fields
+            )
+        if not updated:
+            raise PreconditionFailed()
+
+        for name, value in fields.items():
+            setattr(book, name, value)
+        book.version += 1
+
+        return Response(serializer.data)
+
+    @extend_schema(parameters=[IF_MATCH_PARAMETER])
+    def partial_update(self, request, *args, **kwargs):
+        return super().partial_update(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.action in ETAG_ACTIONS and status.is_success(
+            response.status_code
+        ):
+            response["ETag"] = format_etag(response.data["version"])
+
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
-from borrowings_service.models import Borrowing
+from borrowings_service.models import Borrowing, Hold
 
 admin.site.register(Borrowing)
+admin.site.register(Hold)
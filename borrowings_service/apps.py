@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_migrate
 
 
 class BorrowingsServiceConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "borrowings_service"
+
+    def ready(self):
+        from borrowings_service.history import (
+            create_history_view,
+            drop_history_view,
+        )
+
+        pre_migrate.connect(drop_history_view, sender=self)
+        post_migrate.connect(create_history_view, sender=self)
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from borrowings_service.async_views import borrowing_detail, borrowing_list
+
+app_name = "borrowings_service_async"
+
+urlpatterns = [
+    path("", borrowing_list, name="borrowing-list"),
+    path("<int:pk>/", borrowing_detail, name="borrowing-detail"),
+]
@@ -0,0 +1,58 @@
+from django.core.exceptions import ObjectDoesNotExist
+
+from borrowings_service.filters import get_borrowings
+from borrowings_service.serializers import BorrowingSerializer
+from borrowings_service.views import BORROWING_VALUES
+from library_service.async_api import (
+    async_read_view,
+    error_response,
+    json_response,
+    paginate,
+)
+from library_service.fieldsets import parse_fieldset
+from library_service.pagination import NewestFirstCursorPagination
+
+
+def _get_queryset(request, fieldset):
+    return get_borrowings(
+        request.user,
+        request.GET,
+        request.GET.get("include_archived") == "true",
+        fieldset,
+    )
+
+
+@async_read_view()
+async def borrowing_list(request):
+    fieldset = parse_fieldset(request.GET, BorrowingSerializer)
+    queryset = _get_queryset(request, fieldset)
+
+    if fieldset is None:
+        queryset = BORROWING_VALUES.values(queryset)
+        serialize = BORROWING_VALUES.render
+    else:
+
+        def serialize(borrowings):
+            return BorrowingSerializer(
+                borrowings, many=True, context={"fieldset": fieldset}
+            ).data
+
+    page = await paginate(
+        request, queryset, serialize, NewestFirstCursorPagination
+    )
+
+    return json_response(page)
+
+
+@async_read_view()
+async def borrowing_detail(request, pk):
+    fieldset = parse_fieldset(request.GET, BorrowingSerializer)
+
+    try:
+        borrowing = await _get_queryset(request, fieldset).aget(pk=pk)
+    except ObjectDoesNotExist:
+        return error_response("Not found.", 404)
+
+    return json_response(
+        BorrowingSerializer(borrowing, context={"fieldset": fieldset}).data
+    )
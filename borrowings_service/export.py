@@ -0,0 +1,53 @@
+import csv
+import json
+
+EXPORT_FIELDS = (
+    "id",
+    "borrow_date",
+    "expected_return_date",
+    "actual_return_date",
+    "book_id",
+    "book__title",
+    "user_id",
+    "user__email",
+)
+EXPORT_COLUMNS = (
+    "id",
+    "borrow_date",
+    "expected_return_date",
+    "actual_return_date",
+    "book_id",
+    "book_title",
+    "user_id",
+    "user_email",
+)
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/jsonl",
+}
+
+
+class _Echo:
+    """File-like object handing every written line straight back"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_jsonl(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str) + "\n"
+
+
+STREAMERS = {
+    "csv": stream_csv,
+    "jsonl": stream_jsonl,
+}
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+
+from borrowings_service.models import Borrowing, BorrowingHistory
+
+
+def _get_bool_from_param(parameter: str) -> bool:
+    if parameter == "active":
+        return True
+    elif parameter == "returned":
+        return False
+
+
+def filter_borrowings(queryset, user, query_params):
+    """Apply the is_active and user_id filters of the borrowing list and
+    restrict non-staff users to their own borrowings"""
+    is_active = _get_bool_from_param(query_params.get("is_active"))
+    user_id = query_params.get("user_id")
+
+    if is_active is not None:
+        queryset = queryset.filter(
+            actual_return_date__isnull=is_active
+        )
+
+    if user.is_staff and user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+
+    if not user.is_staff:
+        queryset = queryset.filter(user=user.id)
+
+    return queryset
+
+
+def restrict_to_fieldset(queryset, fields, expand):
+    """Load only the columns and relations the fieldset renders"""
+    columns = {"id"}
+    relations = []
+
+    for name in fields:
+        if name == "user":
+            relations.append("user")
+            columns |= {
+                f"user__{column}" for column in get_user_model().STR_FIELDS
+            }
+        elif name == "book":
+            columns.add("book")
+            if "book" in expand:
+                relations.append("book")
+        else:
+            columns.add(name)
+
+    queryset = queryset.select_related(None)
+    if relations:
+        queryset = queryset.select_related(*relations)
+
+    return queryset.only(*columns)
+
+
+def get_borrowings(user, query_params, include_archived=False, fieldset=None):
+    """Borrowings the user may see, filtered by the query parameters, as
+    both the sync and the async borrowing endpoints list them"""
+    model = BorrowingHistory if include_archived else Borrowing
+    queryset = filter_borrowings(
+        model.objects.select_related("book", "user"), user, query_params
+    )
+
+    if fieldset is not None:
+        queryset = restrict_to_fieldset(queryset, *fieldset)
+
+    return queryset
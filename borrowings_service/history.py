@@ -0,0 +1,40 @@
+"""The view behind BorrowingHistory, the union of the borrowing and the
+archive tables.
+
+SQLite refuses to rebuild a table a view depends on, so migrate drops
+the view before it runs any migration and creates it again once all of
+them ran. Migrations that rebuild either table need nothing extra.
+"""
+from django.db import connections
+
+HISTORY_VIEW = "borrowings_service_borrowinghistory"
+BORROWING_TABLE = "borrowings_service_borrowing"
+ARCHIVE_TABLE = "borrowings_service_archivedborrowing"
+
+HISTORY_COLUMNS = (
+    "id, borrow_date, expected_return_date, actual_return_date, "
+    "book_id, user_id"
+)
+CREATE_HISTORY_VIEW_SQL = (
+    f"CREATE VIEW IF NOT EXISTS {HISTORY_VIEW} AS "
+    f"SELECT {HISTORY_COLUMNS}, 0 AS archived FROM {BORROWING_TABLE} "
+    f"UNION ALL "
+    f"SELECT {HISTORY_COLUMNS}, 1 AS archived FROM {ARCHIVE_TABLE}"
+)
+
+
+def drop_history_view(using="default", **kwargs):
+    """pre_migrate receiver"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DROP VIEW IF EXISTS {HISTORY_VIEW}")
+
+
+def create_history_view(using="default", **kwargs):
+    """post_migrate receiver; skips databases migrated to a state
+    without both tables"""
+    connection = connections[using]
+    tables = set(connection.introspection.table_names())
+
+    if {BORROWING_TABLE, ARCHIVE_TABLE} <= tables:
+        with connection.cursor() as cursor:
+            cursor.execute(CREATE_HISTORY_VIEW_SQL)
@@ -0,0 +1,164 @@
+"""Idempotency-Key support for retried POST requests.
+
+The first request with a key stores its response for
+IDEMPOTENCY_KEY_HOURS, and retries with the same key and payload get that
+response back without running the view again. While the first request
+runs, the key is locked for IDEMPOTENCY_LOCK_SECONDS and concurrent
+duplicates are refused with 409, so a lock left by a crashed request
+frees itself. The view's writes and its stored response commit in one
+transaction. Server errors roll the view back and release the key to
+let the client retry.
+"""
+import json
+from datetime import timedelta
+from functools import wraps
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from borrowings_service.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field("key").max_length
+
+
+class IdempotencyKeyInUse(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = (
+        "A request with this Idempotency-Key is still being processed."
+    )
+    default_code = "idempotency_key_in_use"
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was used for a different request."
+    default_code = "idempotency_key_reused"
+
+
+def _fingerprint(request):
+    payload = json.dumps(
+        [request.method, request.path, request.data],
+        sort_keys=True,
+        cls=DjangoJSONEncoder,
+    )
+
+    return sha256(payload.encode()).hexdigest()
+
+
+def _claim(user, key, fingerprint):
+    """Return the stored key to replay, or lock the key for this request
+    and return it with status_code None"""
+    now = timezone.now()
+    lock = {
+        "fingerprint": fingerprint,
+        "status_code": None,
+        "response": None,
+        "locked_until": now + timedelta(
+            seconds=settings.IDEMPOTENCY_LOCK_SECONDS
+        ),
+        "expires_at": now + timedelta(hours=settings.IDEMPOTENCY_KEY_HOURS),
+    }
+    stored = IdempotencyKey.objects.filter(user=user, key=key).first()
+
+    if stored is None:
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    user=user, key=key, **lock
+                )
+        except IntegrityError:
+            # A concurrent duplicate inserted it first
+            raise IdempotencyKeyInUse()
+
+    live = stored.expires_at > now and (
+        stored.status_code is not None or stored.locked_until > now
+    )
+    if live:
+        if stored.fingerprint != fingerprint:
+            raise IdempotencyKeyReused()
+        if stored.status_code is None:
+            raise IdempotencyKeyInUse()
+
+        return stored
+
+    # Expired, or left locked by a request that never finished. The
+    # conditional update lets only one concurrent duplicate take it over
+    taken = IdempotencyKey.objects.filter(
+        pk=stored.pk,
+        locked_until=stored.locked_until,
+        expires_at=stored.expires_at,
+    ).update(**lock)
+    if not taken:
+        raise IdempotencyKeyInUse()
+
+    for name, value in lock.items():
+        setattr(stored, name, value)
+
+    return stored
+
+
+def _store_response(lock, response):
+    lock.update(status_code=response.status_code, response=response.data)
+
+
+def idempotent(view_method):
+    """Make a POST view method replay its response for a retried
+    request with the same Idempotency-Key header"""
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            raise ValidationError(
+                {
+                    IDEMPOTENCY_HEADER: (
+                        f"Ensure this header has no more than "
+                        f"{MAX_KEY_LENGTH} characters."
+                    )
+                }
+            )
+
+        stored = _claim(request.user, key, _fingerprint(request))
+        if stored.status_code is not None:
+            response = Response(stored.response, status=stored.status_code)
+            response[REPLAYED_HEADER] = "true"
+
+            return response
+
+        lock = IdempotencyKey.objects.filter(pk=stored.pk)
+        try:
+            # The view's writes commit together with the stored response,
+            # so a crash in between cannot leave a finished request that
+            # a retry would run again
+            with transaction.atomic():
+                try:
+                    response = view_method(self, request, *args, **kwargs)
+                except Exception as exc:
+                    # Client errors are stored and replayed like successes
+                    response = self.handle_exception(exc)
+
+                if response.status_code >= 500:
+                    transaction.set_rollback(True)
+                else:
+                    _store_response(lock, response)
+        except Exception:
+            lock.delete()
+            raise
+
+        if response.status_code >= 500:
+            lock.delete()
+
+        return response
+
+    return wrapper
@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from borrowings_service.models import Borrowing
+
+
+class Command(BaseCommand):
+    help = (
+        "Move borrowings returned more than --days days ago from the "
+        "borrowing table to the archive table"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        cutoff = date.today() - timedelta(days=options["days"])
+        archived = 0
+        last_pk = 0
+
+        while True:
+            # Keyset chunks keep every transaction short
+            with transaction.atomic():
+                ids = list(
+                    Borrowing.objects.filter(
+                        pk__gt=last_pk, actual_return_date__lt=cutoff
+                    )
+                    .order_by("pk")
+                    .values_list("pk", flat=True)[:options["chunk_size"]]
+                )
+                if not ids:
+                    break
+
+                archived += Borrowing.objects.filter(pk__in=ids).archive()
+
+            last_pk = ids[-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Archived {archived} borrowings")
+        )
@@ -0,0 +1,44 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from borrowings_service.models import Hold, HoldStatus
+
+
+class Command(BaseCommand):
+    help = (
+        "Expire ready holds that were not claimed in time and pass their "
+        "copies to the next waiting hold or back to the shelf"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = 0
+
+        while True:
+            # Found through hold_ready_expiry_idx, a chunk per transaction
+            with transaction.atomic():
+                holds = list(
+                    Hold.objects.select_for_update()
+                    .filter(status=HoldStatus.READY, expires_at__lte=now)
+                    .order_by("expires_at")
+                    .values_list("pk", "book_id")[:options["chunk_size"]]
+                )
+                if not holds:
+                    break
+
+                Hold.objects.filter(
+                    pk__in=[pk for pk, _ in holds]
+                ).update(status=HoldStatus.EXPIRED)
+                Hold.objects.release_copies(
+                    Counter(book_id for _, book_id in holds)
+                )
+
+            expired += len(holds)
+
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} holds"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from borrowings_service.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired idempotency keys; retries with them are handled "
+        "as new requests"
+    )
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.objects.filter(
+            expires_at__lte=timezone.now()
+        ).delete()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} idempotency keys")
+        )
@@ -0,0 +1,43 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def number_waiting_holds(apps, schema_editor):
+    Hold = apps.get_model("borrowings_service", "Hold")
+    ahead = (
+        Hold.objects.filter(
+            book=OuterRef("book"), status="waiting", pk__lte=OuterRef("pk")
+        )
+        .order_by()
+        .values("book")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    Hold.objects.filter(status="waiting").update(ticket=Subquery(ahead))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowings_service", "0009_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="hold",
+            name="ticket",
+            field=models.PositiveIntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(number_waiting_holds, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="hold",
+            name="hold_queue_idx",
+        ),
+        migrations.AddIndex(
+            model_name="hold",
+            index=models.Index(
+                fields=["book", "status", "ticket"], name="hold_queue_idx"
+            ),
+        ),
+    ]
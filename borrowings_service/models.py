@@ -1,11 +1,166 @@
-from datetime import date
+from collections import Counter
+from datetime import date, timedelta
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ValidationError
-from django.db import models
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models, router, transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from books_service.models import Book
+from borrowings_service.history import HISTORY_VIEW
+from stats_service.recorder import record_returns
+
+ALREADY_RETURNED_MESSAGE = _("Book have already returned")
+NOT_FOUND_MESSAGE = _("Not found.")
+
+
+class DaysBetween(models.Func):
+    """Whole days from the start date expression to the end one"""
+
+    arg_joiner = " - "
+    template = "(%(expressions)s)"
+    output_field = models.IntegerField()
+
+    def __init__(self, end, start, **extra):
+        super().__init__(end, start, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="CAST(julianday(%(expressions)s) AS INTEGER)",
+            arg_joiner=") - julianday(",
+            **extra_context,
+        )
+
+
+class BorrowingQuerySet(models.QuerySet):
+    def overdue(self, on=None, min_days=None):
+        """Active borrowings past their expected return date on the given
+        day, annotated with days_overdue and the fine owed for them"""
+        on = on or date.today()
+        latest_expected = on - timedelta(days=min_days or 1)
+
+        return (
+            self.filter(
+                actual_return_date__isnull=True,
+                expected_return_date__lte=latest_expected,
+            )
+            .annotate(
+                days_overdue=DaysBetween(
+                    models.Value(on, output_field=models.DateField()),
+                    "expected_return_date",
+                )
+            )
+            .annotate(
+                fine=models.ExpressionWrapper(
+                    models.F("book__daily_fee") * models.F("days_overdue"),
+                    output_field=models.DecimalField(
+                        max_digits=12, decimal_places=2
+                    ),
+                )
+            )
+        )
+
+    def return_books(self, borrowing_ids, actual_return_date):
+        """Return many borrowings with set-based UPDATEs.
+
+        Borrowings outside this queryset, already returned ones and ones
+        borrowed after actual_return_date are skipped and reported.
+        Returns the ids of returned borrowings and the errors per id.
+        """
+        borrowing_ids = list(dict.fromkeys(borrowing_ids))
+
+        while True:
+            with transaction.atomic():
+                returned, errors = self._return_books(
+                    borrowing_ids, actual_return_date
+                )
+
+                if returned is not None:
+                    return returned, errors
+
+    def _return_books(self, borrowing_ids, actual_return_date):
+        rows = (
+            self.select_for_update()
+            .filter(pk__in=borrowing_ids)
+            .values_list(
+                "pk",
+                "book_id",
+                "borrow_date",
+                "expected_return_date",
+                "actual_return_date",
+            )
+        )
+        found = {pk: dates for pk, *dates in rows}
+        returned_books = {}
+        errors = {}
+
+        for pk in borrowing_ids:
+            if pk not in found:
+                errors[pk] = [NOT_FOUND_MESSAGE]
+                continue
+
+            book_id, borrow_date, expected_return_date, returned_on = found[pk]
+
+            if returned_on is not None:
+                errors[pk] = [ALREADY_RETURNED_MESSAGE]
+                continue
+
+            try:
+                self.model.validate_dates(
+                    borrow_date,
+                    expected_return_date,
+                    actual_return_date,
+                    ValidationError,
+                )
+            except ValidationError as error:
+                errors[pk] = error.messages
+                continue
+
+            returned_books[pk] = book_id
+
+        updated = self.model.objects.filter(
+            pk__in=returned_books, actual_return_date__isnull=True
+        ).update(actual_return_date=actual_return_date)
+
+        if updated != len(returned_books):
+            # Some of them were returned concurrently, start over
+            transaction.set_rollback(True)
+            return None, None
+
+        if returned_books:
+            Hold.objects.release_copies(Counter(returned_books.values()))
+            record_returns(returned_books.values())
+
+        return list(returned_books), errors
+
+    def archive(self):
+        """Move these borrowings to the archive table, one INSERT ...
+        SELECT and one DELETE. Call it inside a transaction"""
+        db = router.db_for_write(self.model)
+        columns = [field.column for field in ArchivedBorrowing._meta.fields]
+        rows = self.using(db).order_by().values_list(
+            *[field.attname for field in ArchivedBorrowing._meta.fields]
+        )
+        try:
+            sql, params = rows.query.get_compiler(db).as_sql()
+        except EmptyResultSet:
+            return 0
+
+        with connections[db].cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {ArchivedBorrowing._meta.db_table} "
+                f"({', '.join(columns)}) {sql}",
+                params,
+            )
+
+        return self.using(db).delete()[0]
 
 
 class Borrowing(models.Model):
@@ -15,10 +170,29 @@ class Borrowing(models.Model):
     book = models.ForeignKey(
         Book, on_delete=models.CASCADE, related_name="borrowings"
     )
+    # Lookups by user are served by borrowing_user_return_idx
     user = models.ForeignKey(
-        get_user_model(), on_delete=models.CASCADE, related_name="borrowings"
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name="borrowings",
+        db_index=False,
     )
 
+    objects = BorrowingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "actual_return_date"],
+                name="borrowing_user_return_idx",
+            ),
+            models.Index(
+                fields=["id"],
+                name="borrowing_active_idx",
+                condition=models.Q(actual_return_date__isnull=True),
+            ),
+        ]
+
     @staticmethod
     def validate_dates(
             borrow_date,
@@ -51,3 +225,310 @@ class Borrowing(models.Model):
 
     def __str__(self):
         return f"{self.user} borrowed {self.book} {self.borrow_date}"
+
+
+class HoldStatus(models.TextChoices):
+    WAITING = "waiting", _("Waiting")
+    READY = "ready", _("Ready for pickup")
+    FULFILLED = "fulfilled", _("Fulfilled")
+    CANCELLED = "cancelled", _("Cancelled")
+    EXPIRED = "expired", _("Expired")
+
+
+ACTIVE_HOLD_STATUSES = (HoldStatus.WAITING, HoldStatus.READY)
+
+
+class HoldQuerySet(models.QuerySet):
+    def waiting(self):
+        return self.filter(status=HoldStatus.WAITING)
+
+    def ready(self):
+        """Holds keeping a copy off the shelf, expired ones included
+        until expire_holds passes their copies on"""
+        return self.filter(status=HoldStatus.READY)
+
+    def with_position(self):
+        """Annotate waiting holds with their place in the book's queue,
+        their ticket counted from the head's, which hold_queue_idx finds
+        without walking the queue"""
+        head = (
+            self.model.objects.waiting()
+            .filter(book=OuterRef("book"))
+            .order_by("ticket")
+            .values("ticket")[:1]
+        )
+
+        return self.annotate(
+            position=models.Case(
+                models.When(
+                    status=HoldStatus.WAITING,
+                    then=models.F("ticket") - Subquery(head) + 1,
+                ),
+                default=None,
+                output_field=models.IntegerField(),
+            )
+        )
+
+    def next_ticket(self, book):
+        """The ticket after the last waiting one of the book, evaluated
+        by the INSERT itself so that concurrent holds cannot share it"""
+        last = (
+            self.model.objects.waiting()
+            .filter(book=book)
+            .order_by("-ticket")
+            .values("ticket")[:1]
+        )
+
+        return Coalesce(Subquery(last), 0) + 1
+
+    def claim(self, user, book):
+        """Turn the user's ready hold on the book into a checkout of the
+        copy kept for it. Returns whether there was one to claim"""
+        return bool(
+            self.filter(
+                user=user,
+                book=book,
+                status=HoldStatus.READY,
+                expires_at__gt=timezone.now(),
+            ).update(status=HoldStatus.FULFILLED)
+        )
+
+    def claim_books(self, user, book_ids):
+        """Claim the user's ready holds on any of book_ids with one UPDATE.
+        Call it inside a transaction. Returns the ids of the books whose
+        kept copies were claimed"""
+        ready = (
+            self.ready()
+            .filter(
+                user=user, book__in=book_ids, expires_at__gt=timezone.now()
+            )
+            .select_for_update()
+        )
+        holds = dict(ready.values_list("pk", "book"))
+
+        if holds:
+            self.filter(pk__in=holds).update(status=HoldStatus.FULFILLED)
+
+        return set(holds.values())
+
+    def release_copies(self, amounts):
+        """Hand amounts[book_id] freed copies to the heads of the books'
+        hold queues and put the copies nobody waits for back on the shelf.
+
+        Call it inside the transaction that frees the copies. Each round
+        readies the oldest waiting hold of every book with copies left,
+        looked up through hold_queue_idx, so the cost does not grow with
+        the length of the queues.
+        """
+        amounts = Counter(amounts)
+        shelf = Counter()
+        expires_at = timezone.now() + timedelta(
+            hours=settings.HOLD_PICKUP_HOURS
+        )
+
+        while amounts:
+            heads = dict(
+                Book.objects.filter(pk__in=amounts)
+                .annotate(
+                    head=Subquery(
+                        self.model.objects.waiting()
+                        .filter(book=OuterRef("pk"))
+                        .order_by("ticket")
+                        .values("pk")[:1]
+                    )
+                )
+                .values_list("pk", "head")
+            )
+
+            for book_id in list(amounts):
+                if heads.get(book_id) is None:
+                    shelf[book_id] += amounts.pop(book_id)
+                    heads.pop(book_id, None)
+
+            if not heads:
+                break
+
+            readied = self.filter(
+                pk__in=heads.values(), status=HoldStatus.WAITING
+            ).update(status=HoldStatus.READY, expires_at=expires_at)
+
+            if readied != len(heads):
+                # Some heads were cancelled meanwhile
+                heads = dict(
+                    self.filter(
+                        pk__in=heads.values(),
+                        status=HoldStatus.READY,
+                        expires_at=expires_at,
+                    ).values_list("book", "pk")
+                )
+
+            amounts.subtract(heads.keys())
+            amounts = +amounts
+
+        if shelf:
+            Book.objects.increment_inventory_per_book(shelf)
+
+    def cancel(self, hold):
+        """Cancel an active hold, passing on the copy kept for a ready
+        one. Returns whether the hold was still active"""
+        with transaction.atomic():
+            for status in ACTIVE_HOLD_STATUSES:
+                if self.filter(pk=hold.pk, status=status).update(
+                    status=HoldStatus.CANCELLED
+                ):
+                    if status == HoldStatus.READY:
+                        self.release_copies({hold.book_id: 1})
+                    else:
+                        # Close the gap so that tickets stay positions
+                        self.waiting().filter(
+                            book=hold.book_id,
+                            ticket__gt=Subquery(
+                                self.filter(pk=hold.pk).values("ticket")
+                            ),
+                        ).update(ticket=models.F("ticket") - 1)
+
+                    return True
+
+        return False
+
+
+class Hold(models.Model):
+    """A user's place in the FIFO queue for a book with no copies left.
+
+    A returned copy readies the oldest waiting hold of its book and is
+    kept off the shelf until the hold is claimed by a checkout or
+    expires. The waiting holds of a book carry consecutive tickets in
+    arrival order, so a hold's position is its ticket minus the head's.
+    """
+
+    # Lookups by book are served by hold_queue_idx
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="holds", db_index=False
+    )
+    user = models.ForeignKey(
+        get_user_model(), on_delete=models.CASCADE, related_name="holds"
+    )
+    status = models.CharField(
+        max_length=9, choices=HoldStatus.choices, default=HoldStatus.WAITING
+    )
+    ticket = models.PositiveIntegerField(editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(blank=True, null=True)
+
+    objects = HoldQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["book", "user"],
+                condition=Q(status__in=ACTIVE_HOLD_STATUSES),
+                name="hold_one_active_per_user_book",
+            ),
+        ]
+        indexes = [
+            # A book's queue in arrival order, for heads and positions
+            models.Index(
+                fields=["book", "status", "ticket"], name="hold_queue_idx"
+            ),
+            models.Index(
+                fields=["expires_at"],
+                name="hold_ready_expiry_idx",
+                condition=Q(status=HoldStatus.READY),
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        drawn = self.ticket is None
+        if drawn:
+            self.ticket = Hold.objects.next_ticket(self.book_id)
+
+        super().save(*args, **kwargs)
+
+        if drawn:
+            # Deferred, so that the drawn ticket is read back on first use
+            del self.ticket
+
+    def __str__(self):
+        return f"{self.user} holds {self.book} ({self.status})"
+
+
+class ArchivedBorrowing(models.Model):
+    """A returned borrowing moved out of the hot borrowing table by the
+    archive_borrowings command. Keeps its original id"""
+
+    # Set from the borrowing, an auto field only so that SQLite stores it
+    # as the rowid and the user and book indexes come ordered by it
+    id = models.BigAutoField(primary_key=True)
+    borrow_date = models.DateField()
+    expected_return_date = models.DateField()
+    actual_return_date = models.DateField()
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="archived_borrowings"
+    )
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name="archived_borrowings",
+    )
+
+    def __str__(self):
+        return f"{self.user} borrowed {self.book} {self.borrow_date}"
+
+
+class BorrowingHistory(models.Model):
+    """Read-only union of the borrowing and the archive tables, backed
+    by a database view so that filters, joins and pagination apply to
+    both tables as to one"""
+
+    borrow_date = models.DateField()
+    expected_return_date = models.DateField()
+    actual_return_date = models.DateField(blank=True, null=True)
+    book = models.ForeignKey(
+        Book, on_delete=models.DO_NOTHING, related_name="+"
+    )
+    user = models.ForeignKey(
+        get_user_model(), on_delete=models.DO_NOTHING, related_name="+"
+    )
+    archived = models.BooleanField()
+
+    objects = BorrowingQuerySet.as_manager()
+
+    class Meta:
+        managed = False
+        db_table = HISTORY_VIEW
+
+
+class IdempotencyKey(models.Model):
+    """An Idempotency-Key a user sent and the response to its first
+    request. status_code is None while that request holds the lock"""
+
+    # Lookups by user are served by the unique constraint's index
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name="idempotency_keys",
+        db_index=False,
+    )
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    response = models.JSONField(
+        blank=True, null=True, encoder=DjangoJSONEncoder
+    )
+    locked_until = models.DateTimeField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="idempotency_key_per_user"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["expires_at"], name="idempotency_key_expiry_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.key}"
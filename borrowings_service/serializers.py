@@ -1,14 +1,29 @@
-from django.db import transaction
+from collections import Counter
+from datetime import date
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 
+from books_service.models import Book
 from books_service.serializers import BookSerializer
-from borrowings_service.models import Borrowing
+from borrowings_service.models import Borrowing, Hold
+from library_service.fieldsets import SparseFieldsetSerializerMixin
+from stats_service.recorder import record_checkouts
+
+BOOK_NOT_AVAILABLE_MESSAGE = "Such book is not available in the library"
+BOOK_AVAILABLE_MESSAGE = "Such book is available, check it out instead"
+ALREADY_HOLDING_MESSAGE = "You already hold this book"
 
 
-class BorrowingSerializer(serializers.ModelSerializer):
+class BorrowingSerializer(
+    SparseFieldsetSerializerMixin, serializers.ModelSerializer
+):
     book = BookSerializer(read_only=True)
     user = serializers.StringRelatedField(read_only=True)
 
+    expandable_fields = ("book",)
+
     class Meta:
         model = Borrowing
         fields = (
@@ -21,6 +36,34 @@ class BorrowingSerializer(serializers.ModelSerializer):
         )
 
 
+class BorrowingOverdueSerializer(serializers.ModelSerializer):
+    book_title = serializers.CharField(source="book.title", read_only=True)
+    user_email = serializers.EmailField(source="user.email", read_only=True)
+    days_overdue = serializers.IntegerField(read_only=True)
+    fine = serializers.DecimalField(
+        max_digits=12, decimal_places=2, read_only=True
+    )
+
+    class Meta:
+        model = Borrowing
+        fields = (
+            "id",
+            "borrow_date",
+            "expected_return_date",
+            "book",
+            "book_title",
+            "user",
+            "user_email",
+            "days_overdue",
+            "fine",
+        )
+
+
+class BorrowingOverdueFilterSerializer(serializers.Serializer):
+    book_id = serializers.IntegerField(required=False)
+    min_days = serializers.IntegerField(required=False, min_value=1)
+
+
 class BorrowingCreateSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
 
@@ -38,16 +81,24 @@ class BorrowingCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         with transaction.atomic():
             book = validated_data.get("book")
+            taken = Hold.objects.claim(
+                validated_data["user"], book
+            ) or Book.objects.filter(pk=book.pk).decrement_inventory()
+
+            if not taken:
+                raise serializers.ValidationError(
+                    {"book": [BOOK_NOT_AVAILABLE_MESSAGE]}
+                )
+
             borrowing = Borrowing.objects.create(**validated_data)
-            book.inventory -= 1
-            book.save()
+            record_checkouts([borrowing])
 
             return borrowing
 
     def validate(self, attrs):
         data = super().validate(attrs=attrs)
         Borrowing.validate_dates(
-            attrs.get("borrow_date"),
+            attrs.get("borrow_date", date.today()),
             attrs.get("expected_return_date"),
             attrs.get("actual_return_date"),
             serializers.ValidationError
@@ -55,15 +106,124 @@ class BorrowingCreateSerializer(serializers.ModelSerializer):
 
         return data
 
-    def validate_book(self, value):
-        if value.inventory == 0:
-            raise serializers.ValidationError(
-                "Such book is not available in the library"
+
+class BorrowingBulkCreateSerializer(BorrowingCreateSerializer):
+    """Check out several books for the same dates in one transaction"""
+
+    books = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.MAX_BULK_SIZE,
+        write_only=True,
+    )
+
+    class Meta:
+        model = Borrowing
+        fields = ("borrow_date", "expected_return_date", "books")
+
+    def create(self, validated_data):
+        book_ids = validated_data.pop("books")
+        amounts = Counter(book_ids)
+
+        with transaction.atomic():
+            # Copies kept for the user's ready holds are taken from the
+            # holds, only the rest from the shelf
+            shelf = amounts - Counter(
+                Hold.objects.claim_books(validated_data["user"], amounts)
             )
-        return value
+            taken = (
+                Book.objects.decrement_inventory_per_book(shelf)
+                if shelf
+                else 0
+            )
+
+            if taken == len(shelf):
+                borrowings = Borrowing.objects.bulk_create(
+                    Borrowing(book_id=book_id, **validated_data)
+                    for book_id in book_ids
+                )
+                record_checkouts(borrowings)
+
+                return borrowings
+
+            transaction.set_rollback(True)
+
+        raise serializers.ValidationError(
+            {"books": self._unavailable_books_errors(book_ids, shelf)}
+        )
+
+    @staticmethod
+    def _unavailable_books_errors(book_ids, amounts):
+        """Report the books without amounts[book_id] copies on the shelf"""
+        inventories = dict(
+            Book.objects.filter(pk__in=amounts).values_list("pk", "inventory")
+        )
+        errors = {}
+
+        for index, book_id in enumerate(book_ids):
+            if book_id not in amounts:
+                # Taken from the user's ready hold
+                continue
+            if book_id not in inventories:
+                errors[index] = [
+                    f'Invalid pk "{book_id}" - object does not exist.'
+                ]
+            elif inventories[book_id] < amounts[book_id]:
+                errors[index] = [BOOK_NOT_AVAILABLE_MESSAGE]
+
+        return errors or [BOOK_NOT_AVAILABLE_MESSAGE]
 
 
 class BorrowingReturnSerializer(serializers.ModelSerializer):
     class Meta:
         model = Borrowing
         fields = ("actual_return_date",)
+
+
+class BorrowingBulkReturnSerializer(serializers.Serializer):
+    borrowings = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.MAX_BULK_SIZE,
+    )
+    actual_return_date = serializers.DateField()
+
+
+class BorrowingExportFilterSerializer(serializers.Serializer):
+    borrowed_from = serializers.DateField(required=False)
+    borrowed_to = serializers.DateField(required=False)
+    output = serializers.ChoiceField(
+        choices=("csv", "jsonl"), default="csv"
+    )
+
+
+class HoldSerializer(serializers.ModelSerializer):
+    position = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Hold
+        fields = (
+            "id",
+            "book",
+            "status",
+            "position",
+            "created_at",
+            "expires_at",
+        )
+        read_only_fields = ("status", "created_at", "expires_at")
+
+    def validate_book(self, book):
+        if book.inventory > 0:
+            raise serializers.ValidationError(BOOK_AVAILABLE_MESSAGE)
+
+        return book
+
+    def create(self, validated_data):
+        # hold_one_active_per_user_book rejects a second active hold
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {"book": [ALREADY_HOLDING_MESSAGE]}
+            )
@@ -0,0 +1,233 @@
+import json
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.sql import (
+    emit_post_migrate_signal,
+    emit_pre_migrate_signal,
+)
+from django.db import OperationalError, connection, models
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books_service.models import Book
+from borrowings_service.history import HISTORY_VIEW
+from borrowings_service.models import (
+    ArchivedBorrowing,
+    Borrowing,
+    BorrowingHistory,
+)
+from stats_service.models import BookCirculationStats, UserMonthlyLoans
+
+BORROWINGS_URL = reverse("borrowings_service:borrowing-list")
+BORROWINGS_EXPORT_URL = reverse("borrowings_service:borrowing-export")
+
+
+def detail_url(borrowing_id):
+    return reverse("borrowings_service:borrowing-detail", args=[borrowing_id])
+
+
+def archive(**options):
+    out = StringIO()
+    call_command("archive_borrowings", stdout=out, **options)
+
+    return out.getvalue()
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com", password="1qazcde3"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.book = Book.objects.create(
+            title="Kobzar",
+            author="Taras Shevchenko",
+            cover="Hard",
+            inventory=5,
+            daily_fee=1.00,
+        )
+        long_ago = date.today() - timedelta(days=800)
+        self.old = [
+            self.borrowing(long_ago, long_ago + timedelta(days=3))
+            for _ in range(3)
+        ]
+        self.recent = self.borrowing(date.today(), date.today())
+        self.active = self.borrowing(date.today(), None)
+
+    def borrowing(self, borrow_date, actual_return_date):
+        return Borrowing.objects.create(
+            borrow_date=borrow_date,
+            expected_return_date=borrow_date + timedelta(days=7),
+            actual_return_date=actual_return_date,
+            book=self.book,
+            user=self.user,
+        )
+
+    def test_archive_moves_old_returned_borrowings(self):
+        output = archive(chunk_size=2)
+
+        self.assertIn("Archived 3 borrowings", output)
+        self.assertEqual(
+            set(Borrowing.objects.values_list("id", flat=True)),
+            {self.recent.id, self.active.id},
+        )
+        archived = ArchivedBorrowing.objects.order_by("id")
+        self.assertEqual(
+            [borrowing.id for borrowing in archived],
+            [borrowing.id for borrowing in self.old],
+        )
+        self.assertEqual(
+            archived[0].actual_return_date, self.old[0].actual_return_date
+        )
+
+    def test_archive_respects_days(self):
+        archive(days=1000)
+
+        self.assertEqual(ArchivedBorrowing.objects.count(), 0)
+        self.assertEqual(Borrowing.objects.count(), 5)
+
+    def test_list_excludes_archived_by_default(self):
+        archive()
+
+        response = self.client.get(BORROWINGS_URL)
+
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]],
+            [self.active.id, self.recent.id],
+        )
+
+    def test_list_includes_archived_on_request(self):
+        archive()
+
+        response = self.client.get(
+            BORROWINGS_URL, {"include_archived": "true", "limit": 2}
+        )
+        ids = [row["id"] for row in response.data["results"]]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            ids += [row["id"] for row in response.data["results"]]
+
+        self.assertEqual(
+            ids,
+            [self.active.id, self.recent.id]
+            + [borrowing.id for borrowing in reversed(self.old)],
+        )
+
+    def test_filters_apply_to_archived(self):
+        archive()
+
+        response = self.client.get(
+            BORROWINGS_URL,
+            {"include_archived": "true", "is_active": "returned"},
+        )
+
+        self.assertEqual(len(response.data["results"]), 4)
+
+    def test_retrieve_archived_borrowing(self):
+        archive()
+        url = detail_url(self.old[0].id)
+
+        missing = self.client.get(url)
+        response = self.client.get(url, {"include_archived": "true"})
+
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["book"]["title"], "Kobzar")
+
+    def test_archived_borrowing_cannot_be_returned(self):
+        archive()
+
+        response = self.client.post(
+            reverse(
+                "borrowings_service:borrowing-return-book",
+                args=[self.old[0].id],
+            )
+            + "?include_archived=true",
+            {"actual_return_date": str(date.today())},
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_export_includes_archived_on_request(self):
+        self.user.is_staff = True
+        self.user.save()
+        archive()
+
+        response = self.client.get(
+            BORROWINGS_EXPORT_URL,
+            {"output": "jsonl", "include_archived": "true"},
+        )
+        content = b"".join(response.streaming_content).decode()
+
+        self.assertEqual(len(content.splitlines()), 5)
+        self.assertEqual(
+            json.loads(content.splitlines()[0])["id"], self.old[0].id
+        )
+
+    def test_rebuild_stats_counts_archived_borrowings(self):
+        archive()
+
+        call_command("rebuild_stats", stdout=StringIO())
+
+        stats = BookCirculationStats.objects.get(book=self.book)
+        self.assertEqual(stats.total_loans, 5)
+        self.assertEqual(stats.active_loans, 1)
+        self.assertEqual(
+            sum(UserMonthlyLoans.objects.values_list("loans", flat=True)), 5
+        )
+
+    def test_history_list_uses_indexes(self):
+        archive()
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(BORROWINGS_URL, {"include_archived": "true"})
+
+        queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if HISTORY_VIEW in query["sql"]
+        ]
+        self.assertTrue(queries)
+        with connection.cursor() as cursor:
+            for sql in queries:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                for row in cursor.fetchall():
+                    self.assertNotRegex(row[-1], r"^SCAN borrowings_")
+
+    def test_history_reports_archived_flag(self):
+        archive()
+
+        self.assertEqual(
+            BorrowingHistory.objects.filter(archived=True).count(), 3
+        )
+
+
+class HistoryViewMigrationTests(TransactionTestCase):
+    def rebuild_borrowing_table(self):
+        """Alter a column the way a migration would, which SQLite does
+        by copying the table into a new one"""
+        old = Borrowing._meta.get_field("expected_return_date")
+        new = models.DateField(null=True)
+        new.set_attributes_from_name("expected_return_date")
+        new.model = Borrowing
+
+        with connection.schema_editor() as editor:
+            editor.alter_field(Borrowing, old, new)
+            editor.alter_field(Borrowing, new, old)
+
+    def test_migrate_drops_view_around_migrations(self):
+        emit_pre_migrate_signal(verbosity=0, interactive=False, db="default")
+        self.rebuild_borrowing_table()
+        emit_post_migrate_signal(verbosity=0, interactive=False, db="default")
+
+        self.assertEqual(BorrowingHistory.objects.count(), 0)
+
+    def test_view_blocks_table_rebuild(self):
+        with self.assertRaises(OperationalError):
+            self.rebuild_borrowing_table()
@@ -0,0 +1,191 @@
+from io import StringIO
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books_service.models import Book
+from borrowings_service.models import Borrowing
+from borrowings_service.serializers import BorrowingSerializer
+
+ASYNC_BORROWINGS_URL = reverse("borrowings_service_async:borrowing-list")
+
+
+def sample_borrowing(user, book, **params):
+    defaults = {
+        "borrow_date": "2023-01-03",
+        "expected_return_date": "2023-01-08",
+        "actual_return_date": "2023-01-08",
+        "book": book,
+        "user": user,
+    }
+    defaults.update(params)
+
+    return Borrowing.objects.create(**defaults)
+
+
+class AsyncBorrowingsAPITests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com",
+            password="1qazcde3",
+            first_name="Bob",
+            last_name="Smith",
+        )
+        self.other_user = get_user_model().objects.create_user(
+            email="other@mail.com",
+            password="1qazcde3",
+        )
+        self.book = Book.objects.create(
+            title="Kobzar",
+            author="Taras Shevchenko",
+            cover="Hard",
+            inventory=5,
+            daily_fee=1.00,
+        )
+        self.active = sample_borrowing(
+            self.user, self.book, actual_return_date=None
+        )
+        self.returned = sample_borrowing(self.user, self.book)
+        self.foreign = sample_borrowing(self.other_user, self.book)
+        self.token = str(AccessToken.for_user(self.user))
+
+    def auth(self, token=None):
+        # AsyncClient in Django 4.1 takes extra headers by their raw names
+        return {"AUTHORIZE": f"Bearer {token or self.token}"}
+
+    async def test_auth_required(self):
+        response = await self.async_client.get(ASYNC_BORROWINGS_URL)
+
+        self.assertEqual(response.status_code, 401)
+
+    async def test_invalid_token_rejected(self):
+        response = await self.async_client.get(
+            ASYNC_BORROWINGS_URL, **self.auth("invalid")
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+    async def test_list_only_current_user_borrowings_newest_first(self):
+        response = await self.async_client.get(
+            ASYNC_BORROWINGS_URL, **self.auth()
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["results"],
+            BorrowingSerializer([self.returned, self.active], many=True).data,
+        )
+
+    async def test_filter_by_active_status(self):
+        response = await self.async_client.get(
+            ASYNC_BORROWINGS_URL, {"is_active": "active"}, **self.auth()
+        )
+
+        self.assertEqual(
+            [borrowing["id"] for borrowing in response.json()["results"]],
+            [self.active.id],
+        )
+
+    async def test_retrieve_only_own_borrowing(self):
+        own = await self.async_client.get(
+            reverse(
+                "borrowings_service_async:borrowing-detail",
+                args=[self.active.id],
+            ),
+            **self.auth(),
+        )
+        foreign = await self.async_client.get(
+            reverse(
+                "borrowings_service_async:borrowing-detail",
+                args=[self.foreign.id],
+            ),
+            **self.auth(),
+        )
+
+        self.assertEqual(own.json(), BorrowingSerializer(self.active).data)
+        self.assertEqual(foreign.status_code, 404)
+
+    async def test_list_pages_back_and_forth(self):
+        response = await self.async_client.get(
+            ASYNC_BORROWINGS_URL, {"page_size": 1}, **self.auth()
+        )
+        first_page = response.json()
+        response = await self.async_client.get(
+            first_page["next"], **self.auth()
+        )
+        second_page = response.json()
+        response = await self.async_client.get(
+            second_page["previous"], **self.auth()
+        )
+
+        self.assertEqual(
+            [borrowing["id"] for borrowing in second_page["results"]],
+            [self.active.id],
+        )
+        self.assertEqual(response.json()["results"], first_page["results"])
+
+    async def test_sparse_fieldset(self):
+        response = await self.async_client.get(
+            ASYNC_BORROWINGS_URL,
+            {"fields": "id,book", "is_active": "active"},
+            **self.auth(),
+        )
+
+        self.assertEqual(
+            response.json()["results"],
+            [{"id": self.active.id, "book": self.book.id}],
+        )
+
+    async def test_expand_book_on_detail(self):
+        response = await self.async_client.get(
+            reverse(
+                "borrowings_service_async:borrowing-detail",
+                args=[self.active.id],
+            ),
+            {"fields": "book", "expand": "book"},
+            **self.auth(),
+        )
+
+        self.assertEqual(response.json()["book"]["title"], "Kobzar")
+
+    async def test_unknown_field_rejected(self):
+        response = await self.async_client.get(
+            ASYNC_BORROWINGS_URL, {"fields": "secret"}, **self.auth()
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("fields", response.json())
+
+    async def test_include_archived(self):
+        await sync_to_async(call_command)(
+            "archive_borrowings", days=0, stdout=StringIO()
+        )
+
+        default = await self.async_client.get(
+            ASYNC_BORROWINGS_URL, **self.auth()
+        )
+        response = await self.async_client.get(
+            ASYNC_BORROWINGS_URL, {"include_archived": "true"}, **self.auth()
+        )
+
+        self.assertEqual(
+            [borrowing["id"] for borrowing in default.json()["results"]],
+            [self.active.id],
+        )
+        self.assertEqual(
+            [borrowing["id"] for borrowing in response.json()["results"]],
+            [self.returned.id, self.active.id],
+        )
+
+    async def test_manage_user(self):
+        response = await self.async_client.get(
+            reverse("customers_service_async:manage"), **self.auth()
+        )
+
+        self.assertEqual(response.json()["email"], "user@mail.com")
@@ -1,14 +1,30 @@
+import csv
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
 from books_service.models import Book
+from books_service.serializers import BookSerializer
 from borrowings_service.models import Borrowing
 from borrowings_service.serializers import BorrowingSerializer
+from borrowings_service.views import BORROWING_VALUES
 
 BORROWINGS_URL = reverse("borrowings_service:borrowing-list")
+BORROWINGS_BULK_URL = reverse("borrowings_service:borrowing-bulk-checkout")
+BORROWINGS_BULK_RETURN_URL = reverse(
+    "borrowings_service:borrowing-bulk-return"
+)
+BORROWINGS_EXPORT_URL = reverse("borrowings_service:borrowing-export")
+BORROWINGS_OVERDUE_URL = reverse("borrowings_service:borrowing-overdue")
 BORROWINGS_RETURN_URL = reverse("borrowings_service:borrowing-return-book", args=[1])
 
 
@@ -79,11 +95,11 @@ class AuthenticatedBorrowingsApiTests(TestCase):
 
         response = self.client.get(BORROWINGS_URL)
 
-        borrowings = Borrowing.objects.filter(user=user)
+        borrowings = Borrowing.objects.filter(user=user).order_by("-id")
         serializer = BorrowingSerializer(borrowings, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data["results"], serializer.data)
         self.assertEqual(borrowings.count(), 2)
 
     def test_borrowings_with_book_inventory_equal_zero(self):
@@ -149,9 +165,9 @@ class AuthenticatedBorrowingsApiTests(TestCase):
         serializer2 = BorrowingSerializer(borrowing2)
         serializer3 = BorrowingSerializer(borrowing3)
 
-        self.assertIn(serializer1.data, response.data)
-        self.assertIn(serializer2.data, response.data)
-        self.assertNotIn(serializer3.data, response.data)
+        self.assertIn(serializer1.data, response.data["results"])
+        self.assertIn(serializer2.data, response.data["results"])
+        self.assertNotIn(serializer3.data, response.data["results"])
 
     def test_filtering_borrowings_by_returned_status(self):
         book = sample_book()
@@ -167,9 +183,9 @@ class AuthenticatedBorrowingsApiTests(TestCase):
         serializer2 = BorrowingSerializer(borrowing2)
         serializer3 = BorrowingSerializer(borrowing3)
 
-        self.assertNotIn(serializer1.data, response.data)
-        self.assertIn(serializer2.data, response.data)
-        self.assertIn(serializer3.data, response.data)
+        self.assertNotIn(serializer1.data, response.data["results"])
+        self.assertIn(serializer2.data, response.data["results"])
+        self.assertIn(serializer3.data, response.data["results"])
 
 
 class AdminBorrowingsApiTests(TestCase):
@@ -202,11 +218,11 @@ class AdminBorrowingsApiTests(TestCase):
 
         response = self.client.get(BORROWINGS_URL)
 
-        borrowings = Borrowing.objects.all()
+        borrowings = Borrowing.objects.order_by("-id")
         serializer = BorrowingSerializer(borrowings, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data["results"], serializer.data)
         self.assertEqual(borrowings.count(), 4)
 
     def test_filtering_borrowings_by_user_id(self):
@@ -232,6 +248,517 @@ class AdminBorrowingsApiTests(TestCase):
         serializer2 = BorrowingSerializer(borrowing2)
         serializer3 = BorrowingSerializer(borrowing3)
 
-        self.assertIn(serializer1.data, response.data)
-        self.assertIn(serializer2.data, response.data)
-        self.assertNotIn(serializer3.data, response.data)
+        self.assertIn(serializer1.data, response.data["results"])
+        self.assertIn(serializer2.data, response.data["results"])
+        self.assertNotIn(serializer3.data, response.data["results"])
+
+    def test_list_borrowings_newest_first_by_cursor(self):
+        book = sample_book()
+        borrowings = [sample_borrowing(self.user, book) for _ in range(3)]
+
+        response = self.client.get(BORROWINGS_URL, {"page_size": 2})
+        ids = [borrowing["id"] for borrowing in response.data["results"]]
+
+        self.assertEqual(ids, [borrowings[2].id, borrowings[1].id])
+
+        response = self.client.get(response.data["next"])
+        ids = [borrowing["id"] for borrowing in response.data["results"]]
+
+        self.assertEqual(ids, [borrowings[0].id])
+        self.assertIsNone(response.data["next"])
+
+    def test_borrowing_sold_out_book_reports_not_available(self):
+        book = sample_book(inventory=1)
+        payload = {
+            "borrow_date": "2023-01-03",
+            "expected_return_date": "2023-01-08",
+            "book": book.id,
+        }
+        self.client.post(BORROWINGS_URL, payload)
+        response = self.client.post(BORROWINGS_URL, payload)
+        book.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("book", response.data)
+        self.assertEqual(book.inventory, 0)
+        self.assertEqual(Borrowing.objects.filter(book=book).count(), 1)
+
+    def test_checkout_and_return_refresh_cached_book(self):
+        book = sample_book(inventory=1)
+        book_url = reverse("books_service:book-detail", args=[book.id])
+        self.client.get(book_url)
+
+        response = self.client.post(BORROWINGS_URL, {
+            "borrow_date": "2023-01-03",
+            "expected_return_date": "2023-01-08",
+            "book": book.id,
+        })
+
+        self.assertEqual(self.client.get(book_url).data["inventory"], 0)
+
+        self.client.post(
+            reverse(
+                "borrowings_service:borrowing-return-book",
+                args=[response.data["id"]],
+            ),
+            {"actual_return_date": "2023-01-09"},
+        )
+
+        self.assertEqual(self.client.get(book_url).data["inventory"], 1)
+
+
+class BulkCheckoutApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com",
+            password="1qazcde3",
+        )
+        self.client.force_authenticate(self.user)
+        self.book1 = sample_book(title="sample1", inventory=2)
+        self.book2 = sample_book(title="sample2", inventory=1)
+
+    def checkout(self, books, **params):
+        payload = {
+            "borrow_date": "2023-01-03",
+            "expected_return_date": "2023-01-08",
+            "books": books,
+        }
+        payload.update(params)
+
+        return self.client.post(BORROWINGS_BULK_URL, payload, format="json")
+
+    def test_bulk_checkout_creates_borrowings_and_takes_copies(self):
+        response = self.checkout([self.book1.id, self.book2.id, self.book1.id])
+        self.book1.refresh_from_db()
+        self.book2.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [borrowing["book"] for borrowing in response.data],
+            [self.book1.id, self.book2.id, self.book1.id],
+        )
+        self.assertEqual(self.book1.inventory, 0)
+        self.assertEqual(self.book2.inventory, 0)
+        self.assertEqual(
+            Borrowing.objects.filter(user=self.user).count(), 3
+        )
+
+    def test_bulk_checkout_uses_constant_number_of_queries(self):
+        books = [sample_book(title=f"book{i}").id for i in range(10)]
+
+        with self.assertNumQueries(10):
+            response = self.checkout(books)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_bulk_checkout_fails_together_with_errors_per_item(self):
+        response = self.checkout([self.book1.id, self.book2.id, self.book2.id])
+        self.book1.refresh_from_db()
+        self.book2.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data["books"]), {1, 2})
+        self.assertEqual(self.book1.inventory, 2)
+        self.assertEqual(self.book2.inventory, 1)
+        self.assertFalse(Borrowing.objects.exists())
+
+    def test_bulk_checkout_reports_missing_books(self):
+        response = self.checkout([self.book1.id, 999])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data["books"]), [1])
+        self.assertFalse(Borrowing.objects.exists())
+
+    def test_bulk_checkout_validates_dates_once(self):
+        response = self.checkout(
+            [self.book1.id, self.book2.id], borrow_date="2023-01-10"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Borrowing.objects.exists())
+
+
+class BulkReturnApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com",
+            password="1qazcde3",
+        )
+        self.other_user = get_user_model().objects.create_user(
+            email="other@mail.com",
+            password="1qazcde3",
+        )
+        self.client.force_authenticate(self.user)
+        self.book1 = sample_book(title="sample1", inventory=0)
+        self.book2 = sample_book(title="sample2", inventory=0)
+
+    def return_books(self, borrowings, actual_return_date="2023-01-09"):
+        return self.client.post(
+            BORROWINGS_BULK_RETURN_URL,
+            {
+                "borrowings": borrowings,
+                "actual_return_date": actual_return_date,
+            },
+            format="json",
+        )
+
+    def test_bulk_return_closes_borrowings_and_restores_inventory(self):
+        borrowings = [
+            sample_borrowing(self.user, book, actual_return_date=None)
+            for book in (self.book1, self.book1, self.book2)
+        ]
+        ids = [borrowing.id for borrowing in borrowings]
+
+        with self.assertNumQueries(8):
+            response = self.return_books(ids)
+
+        self.book1.refresh_from_db()
+        self.book2.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["returned"], ids)
+        self.assertEqual(response.data["errors"], {})
+        self.assertEqual(self.book1.inventory, 2)
+        self.assertEqual(self.book2.inventory, 1)
+        self.assertFalse(
+            Borrowing.objects.filter(actual_return_date__isnull=True).exists()
+        )
+
+    def test_bulk_return_reports_instead_of_applying_twice(self):
+        active = sample_borrowing(self.user, self.book1, actual_return_date=None)
+        returned = sample_borrowing(self.user, self.book2)
+        foreign = sample_borrowing(
+            self.other_user, self.book2, actual_return_date=None
+        )
+
+        response = self.return_books([active.id, returned.id, foreign.id])
+        repeated = self.return_books([active.id])
+        self.book1.refresh_from_db()
+        self.book2.refresh_from_db()
+
+        self.assertEqual(response.data["returned"], [active.id])
+        self.assertEqual(
+            set(response.data["errors"]), {returned.id, foreign.id}
+        )
+        self.assertEqual(repeated.data["returned"], [])
+        self.assertIn(active.id, repeated.data["errors"])
+        self.assertEqual(self.book1.inventory, 1)
+        self.assertEqual(self.book2.inventory, 0)
+
+    def test_bulk_return_reports_return_before_borrow_date(self):
+        borrowing = sample_borrowing(
+            self.user, self.book1, actual_return_date=None
+        )
+
+        response = self.return_books([borrowing.id], "2023-01-01")
+        borrowing.refresh_from_db()
+
+        self.assertEqual(response.data["returned"], [])
+        self.assertIn(borrowing.id, response.data["errors"])
+        self.assertIsNone(borrowing.actual_return_date)
+
+
+class BorrowingsExportApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin.user@mail.com",
+            password="1qazcde3",
+        )
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com",
+            password="1qazcde3",
+        )
+        self.client.force_authenticate(self.admin)
+        self.book = sample_book(title="Kobzar")
+        self.active = sample_borrowing(
+            self.user, self.book, actual_return_date=None
+        )
+        self.returned = sample_borrowing(
+            self.admin,
+            self.book,
+            borrow_date="2023-02-01",
+            expected_return_date="2023-02-05",
+            actual_return_date="2023-02-03",
+        )
+
+    def export(self, **params):
+        response = self.client.get(BORROWINGS_EXPORT_URL, params)
+        content = b"".join(response.streaming_content).decode()
+
+        return response, content
+
+    def test_export_requires_staff(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(BORROWINGS_EXPORT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_streams_csv(self):
+        response, content = self.export()
+        rows = list(csv.DictReader(content.splitlines()))
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(
+            [row["id"] for row in rows],
+            [str(self.active.id), str(self.returned.id)],
+        )
+        self.assertEqual(rows[0]["book_title"], "Kobzar")
+        self.assertEqual(rows[0]["user_email"], "user@mail.com")
+        self.assertEqual(rows[0]["actual_return_date"], "")
+
+    def test_export_streams_jsonl(self):
+        _, content = self.export(output="jsonl")
+        rows = [json.loads(line) for line in content.splitlines()]
+
+        self.assertEqual(rows[1]["actual_return_date"], "2023-02-03")
+        self.assertEqual(rows[1]["user_id"], self.admin.id)
+
+    def test_export_filters(self):
+        _, active = self.export(output="jsonl", is_active="active")
+        _, by_user = self.export(output="jsonl", user_id=self.admin.id)
+        _, by_date = self.export(
+            output="jsonl", borrowed_from="2023-01-15", borrowed_to="2023-03-01"
+        )
+
+        for content, borrowing in (
+            (active, self.active),
+            (by_user, self.returned),
+            (by_date, self.returned),
+        ):
+            rows = [json.loads(line) for line in content.splitlines()]
+            self.assertEqual([row["id"] for row in rows], [borrowing.id])
+
+    def test_export_rejects_invalid_dates(self):
+        response = self.client.get(
+            BORROWINGS_EXPORT_URL, {"borrowed_from": "yesterday"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OverdueBorrowingsApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin.user@mail.com",
+            password="1qazcde3",
+        )
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com",
+            password="1qazcde3",
+        )
+        self.client.force_authenticate(self.admin)
+        today = date.today()
+        self.book = sample_book(title="Kobzar", daily_fee="1.50")
+        self.other_book = sample_book(title="Eneida", daily_fee="0.25")
+        self.late = sample_borrowing(
+            self.user,
+            self.book,
+            borrow_date=today - timedelta(days=20),
+            expected_return_date=today - timedelta(days=10),
+            actual_return_date=None,
+        )
+        self.slightly_late = sample_borrowing(
+            self.admin,
+            self.other_book,
+            borrow_date=today - timedelta(days=5),
+            expected_return_date=today - timedelta(days=1),
+            actual_return_date=None,
+        )
+        self.due_today = sample_borrowing(
+            self.user,
+            self.book,
+            borrow_date=today - timedelta(days=5),
+            expected_return_date=today,
+            actual_return_date=None,
+        )
+        self.returned_late = sample_borrowing(
+            self.user,
+            self.book,
+            borrow_date=today - timedelta(days=20),
+            expected_return_date=today - timedelta(days=10),
+            actual_return_date=today,
+        )
+
+    def overdue_ids(self, **params):
+        response = self.client.get(BORROWINGS_OVERDUE_URL, params)
+
+        return [borrowing["id"] for borrowing in response.data["results"]]
+
+    def test_overdue_computes_days_and_fine(self):
+        response = self.client.get(BORROWINGS_OVERDUE_URL)
+        late, slightly_late = (
+            sorted(response.data["results"], key=lambda row: row["id"])
+        )
+
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(late["id"], self.late.id)
+        self.assertEqual(late["days_overdue"], 10)
+        self.assertEqual(Decimal(late["fine"]), Decimal("15.00"))
+        self.assertEqual(late["book_title"], "Kobzar")
+        self.assertEqual(late["user_email"], "user@mail.com")
+        self.assertEqual(slightly_late["days_overdue"], 1)
+        self.assertEqual(Decimal(slightly_late["fine"]), Decimal("0.25"))
+
+    def test_overdue_uses_one_query(self):
+        with self.assertNumQueries(1):
+            self.client.get(BORROWINGS_OVERDUE_URL)
+
+    def test_overdue_only_own_borrowings_for_users(self):
+        self.client.force_authenticate(self.user)
+
+        self.assertEqual(self.overdue_ids(), [self.late.id])
+
+    def test_overdue_filters(self):
+        self.assertEqual(self.overdue_ids(user_id=self.admin.id), [
+            self.slightly_late.id
+        ])
+        self.assertEqual(self.overdue_ids(book_id=self.book.id), [
+            self.late.id
+        ])
+        self.assertEqual(self.overdue_ids(min_days=2), [self.late.id])
+
+    def test_overdue_paginated_newest_first(self):
+        response = self.client.get(BORROWINGS_OVERDUE_URL, {"page_size": 1})
+        next_page = self.client.get(response.data["next"])
+
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]],
+            [self.slightly_late.id],
+        )
+        self.assertEqual(
+            [row["id"] for row in next_page.data["results"]],
+            [self.late.id],
+        )
+
+    def test_overdue_rejects_invalid_min_days(self):
+        response = self.client.get(BORROWINGS_OVERDUE_URL, {"min_days": 0})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SparseFieldsetApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com",
+            password="1qazcde3",
+            first_name="Bob",
+            last_name="Smith",
+        )
+        self.client.force_authenticate(self.user)
+        self.book = sample_book(title="Kobzar")
+        self.borrowing = sample_borrowing(self.user, self.book)
+
+    def get_with_sql(self, url, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return response, context.captured_queries[-1]["sql"]
+
+    def test_fields_select_output_and_columns(self):
+        response, sql = self.get_with_sql(
+            BORROWINGS_URL, {"fields": "id,book,expected_return_date"}
+        )
+
+        self.assertEqual(
+            response.data["results"],
+            [
+                {
+                    "id": self.borrowing.id,
+                    "book": self.book.id,
+                    "expected_return_date": "2023-01-08",
+                }
+            ],
+        )
+        self.assertNotIn("books_service_book", sql)
+        self.assertNotIn("customers_service_user", sql)
+        self.assertNotIn("actual_return_date", sql)
+
+    def test_expand_book(self):
+        response, sql = self.get_with_sql(
+            BORROWINGS_URL, {"fields": "id,book", "expand": "book"}
+        )
+
+        self.assertEqual(
+            response.data["results"][0]["book"],
+            BookSerializer(self.book).data,
+        )
+        self.assertIn("books_service_book", sql)
+        self.assertNotIn("customers_service_user", sql)
+
+    def test_user_field_loads_only_its_name(self):
+        response, sql = self.get_with_sql(BORROWINGS_URL, {"fields": "user"})
+
+        self.assertEqual(response.data["results"], [{"user": "Bob Smith"}])
+        self.assertNotIn("password", sql)
+
+    def test_expand_without_fields_keeps_every_field(self):
+        response = self.client.get(BORROWINGS_URL, {"expand": "book"})
+
+        self.assertEqual(
+            response.data["results"],
+            BorrowingSerializer([self.borrowing], many=True).data,
+        )
+
+    def test_retrieve_with_fields(self):
+        response, _ = self.get_with_sql(
+            reverse(
+                "borrowings_service:borrowing-detail",
+                args=[self.borrowing.id],
+            ),
+            {"fields": "id,actual_return_date"},
+        )
+
+        self.assertEqual(
+            response.data,
+            {"id": self.borrowing.id, "actual_return_date": "2023-01-08"},
+        )
+
+    def test_unknown_fields_rejected(self):
+        response = self.client.get(
+            BORROWINGS_URL, {"fields": "id,secret", "expand": "user"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", response.data)
+        self.assertIn("expand", response.data)
+
+
+class BorrowingValuesRendererTests(TestCase):
+    def test_values_renderer_matches_serializer_bytes(self):
+        named = get_user_model().objects.create_user(
+            email="named@mail.com",
+            password="1qazcde3",
+            first_name="Bob",
+            last_name="Smith",
+        )
+        nameless = get_user_model().objects.create_user(
+            email="nameless@mail.com", password="1qazcde3"
+        )
+        for user, daily_fee, actual_return_date in (
+            (named, "1.5", None),
+            (nameless, "10", "2023-01-08"),
+        ):
+            sample_borrowing(
+                user,
+                sample_book(daily_fee=daily_fee),
+                actual_return_date=actual_return_date,
+            )
+        queryset = Borrowing.objects.select_related("book", "user")
+
+        self.assertEqual(
+            JSONRenderer().render(
+                BORROWING_VALUES.render(BORROWING_VALUES.values(queryset))
+            ),
+            JSONRenderer().render(
+                BorrowingSerializer(queryset, many=True).data
+            ),
+        )
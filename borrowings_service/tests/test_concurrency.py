@@ -0,0 +1,161 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, OperationalError
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TransactionTestCase
+from rest_framework.exceptions import ValidationError
+
+from books_service.models import Book
+from borrowings_service.models import Borrowing
+from borrowings_service.serializers import BorrowingCreateSerializer
+
+THREADS = 16
+CHECKOUT_ATTEMPTS = 200
+INVENTORY = 25
+
+
+def retry_when_locked(func, *args):
+    """The shared in-memory test database reports lock conflicts instead
+    of waiting for them like a file database with a busy timeout does,
+    so the workers wait and retry the whole transaction themselves."""
+    while True:
+        try:
+            return func(*args)
+        except OperationalError as error:
+            if "locked" not in str(error):
+                raise
+            time.sleep(0.001)
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com",
+            password="1qazcde3",
+        )
+        self.book = Book.objects.create(
+            title="Popular",
+            author="Author",
+            cover="Hard",
+            inventory=INVENTORY,
+            daily_fee=1.00,
+        )
+
+    def _checkout(self):
+        serializer = BorrowingCreateSerializer(data={
+            "borrow_date": "2023-01-03",
+            "expected_return_date": "2023-01-08",
+            "book": self.book.id,
+        })
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=self.user)
+
+    def _checkout_worker(self, _):
+        try:
+            retry_when_locked(self._checkout)
+            return True
+        except ValidationError:
+            return False
+        finally:
+            connection.close()
+
+    def test_concurrent_checkouts_never_oversell(self):
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            results = list(
+                executor.map(self._checkout_worker, range(CHECKOUT_ATTEMPTS))
+            )
+
+        self.book.refresh_from_db()
+
+        self.assertEqual(results.count(True), INVENTORY)
+        self.assertEqual(self.book.inventory, 0)
+        self.assertEqual(
+            Borrowing.objects.filter(book=self.book).count(), INVENTORY
+        )
+
+    def test_concurrent_decrements_and_increments_lose_no_updates(self):
+        def worker(index):
+            try:
+                if index % 2:
+                    return retry_when_locked(
+                        Book.objects.increment_inventory_per_book,
+                        {self.book.pk: 1},
+                    )
+                return retry_when_locked(
+                    Book.objects.filter(pk=self.book.pk).decrement_inventory
+                )
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            affected = list(executor.map(worker, range(CHECKOUT_ATTEMPTS)))
+
+        increments = sum(affected[1::2])
+        decrements = sum(affected[::2])
+        self.book.refresh_from_db()
+
+        self.assertEqual(
+            self.book.inventory, INVENTORY + increments - decrements
+        )
+
+
+class TunedSQLiteTests(SimpleTestCase):
+    """The tuned profile on a database file, as used outside of tests"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.connections = ConnectionHandler(
+            {
+                "default": {
+                    "NAME": os.path.join(directory.name, "db.sqlite3"),
+                    **settings.DATABASE_PROFILES["tuned"],
+                }
+            }
+        )
+        self.addCleanup(self.connections.close_all)
+
+    def query_value(self, sql):
+        with self.connections["default"].cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        self.assertEqual(self.query_value("PRAGMA journal_mode"), "wal")
+        self.assertEqual(self.query_value("PRAGMA synchronous"), 1)
+        self.assertEqual(self.query_value("PRAGMA busy_timeout"), 20000)
+        self.assertEqual(self.query_value("PRAGMA cache_size"), -65536)
+        self.assertEqual(
+            self.query_value("PRAGMA mmap_size"), 256 * 1024 * 1024
+        )
+
+    def test_concurrent_read_then_write_transactions_wait_for_lock(self):
+        with self.connections["default"].cursor() as cursor:
+            cursor.execute("CREATE TABLE counter (value integer)")
+            cursor.execute("INSERT INTO counter VALUES (0)")
+
+        def increment(_):
+            database = self.connections["default"]
+            try:
+                database._start_transaction_under_autocommit()
+                with database.cursor() as cursor:
+                    cursor.execute("SELECT value FROM counter")
+                    value = cursor.fetchone()[0]
+                    cursor.execute(
+                        "UPDATE counter SET value = %s", [value + 1]
+                    )
+                    cursor.execute("COMMIT")
+            finally:
+                database.close()
+
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            list(executor.map(increment, range(CHECKOUT_ATTEMPTS)))
+
+        self.assertEqual(
+            self.query_value("SELECT value FROM counter"), CHECKOUT_ATTEMPTS
+        )
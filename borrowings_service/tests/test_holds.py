@@ -0,0 +1,320 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from books_service.models import Book
+from borrowings_service.models import Borrowing, Hold, HoldStatus
+
+BORROWINGS_URL = reverse("borrowings_service:borrowing-list")
+HOLDS_URL = reverse("borrowings_service:hold-list")
+HOLD_TABLE = Hold._meta.db_table
+
+
+def hold_detail_url(hold_id):
+    return reverse("borrowings_service:hold-detail", args=[hold_id])
+
+
+def return_url(borrowing_id):
+    return reverse(
+        "borrowings_service:borrowing-return-book", args=[borrowing_id]
+    )
+
+
+class HoldApiTests(TestCase):
+    def setUp(self):
+        self.users = [
+            get_user_model().objects.create_user(
+                email=f"user{index}@mail.com", password="1qazcde3"
+            )
+            for index in range(3)
+        ]
+        self.clients = []
+        for user in self.users:
+            client = APIClient()
+            client.force_authenticate(user)
+            self.clients.append(client)
+        self.book = Book.objects.create(
+            title="Kobzar",
+            author="Taras Shevchenko",
+            cover="Hard",
+            inventory=1,
+            daily_fee=1.00,
+        )
+        self.borrowing = Borrowing.objects.create(
+            expected_return_date="2099-01-01",
+            book=self.book,
+            user=self.users[0],
+        )
+        Book.objects.filter(pk=self.book.pk).update(inventory=0)
+
+    def join_queue(self, client):
+        return client.post(HOLDS_URL, {"book": self.book.id})
+
+    def return_book(self):
+        return self.clients[0].post(
+            return_url(self.borrowing.id),
+            {"actual_return_date": str(date.today())},
+        )
+
+    def checkout(self, client):
+        return client.post(
+            BORROWINGS_URL,
+            {"book": self.book.id, "expected_return_date": "2099-01-01"},
+        )
+
+    def test_join_queue_reports_position(self):
+        first = self.join_queue(self.clients[1])
+        second = self.join_queue(self.clients[2])
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.data["status"], HoldStatus.WAITING)
+        self.assertEqual(first.data["position"], 1)
+        self.assertEqual(second.data["position"], 2)
+
+    def test_cancelling_waiting_hold_moves_later_holds_up(self):
+        first = self.join_queue(self.clients[1])
+        self.join_queue(self.clients[2])
+        self.clients[1].delete(hold_detail_url(first.data["id"]))
+
+        third = self.join_queue(self.clients[1])
+        response = self.clients[2].get(HOLDS_URL)
+
+        self.assertEqual(response.data["results"][0]["position"], 1)
+        self.assertEqual(third.data["position"], 2)
+
+    def test_holds_draw_consecutive_tickets(self):
+        first = Hold.objects.create(book=self.book, user=self.users[1])
+        second = Hold.objects.create(book=self.book, user=self.users[2])
+
+        self.assertEqual((first.ticket, second.ticket), (1, 2))
+
+    def test_cannot_hold_available_book(self):
+        Book.objects.filter(pk=self.book.pk).update(inventory=1)
+
+        response = self.join_queue(self.clients[1])
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_cannot_hold_same_book_twice(self):
+        self.join_queue(self.clients[1])
+
+        response = self.join_queue(self.clients[1])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Hold.objects.count(), 1)
+
+    def test_users_see_only_their_holds(self):
+        self.join_queue(self.clients[1])
+        self.join_queue(self.clients[2])
+
+        response = self.clients[1].get(HOLDS_URL)
+
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["position"], 1)
+
+    def test_return_readies_head_of_queue_instead_of_shelf(self):
+        self.join_queue(self.clients[1])
+        self.join_queue(self.clients[2])
+
+        response = self.return_book()
+
+        self.assertEqual(response.status_code, 200)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 0)
+        first, second = Hold.objects.order_by("id")
+        self.assertEqual(first.status, HoldStatus.READY)
+        self.assertIsNotNone(first.expires_at)
+        self.assertEqual(second.status, HoldStatus.WAITING)
+        response = self.clients[2].get(hold_detail_url(second.id))
+        self.assertEqual(response.data["position"], 1)
+
+    def test_return_without_holds_restocks_shelf(self):
+        self.return_book()
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 1)
+
+    def test_bulk_return_readies_holds(self):
+        self.join_queue(self.clients[1])
+
+        self.clients[0].post(
+            reverse("borrowings_service:borrowing-bulk-return"),
+            {
+                "borrowings": [self.borrowing.id],
+                "actual_return_date": str(date.today()),
+            },
+        )
+
+        self.assertEqual(Hold.objects.get().status, HoldStatus.READY)
+
+    def test_ready_hold_is_claimed_by_checkout(self):
+        self.join_queue(self.clients[1])
+        self.return_book()
+
+        other = self.checkout(self.clients[2])
+        response = self.checkout(self.clients[1])
+
+        self.assertEqual(other.status_code, 400)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Hold.objects.get().status, HoldStatus.FULFILLED)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 0)
+
+    def test_ready_hold_is_claimed_by_bulk_checkout(self):
+        other_book = Book.objects.create(
+            title="Haidamaky",
+            author="Taras Shevchenko",
+            cover="Hard",
+            inventory=1,
+            daily_fee=1.00,
+        )
+        self.join_queue(self.clients[1])
+        self.return_book()
+
+        def bulk_checkout(client):
+            return client.post(
+                reverse("borrowings_service:borrowing-bulk-checkout"),
+                {
+                    "books": [self.book.id, other_book.id],
+                    "expected_return_date": "2099-01-01",
+                },
+            )
+
+        other = bulk_checkout(self.clients[2])
+        response = bulk_checkout(self.clients[1])
+
+        self.assertEqual(other.status_code, 400)
+        self.assertEqual(list(other.data["books"]), [0])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Hold.objects.get().status, HoldStatus.FULFILLED)
+        self.assertEqual(
+            dict(Book.objects.values_list("title", "inventory")),
+            {"Kobzar": 0, "Haidamaky": 0},
+        )
+
+    def test_expired_hold_cannot_be_claimed(self):
+        self.join_queue(self.clients[1])
+        self.return_book()
+        Hold.objects.update(expires_at=timezone.now() - timedelta(hours=1))
+
+        response = self.checkout(self.clients[1])
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_cancel_waiting_hold(self):
+        hold_id = self.join_queue(self.clients[1]).data["id"]
+
+        response = self.clients[1].delete(hold_detail_url(hold_id))
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(Hold.objects.get().status, HoldStatus.CANCELLED)
+
+    def test_cancel_ready_hold_passes_copy_on(self):
+        first_id = self.join_queue(self.clients[1]).data["id"]
+        second_id = self.join_queue(self.clients[2]).data["id"]
+        self.return_book()
+
+        self.clients[1].delete(hold_detail_url(first_id))
+
+        self.assertEqual(
+            Hold.objects.get(pk=second_id).status, HoldStatus.READY
+        )
+
+    def test_cancel_inactive_hold(self):
+        hold_id = self.join_queue(self.clients[1]).data["id"]
+        Hold.objects.update(status=HoldStatus.FULFILLED)
+
+        response = self.clients[1].delete(hold_detail_url(hold_id))
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_expire_holds_passes_copies_on(self):
+        self.join_queue(self.clients[1])
+        self.join_queue(self.clients[2])
+        self.return_book()
+        Hold.objects.filter(status=HoldStatus.READY).update(
+            expires_at=timezone.now() - timedelta(hours=1)
+        )
+
+        call_command("expire_holds", stdout=StringIO())
+
+        first, second = Hold.objects.order_by("id")
+        self.assertEqual(first.status, HoldStatus.EXPIRED)
+        self.assertEqual(second.status, HoldStatus.READY)
+
+        Hold.objects.filter(pk=second.pk).update(
+            expires_at=timezone.now() - timedelta(hours=1)
+        )
+        call_command("expire_holds", stdout=StringIO())
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 1)
+
+
+class HoldQueuePlanTests(TestCase):
+    def setUp(self):
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(email=f"user{index}@mail.com")
+            for index in range(20)
+        )
+        self.book = Book.objects.create(
+            title="Kobzar",
+            author="Taras Shevchenko",
+            cover="Hard",
+            inventory=0,
+            daily_fee=1.00,
+        )
+        Hold.objects.bulk_create(
+            Hold(book=self.book, user=user, ticket=ticket)
+            for ticket, user in enumerate(users, start=1)
+        )
+
+    def hold_query_plans(self, func):
+        with CaptureQueriesContext(connection) as context:
+            func()
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if HOLD_TABLE not in query["sql"]:
+                    continue
+                cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                plans.append([row[-1] for row in cursor.fetchall()])
+
+        return plans
+
+    def assert_uses_queue_index(self, plans):
+        self.assertTrue(plans)
+        for plan in plans:
+            self.assertTrue(
+                any("hold_queue_idx" in detail for detail in plan), plan
+            )
+            for detail in plan:
+                self.assertNotRegex(detail, rf"^SCAN {HOLD_TABLE}$")
+
+    def test_queue_head_lookup_uses_index(self):
+        plans = self.hold_query_plans(
+            lambda: Hold.objects.release_copies({self.book.id: 1})
+        )
+
+        self.assert_uses_queue_index(plans[:1])
+
+    def test_position_lookup_uses_index(self):
+        hold = Hold.objects.order_by("id").last()
+
+        plans = self.hold_query_plans(
+            lambda: Hold.objects.with_position().get(pk=hold.pk)
+        )
+
+        self.assert_uses_queue_index(plans)
+        self.assertEqual(
+            Hold.objects.with_position().get(pk=hold.pk).position, 20
+        )
@@ -0,0 +1,211 @@
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from books_service.models import Book
+from borrowings_service.idempotency import REPLAYED_HEADER
+from borrowings_service.models import Borrowing, IdempotencyKey
+
+BORROWINGS_URL = reverse("borrowings_service:borrowing-list")
+WRITES = ("INSERT", "UPDATE", "DELETE", "SAVEPOINT")
+
+
+def return_url(borrowing_id):
+    return reverse(
+        "borrowings_service:borrowing-return-book", args=[borrowing_id]
+    )
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com", password="1qazcde3"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.book = Book.objects.create(
+            title="Kobzar",
+            author="Taras Shevchenko",
+            cover="Hard",
+            inventory=3,
+            daily_fee=1.00,
+        )
+        self.payload = {
+            "book": self.book.id,
+            "expected_return_date": "2099-01-01",
+        }
+
+    def checkout(self, key="checkout-1", payload=None):
+        return self.client.post(
+            BORROWINGS_URL,
+            payload or self.payload,
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def lock_key(self, lock_left):
+        """Leave checkout-1 locked as by a request still running, or by
+        one that crashed when lock_left is negative"""
+        self.checkout()
+        IdempotencyKey.objects.update(
+            status_code=None,
+            response=None,
+            locked_until=timezone.now() + lock_left,
+        )
+
+    def test_retried_checkout_is_replayed(self):
+        first = self.checkout()
+        with CaptureQueriesContext(connection) as context:
+            retry = self.checkout()
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry[REPLAYED_HEADER], "true")
+        self.assertNotIn(REPLAYED_HEADER, first)
+        self.assertEqual(Borrowing.objects.count(), 1)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 2)
+        for query in context.captured_queries:
+            self.assertFalse(query["sql"].startswith(WRITES), query["sql"])
+
+    def test_failed_response_store_rolls_back_checkout(self):
+        with mock.patch(
+            "borrowings_service.idempotency._store_response",
+            side_effect=DatabaseError,
+        ):
+            with self.assertRaises(DatabaseError):
+                self.checkout()
+
+        self.assertFalse(Borrowing.objects.exists())
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 3)
+
+        retry = self.checkout()
+
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(Borrowing.objects.count(), 1)
+
+    def test_different_keys_checkout_twice(self):
+        self.checkout("checkout-1")
+        self.checkout("checkout-2")
+
+        self.assertEqual(Borrowing.objects.count(), 2)
+
+    def test_checkout_without_key_is_not_stored(self):
+        self.client.post(BORROWINGS_URL, self.payload)
+
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_keys_are_per_user(self):
+        self.checkout()
+        other = get_user_model().objects.create_user(
+            email="other@mail.com", password="1qazcde3"
+        )
+        self.client.force_authenticate(other)
+
+        response = self.checkout()
+
+        self.assertNotIn(REPLAYED_HEADER, response)
+        self.assertEqual(Borrowing.objects.count(), 2)
+
+    def test_key_reused_for_different_request(self):
+        self.checkout()
+        other = Book.objects.create(
+            title="Other", author="Author", inventory=1, daily_fee=1.00
+        )
+
+        response = self.checkout(
+            payload={**self.payload, "book": other.id}
+        )
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Borrowing.objects.count(), 1)
+
+    def test_concurrent_duplicate_is_refused(self):
+        self.lock_key(timedelta(seconds=30))
+
+        response = self.checkout()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Borrowing.objects.count(), 1)
+
+    def test_abandoned_lock_is_taken_over(self):
+        self.lock_key(-timedelta(seconds=1))
+
+        response = self.checkout()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn(REPLAYED_HEADER, response)
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 201)
+
+    def test_expired_key_runs_request_again(self):
+        self.checkout()
+        IdempotencyKey.objects.update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        response = self.checkout()
+
+        self.assertNotIn(REPLAYED_HEADER, response)
+        self.assertEqual(Borrowing.objects.count(), 2)
+
+    def test_client_errors_are_replayed(self):
+        Book.objects.filter(pk=self.book.pk).update(inventory=0)
+        first = self.checkout()
+        Book.objects.filter(pk=self.book.pk).update(inventory=3)
+
+        retry = self.checkout()
+
+        self.assertEqual(first.status_code, 400)
+        self.assertEqual(retry.status_code, 400)
+        self.assertEqual(retry.data, first.data)
+        self.assertFalse(Borrowing.objects.exists())
+
+    def test_overlong_key_is_rejected(self):
+        response = self.checkout(key="k" * 256)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Borrowing.objects.exists())
+
+    def test_retried_return_is_replayed(self):
+        borrowing = Borrowing.objects.create(
+            expected_return_date="2099-01-01", book=self.book, user=self.user
+        )
+        payload = {"actual_return_date": str(date.today())}
+
+        first = self.client.post(
+            return_url(borrowing.id), payload, HTTP_IDEMPOTENCY_KEY="return"
+        )
+        retry = self.client.post(
+            return_url(borrowing.id), payload, HTTP_IDEMPOTENCY_KEY="return"
+        )
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry[REPLAYED_HEADER], "true")
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 4)
+
+    def test_prune_deletes_expired_keys(self):
+        self.checkout("checkout-1")
+        self.checkout("checkout-2")
+        IdempotencyKey.objects.filter(key="checkout-1").update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        call_command("prune_idempotency_keys", stdout=StringIO())
+
+        self.assertEqual(
+            list(IdempotencyKey.objects.values_list("key", flat=True)),
+            ["checkout-2"],
+        )
@@ -0,0 +1,169 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books_service.models import Book
+from borrowings_service.models import Borrowing, Hold
+from library_service.testing import QueryBudgetMixin
+
+# Maximum queries per (URL name, method), whatever the number of rows
+QUERY_BUDGETS = {
+    ("borrowing-list", "get"): 1,
+    ("borrowing-list", "post"): 13,
+    ("borrowing-detail", "get"): 1,
+    ("borrowing-bulk-checkout", "post"): 10,
+    ("borrowing-return-book", "post"): 8,
+    ("borrowing-bulk-return", "post"): 8,
+    ("borrowing-export", "get"): 1,
+    ("borrowing-overdue", "get"): 1,
+    ("hold-list", "get"): 1,
+    ("hold-list", "post"): 5,
+    ("hold-detail", "get"): 1,
+    ("hold-detail", "delete"): 5,
+}
+ROWS = 10
+
+
+class BorrowingQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@mail.com", password="1qazcde3"
+        )
+        self.client.force_authenticate(self.admin)
+        self.books = [
+            Book.objects.create(
+                title=f"Book {index}",
+                author="Author",
+                cover="Hard",
+                inventory=5,
+                daily_fee="1.00",
+            )
+            for index in range(ROWS)
+        ]
+        self.borrowings = [
+            Borrowing.objects.create(
+                borrow_date="2023-01-03",
+                expected_return_date="2023-01-08",
+                book=book,
+                user=get_user_model().objects.create_user(
+                    email=f"user{index}@mail.com", password="1qazcde3"
+                ),
+            )
+            for index, book in enumerate(self.books)
+        ]
+
+    def request(self, name, method, args=(), data=None):
+        budget = QUERY_BUDGETS[(name, method)]
+        url = reverse(f"borrowings_service:{name}", args=args)
+
+        with self.assertMaxQueries(budget):
+            response = getattr(self.client, method)(url, data, format="json")
+            if response.streaming:
+                b"".join(response.streaming_content)
+
+        self.assertLess(response.status_code, 400)
+
+        return response
+
+    def test_every_endpoint_declares_a_budget(self):
+        self.assertBudgetsCoverNamespace(
+            "borrowings_service", {name for name, _ in QUERY_BUDGETS}
+        )
+
+    def test_read_endpoints(self):
+        response = self.request("borrowing-list", "get")
+        self.request("borrowing-detail", "get", [self.borrowings[0].id])
+        self.request("borrowing-export", "get")
+        self.request("borrowing-overdue", "get")
+
+        self.assertEqual(len(response.data["results"]), ROWS)
+
+    def test_checkout_endpoints(self):
+        self.request(
+            "borrowing-list",
+            "post",
+            data={
+                "book": self.books[0].id,
+                "expected_return_date": "2099-01-01",
+            },
+        )
+        self.request(
+            "borrowing-bulk-checkout",
+            "post",
+            data={
+                "books": [book.id for book in self.books],
+                "expected_return_date": "2099-01-01",
+            },
+        )
+
+    def test_return_endpoints(self):
+        self.request(
+            "borrowing-return-book",
+            "post",
+            [self.borrowings[0].id],
+            {"actual_return_date": "2023-01-08"},
+        )
+        self.request(
+            "borrowing-bulk-return",
+            "post",
+            data={
+                "borrowings": [
+                    borrowing.id for borrowing in self.borrowings[1:]
+                ],
+                "actual_return_date": "2023-01-08",
+            },
+        )
+
+    def test_return_endpoints_with_waiting_holds(self):
+        for book in self.books:
+            Hold.objects.create(book=book, user=self.admin)
+
+        self.test_return_endpoints()
+
+        self.assertFalse(Hold.objects.waiting().exists())
+
+    def test_hold_endpoints(self):
+        Book.objects.update(inventory=0)
+        for book in self.books[1:]:
+            Hold.objects.create(book=book, user=self.admin)
+            Hold.objects.create(book=book, user=self.borrowings[0].user)
+
+        self.request("hold-list", "post", data={"book": self.books[0].id})
+        response = self.request("hold-list", "get")
+        hold = Hold.objects.filter(user=self.admin).first()
+        self.request("hold-detail", "get", [hold.id])
+        self.request("hold-detail", "delete", [hold.id])
+
+        self.assertEqual(len(response.data["results"]), 2 * ROWS - 1)
+
+    @override_settings(DEBUG=True)
+    def test_debug_responses_report_query_count(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+
+        response = client.get(reverse("borrowings_service:borrowing-list"))
+
+        self.assertEqual(response["X-DB-Queries"], "1")
+
+    @override_settings(DEBUG=True)
+    async def test_asgi_debug_responses_report_query_count(self):
+        token = await sync_to_async(AccessToken.for_user)(self.admin)
+
+        # AsyncClient in Django 4.1 takes extra headers by their raw names
+        response = await self.async_client.get(
+            reverse("borrowings_service_async:borrowing-list"),
+            AUTHORIZE=f"Bearer {token}",
+        )
+
+        self.assertEqual(response["X-DB-Queries"], "2")
+
+    def test_query_count_header_off_without_debug(self):
+        response = self.client.get(
+            reverse("borrowings_service:borrowing-list")
+        )
+
+        self.assertFalse(response.has_header("X-DB-Queries"))
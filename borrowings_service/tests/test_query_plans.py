@@ -0,0 +1,113 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books_service.models import Book
+from borrowings_service.models import Borrowing
+
+BORROWINGS_URL = reverse("borrowings_service:borrowing-list")
+BORROWINGS_OVERDUE_URL = reverse("borrowings_service:borrowing-overdue")
+BORROWING_TABLE = Borrowing._meta.db_table
+FULL_SCAN = re.compile(rf"^SCAN {BORROWING_TABLE}$")
+
+
+def borrowing_query_plans(client, params, url=BORROWINGS_URL):
+    """Run the endpoint and return EXPLAIN QUERY PLAN details
+    of every query it issued against the borrowing table"""
+    with CaptureQueriesContext(connection) as context:
+        client.get(url, params)
+
+    plans = []
+    with connection.cursor() as cursor:
+        for query in context.captured_queries:
+            if f'FROM "{BORROWING_TABLE}"' not in query["sql"]:
+                continue
+            cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+            plans.append([row[-1] for row in cursor.fetchall()])
+
+    return plans
+
+
+class BorrowingQueryPlanTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com",
+            password="1qazcde3",
+        )
+        self.staff = get_user_model().objects.create_superuser(
+            email="admin@mail.com",
+            password="1qazcde3",
+        )
+        book = Book.objects.create(
+            title="Kobzar",
+            author="Taras Shevchenko",
+            cover="Hard",
+            inventory=5,
+            daily_fee=1.00,
+        )
+        for actual_return_date in (None, "2023-01-08"):
+            Borrowing.objects.create(
+                borrow_date="2023-01-03",
+                expected_return_date="2023-01-08",
+                actual_return_date=actual_return_date,
+                book=book,
+                user=self.user,
+            )
+
+    def assert_no_full_scan(
+        self, params, expected_index=None, url=BORROWINGS_URL
+    ):
+        plans = borrowing_query_plans(self.client, params, url)
+
+        self.assertTrue(plans)
+        for plan in plans:
+            for detail in plan:
+                self.assertNotRegex(detail, FULL_SCAN)
+            if expected_index:
+                self.assertTrue(
+                    any(expected_index in detail for detail in plan), plan
+                )
+
+    def test_own_borrowings_use_index(self):
+        self.client.force_authenticate(self.user)
+
+        self.assert_no_full_scan({})
+        self.assert_no_full_scan(
+            {"is_active": "active"}, "borrowing_user_return_idx"
+        )
+        self.assert_no_full_scan({"is_active": "returned"})
+
+    def test_staff_user_filters_use_index(self):
+        self.client.force_authenticate(self.staff)
+
+        self.assert_no_full_scan({"user_id": self.user.id})
+        self.assert_no_full_scan(
+            {"user_id": self.user.id, "is_active": "active"},
+            "borrowing_user_return_idx",
+        )
+        self.assert_no_full_scan(
+            {"user_id": self.user.id, "is_active": "returned"}
+        )
+
+    def test_staff_active_borrowings_use_partial_index(self):
+        self.client.force_authenticate(self.staff)
+
+        self.assert_no_full_scan(
+            {"is_active": "active"}, "borrowing_active_idx"
+        )
+
+    def test_staff_overdue_borrowings_use_partial_index(self):
+        self.client.force_authenticate(self.staff)
+
+        self.assert_no_full_scan(
+            {}, "borrowing_active_idx", url=BORROWINGS_OVERDUE_URL
+        )
+        self.assert_no_full_scan(
+            {"user_id": self.user.id}, url=BORROWINGS_OVERDUE_URL
+        )
@@ -0,0 +1,239 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books_service.models import Book
+from borrowings_service.models import Borrowing
+from library_service.routers import ReadReplicaRouter, replica_reads
+
+BOOKS_URL = reverse("books_service:book-list")
+BORROWINGS_URL = reverse("borrowings_service:borrowing-list")
+ME_URL = reverse("customers_service:manage")
+BOOK_STATS_URL = reverse("stats_service:bookcirculationstats-list")
+
+# Registered by library_service.test_settings
+REPLICA = "replica"
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], READ_YOUR_WRITES_SECONDS=60)
+class ReadReplicaTests(TestCase):
+    """The replica is a separate database here, so every response shows
+    which database served it"""
+
+    databases = {"default", REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com",
+            password="1qazcde3",
+            first_name="Primary",
+        )
+        self.user.first_name = "Replica"
+        self.user.save(using=REPLICA)
+        self.book = Book.objects.create(
+            title="Primary",
+            author="Author",
+            cover="Hard",
+            inventory=3,
+            daily_fee=1.00,
+        )
+        self.book.title = "Replica"
+        self.book.save(using=REPLICA)
+        self.client = self._client_for(self.user)
+
+    @staticmethod
+    def _client_for(user):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZE=f"Bearer {AccessToken.for_user(user)}"
+        )
+
+        return client
+
+    def _checkout(self):
+        return self.client.post(
+            BORROWINGS_URL,
+            {
+                "book": self.book.id,
+                "expected_return_date": "2099-01-01",
+            },
+        )
+
+    def test_book_list_reads_from_replica(self):
+        response = APIClient().get(BOOKS_URL)
+
+        self.assertEqual(response.data["results"][0]["title"], "Replica")
+
+    def test_current_user_is_loaded_from_primary(self):
+        response = self.client.get(ME_URL)
+
+        self.assertEqual(response.data["first_name"], "Primary")
+
+    def test_borrowing_list_reads_from_replica(self):
+        Borrowing.objects.create(
+            expected_return_date="2099-01-01",
+            book=self.book,
+            user=self.user,
+        )
+
+        response = self.client.get(BORROWINGS_URL)
+
+        self.assertEqual(response.data["results"], [])
+
+    def test_other_views_read_from_primary(self):
+        self.user.is_staff = True
+        self.user.save()
+        cache.clear()
+
+        response = self.client.get(BOOK_STATS_URL)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_checkout_writes_to_primary_and_pins_client(self):
+        response = self._checkout()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Borrowing.objects.count(), 1)
+        self.assertEqual(Borrowing.objects.using(REPLICA).count(), 0)
+
+        response = self.client.get(BORROWINGS_URL)
+
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_return_pins_client(self):
+        borrowing = Borrowing.objects.create(
+            expected_return_date="2099-01-01",
+            book=self.book,
+            user=self.user,
+        )
+        borrowing.save(using=REPLICA)
+
+        response = self.client.post(
+            reverse(
+                "borrowings_service:borrowing-return-book",
+                args=[borrowing.id],
+            ),
+            {"actual_return_date": str(date.today())},
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(BORROWINGS_URL)
+
+        self.assertIsNotNone(response.data["results"][0]["actual_return_date"])
+
+    def test_pin_does_not_apply_to_other_clients(self):
+        other = get_user_model().objects.create_user(
+            email="other@mail.com", password="1qazcde3"
+        )
+        other.save(using=REPLICA)
+        self._checkout()
+
+        response = self._client_for(other).get(BOOKS_URL)
+
+        self.assertEqual(response.data["results"][0]["title"], "Replica")
+
+    def test_failed_write_does_not_pin_client(self):
+        Borrowing.objects.create(
+            expected_return_date="2099-01-01",
+            book=self.book,
+            user=self.user,
+        )
+        response = self.client.post(BORROWINGS_URL, {"book": self.book.id})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(BORROWINGS_URL)
+
+        self.assertEqual(response.data["results"], [])
+
+    def test_replica_reads_do_not_fill_catalog_cache(self):
+        Book.objects.using(REPLICA).filter(pk=self.book.pk).update(
+            inventory=3
+        )
+        self._checkout()
+
+        replica = APIClient().get(BOOKS_URL)
+        pinned = self.client.get(BOOKS_URL)
+
+        self.assertEqual(replica.data["results"][0]["inventory"], 3)
+        self.assertEqual(pinned.data["results"][0]["inventory"], 2)
+        self.assertEqual(pinned.data["results"][0]["title"], "Primary")
+
+    def test_deactivated_user_rejected_while_replica_lags(self):
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(BORROWINGS_URL)
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_new_user_accepted_while_replica_lags(self):
+        new = get_user_model().objects.create_user(
+            email="new@mail.com", password="1qazcde3"
+        )
+
+        response = self._client_for(new).get(BORROWINGS_URL)
+
+        self.assertEqual(response.status_code, 200)
+
+    async def test_asgi_book_list_reads_from_replica(self):
+        response = await self.async_client.get(BOOKS_URL)
+
+        self.assertEqual(response.json()["results"][0]["title"], "Replica")
+
+    async def test_asgi_checkout_pins_client(self):
+        # AsyncClient in Django 4.1 takes extra headers by their raw names
+        auth = {"AUTHORIZE": f"Bearer {AccessToken.for_user(self.user)}"}
+        response = await self.async_client.post(
+            BORROWINGS_URL,
+            {"book": self.book.id, "expected_return_date": "2099-01-01"},
+            content_type="application/json",
+            **auth,
+        )
+        self.assertEqual(response.status_code, 201)
+
+        response = await self.async_client.get(BOOKS_URL, **auth)
+
+        self.assertEqual(response.json()["results"][0]["title"], "Primary")
+
+    @override_settings(READ_YOUR_WRITES_SECONDS=0)
+    def test_zero_window_disables_pinning(self):
+        self._checkout()
+
+        response = self.client.get(BORROWINGS_URL)
+
+        self.assertEqual(response.data["results"], [])
+
+
+class ReadReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReadReplicaRouter()
+
+    @override_settings(DATABASE_REPLICAS=[REPLICA])
+    def test_reads_go_to_primary_outside_replica_reads(self):
+        self.assertEqual(self.router.db_for_read(Book), "default")
+
+    @override_settings(DATABASE_REPLICAS=[REPLICA])
+    def test_reads_go_to_replica_inside_replica_reads(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Book), REPLICA)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_reads_go_to_primary_without_replicas(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Book), "default")
+
+    @override_settings(DATABASE_REPLICAS=[REPLICA])
+    def test_writes_go_to_primary(self):
+        book = Book(title="Title", author="Author")
+        book._state.db = REPLICA
+
+        with replica_reads():
+            self.assertEqual(
+                self.router.db_for_write(Book, instance=book), "default"
+            )
@@ -1,10 +1,15 @@
 from rest_framework import routers
 
-from borrowings_service.views import BorrowingListCreateDetailViewSet
+from borrowings_service.views import (
+    BorrowingListCreateDetailViewSet,
+    HoldViewSet,
+)
 
 app_name = "borrowings_service"
 
 router = routers.DefaultRouter()
+# Before the borrowings, whose detail route would match "holds/"
+router.register("holds", HoldViewSet)
 router.register("", BorrowingListCreateDetailViewSet)
 
 urlpatterns = router.urls
@@ -1,113 +1,402 @@
+from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.http import StreamingHttpResponse
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
-from borrowings_service.models import Borrowing
+from borrowings_service.export import (
+    CONTENT_TYPES,
+    EXPORT_FIELDS,
+    STREAMERS,
+)
+from borrowings_service.filters import get_borrowings
+from borrowings_service.idempotency import IDEMPOTENCY_HEADER, idempotent
+from borrowings_service.models import Borrowing, Hold
 from borrowings_service.serializers import (
     BorrowingSerializer,
-    BorrowingCreateSerializer, BorrowingReturnSerializer
+    BorrowingCreateSerializer,
+    BorrowingBulkCreateSerializer,
+    BorrowingBulkReturnSerializer,
+    BorrowingExportFilterSerializer,
+    BorrowingOverdueFilterSerializer,
+    BorrowingOverdueSerializer,
+    BorrowingReturnSerializer,
+    HoldSerializer,
 )
+from library_service.fastpath import ValuesListModelMixin, ValuesRenderer
+from library_service.fieldsets import parse_fieldset
+from library_service.pagination import NewestFirstCursorPagination
+from stats_service.recorder import record_returns
+
+EXPORT_CHUNK_SIZE = 2000
+
+BORROWING_VALUES = ValuesRenderer(
+    BorrowingSerializer,
+    computed={
+        "user": (
+            [f"user__{name}" for name in get_user_model().STR_FIELDS],
+            get_user_model().format_name,
+        ),
+    },
+)
+
+BORROWING_FILTER_PARAMETERS = [
+    OpenApiParameter(
+        "user_id",
+        type=OpenApiTypes.INT,
+        description="Filter by user id (ex. ?user_id=1)",
+    ),
+    OpenApiParameter(
+        "is_active",
+        type=OpenApiTypes.STR,
+        description="Filter by active or returned borrowing status "
+                    "(ex. ?is_active=active or ?is_active=returned)",
+    ),
+]
+
+INCLUDE_ARCHIVED_PARAMETER = OpenApiParameter(
+    "include_archived",
+    type=OpenApiTypes.BOOL,
+    description="Also return archived borrowings (ex. ?include_archived=true)",
+)
+
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    IDEMPOTENCY_HEADER,
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.HEADER,
+    description=(
+        "Unique key of the request. A retry with the same key gets the "
+        "first response back instead of repeating the request"
+    ),
+)
+
+FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        type=OpenApiTypes.STR,
+        description="Comma-separated fields to return, the book as its id "
+                    "unless expanded (ex. ?fields=id,book,borrow_date)",
+    ),
+    OpenApiParameter(
+        "expand",
+        type=OpenApiTypes.STR,
+        description="Relations to nest in full (ex. ?expand=book)",
+    ),
+]
 
 
 class BorrowingListCreateDetailViewSet(
+    ValuesListModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     mixins.CreateModelMixin,
     viewsets.GenericViewSet,
 ):
-    queryset = Borrowing.objects.select_related("book")
+    queryset = Borrowing.objects.select_related("book", "user")
     serializer_class = BorrowingSerializer
     permission_classes = [IsAuthenticated]
-
-    @staticmethod
-    def _get_bool_from_param(parameter: str) -> bool:
-        if parameter == "active":
-            return True
-        elif parameter == "returned":
-            return False
+    pagination_class = NewestFirstCursorPagination
+    values_renderer = BORROWING_VALUES
+    read_from_replicas = True
 
     def get_queryset(self):
-        queryset = self.queryset
-        is_active = self._get_bool_from_param(
-            self.request.query_params.get("is_active")
+        return get_borrowings(
+            self.request.user,
+            self.request.query_params,
+            self._include_archived(),
+            self.get_fieldset(),
         )
-        user_id = self.request.query_params.get("user_id")
 
-        if is_active is not None:
-            queryset = queryset.filter(
-                actual_return_date__isnull=is_active
+    def _include_archived(self):
+        return (
+            self.action in ("list", "retrieve", "export")
+            and self.request.query_params.get("include_archived") == "true"
+        )
+
+    def get_fieldset(self):
+        if self.action not in ("list", "retrieve"):
+            return None
+
+        if not hasattr(self, "_fieldset"):
+            self._fieldset = parse_fieldset(
+                self.request.query_params, BorrowingSerializer
             )
 
-        if self.request.user.is_staff and user_id is not None:
-            queryset = queryset.filter(user_id=user_id)
+        return self._fieldset
 
-        if not self.request.user.is_staff:
-            queryset = queryset.filter(user=self.request.user.id)
+    def use_values_renderer(self):
+        return self.get_fieldset() is None
 
-        return queryset
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fieldset"] = self.get_fieldset()
+
+        return context
 
     def get_serializer_class(self):
         if self.action == "create":
             return BorrowingCreateSerializer
 
+        if self.action == "bulk_checkout":
+            return BorrowingBulkCreateSerializer
+
         if self.action == "return_book":
             return BorrowingReturnSerializer
 
+        if self.action == "bulk_return":
+            return BorrowingBulkReturnSerializer
+
+        if self.action == "export":
+            return BorrowingExportFilterSerializer
+
+        if self.action == "overdue":
+            return BorrowingOverdueSerializer
+
         return BorrowingSerializer
 
+    @extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER])
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(
+        methods=["post"],
+        detail=False,
+        url_path="bulk",
+        permission_classes=[IsAuthenticated],
+    )
+    def bulk_checkout(self, request):
+        """Endpoint for borrowing several books at once.
+
+        Either every book is checked out or none is.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        borrowings = serializer.save(user=request.user)
+
+        return Response(
+            BorrowingCreateSerializer(borrowings, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER])
     @action(
         methods=["post"],
         detail=True,
         url_path="return",
         permission_classes=[IsAuthenticated],
     )
+    @idempotent
     def return_book(self, request, pk=None):
         """Endpoint for returning borrowing book"""
         borrowing = self.get_object()
-        book = borrowing.book
         serializer = self.get_serializer(borrowing, data=request.data)
 
         if borrowing.actual_return_date is not None:
             raise ValidationError("Book have already returned")
 
         if serializer.is_valid():
+            actual_return_date = serializer.validated_data[
+                "actual_return_date"
+            ]
             Borrowing.validate_dates(
                 borrowing.borrow_date,
                 borrowing.expected_return_date,
-                serializer.validated_data["actual_return_date"],
+                actual_return_date,
                 ValidationError
             )
             with transaction.atomic():
-                serializer.save()
-                book.inventory += 1
-                book.save()
+                returned = Borrowing.objects.filter(
+                    pk=borrowing.pk, actual_return_date__isnull=True
+                ).update(actual_return_date=actual_return_date)
+
+                if not returned:
+                    raise ValidationError("Book have already returned")
+
+                Hold.objects.release_copies({borrowing.book_id: 1})
+                record_returns([borrowing.book_id])
 
-                return Response(serializer.data, status=status.HTTP_200_OK)
+            borrowing.actual_return_date = actual_return_date
+
+            return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(
+        methods=["post"],
+        detail=False,
+        url_path="bulk-return",
+        permission_classes=[IsAuthenticated],
+    )
+    def bulk_return(self, request):
+        """Endpoint for returning many borrowed books at once.
+
+        Already returned and unknown borrowings are reported in "errors"
+        instead of failing the whole batch.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        returned, errors = self.get_queryset().return_books(
+            serializer.validated_data["borrowings"],
+            serializer.validated_data["actual_return_date"],
+        )
+
+        return Response(
+            {"returned": returned, "errors": errors},
+            status=status.HTTP_200_OK,
+        )
+
     @extend_schema(
         parameters=[
+            *BORROWING_FILTER_PARAMETERS,
+            INCLUDE_ARCHIVED_PARAMETER,
             OpenApiParameter(
-                "user_id",
-                type=OpenApiTypes.INT,
-                description="Filter by user id (ex. ?user_id=1)",
+                "borrowed_from",
+                type=OpenApiTypes.DATE,
+                description="Only borrowings borrowed on or after the date "
+                            "(ex. ?borrowed_from=2023-01-01)",
+            ),
+            OpenApiParameter(
+                "borrowed_to",
+                type=OpenApiTypes.DATE,
+                description="Only borrowings borrowed on or before the date "
+                            "(ex. ?borrowed_to=2023-01-31)",
             ),
             OpenApiParameter(
-                "is_active",
+                "output",
                 type=OpenApiTypes.STR,
-                description="Filter by active or returned borrowing status "
-                            "(ex. ?is_active=active or ?is_active=returned)",
+                enum=list(STREAMERS),
+                description="Export file format (ex. ?output=jsonl)",
+            ),
+        ],
+        responses={(200, "text/csv"): OpenApiTypes.STR},
+    )
+    @action(
+        methods=["get"],
+        detail=False,
+        url_path="export",
+        permission_classes=[IsAdminUser],
+    )
+    def export(self, request):
+        """Endpoint for staff streaming the borrowing history as a file"""
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        borrowed_from = serializer.validated_data.get("borrowed_from")
+        borrowed_to = serializer.validated_data.get("borrowed_to")
+        output = serializer.validated_data["output"]
+
+        queryset = self.get_queryset()
+        if borrowed_from is not None:
+            queryset = queryset.filter(borrow_date__gte=borrowed_from)
+        if borrowed_to is not None:
+            queryset = queryset.filter(borrow_date__lte=borrowed_to)
+
+        rows = (
+            queryset.order_by("id")
+            .values_list(*EXPORT_FIELDS)
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        response = StreamingHttpResponse(
+            STREAMERS[output](rows), content_type=CONTENT_TYPES[output]
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="borrowings.{output}"'
+        )
+
+        return response
+
+    @extend_schema(
+        parameters=[
+            BORROWING_FILTER_PARAMETERS[0],
+            OpenApiParameter(
+                "book_id",
+                type=OpenApiTypes.INT,
+                description="Filter by book id (ex. ?book_id=1)",
             ),
+            OpenApiParameter(
+                "min_days",
+                type=OpenApiTypes.INT,
+                description="Only borrowings overdue by at least that many "
+                            "days (ex. ?min_days=7)",
+            ),
+        ],
+    )
+    @action(
+        methods=["get"],
+        detail=False,
+        url_path="overdue",
+        permission_classes=[IsAuthenticated],
+    )
+    def overdue(self, request):
+        """Endpoint for active borrowings past their expected return date
+        with the days overdue and the fine owed so far"""
+        filters = BorrowingOverdueFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        book_id = filters.validated_data.get("book_id")
+
+        queryset = self.get_queryset().overdue(
+            min_days=filters.validated_data.get("min_days")
+        )
+        if book_id is not None:
+            queryset = queryset.filter(book_id=book_id)
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+
+        return self.get_paginated_response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            *BORROWING_FILTER_PARAMETERS,
+            *FIELDSET_PARAMETERS,
+            INCLUDE_ARCHIVED_PARAMETER,
         ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        parameters=[*FIELDSET_PARAMETERS, INCLUDE_ARCHIVED_PARAMETER]
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+class HoldViewSet(
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.CreateModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """Queue for books with no copies left. A returned copy is kept for
+    the oldest waiting hold, which its user claims by checking the book
+    out before the hold expires. Deleting a hold cancels it."""
+
+    queryset = Hold.objects.with_position()
+    serializer_class = HoldSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = self.queryset
+
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(user=self.request.user)
+
+        return queryset
+
+    def perform_create(self, serializer):
+        hold = serializer.save(user=self.request.user)
+        serializer.instance = self.get_queryset().get(pk=hold.pk)
+
+    def perform_destroy(self, instance):
+        if not Hold.objects.cancel(instance):
+            raise ValidationError("Hold is no longer active")
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CustomersServiceConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "customers_service"
+
+    def ready(self):
+        from customers_service import schema, signals
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from customers_service.async_views import manage_user
+
+app_name = "customers_service_async"
+
+urlpatterns = [
+    path("me/", manage_user, name="manage"),
+]
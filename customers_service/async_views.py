@@ -0,0 +1,7 @@
+from customers_service.serializers import UserSerializer
+from library_service.async_api import async_read_view, json_response
+
+
+@async_read_view()
+async def manage_user(request):
+    return json_response(UserSerializer(request.user).data)
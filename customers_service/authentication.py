@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings
+
+from library_service.routers import primary_reads
+
+
+def user_cache_key(user_id):
+    return f"customers:user:{user_id}"
+
+
+def forget_cached_user(user_id):
+    """Drop the cached user now and once more when the transaction
+    commits, so a request racing the change cannot cache the old row"""
+    key = user_cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication that keeps recently loaded users in the cache
+    instead of querying the user table on every request"""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+
+        if user is None:
+            # A lagging replica may not have a new user yet, or may still
+            # have one that was deactivated
+            with primary_reads():
+                user = super().get_user(validated_token)
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+
+        return user
+
+    async def aauthenticate(self, request):
+        """Authenticate a request from async views without blocking the
+        event loop; returns a (user, token) pair or None"""
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+
+        if user_id is None:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+
+        key = user_cache_key(user_id)
+        user = await cache.aget(key)
+
+        if user is None:
+            try:
+                with primary_reads():
+                    user = await self.user_model.objects.aget(
+                        **{api_settings.USER_ID_FIELD: user_id}
+                    )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(
+                    _("User not found"), code="user_not_found"
+                )
+
+            if not user.is_active:
+                raise AuthenticationFailed(
+                    _("User is inactive"), code="user_inactive"
+                )
+
+            await cache.aset(key, user, settings.USER_CACHE_TIMEOUT)
+
+        return user
@@ -47,7 +47,14 @@ class User(AbstractUser):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
+    # The columns __str__ reads, for code rendering users from raw rows
+    STR_FIELDS = ("first_name", "last_name")
+
     objects = UserManager()
 
+    @staticmethod
+    def format_name(first_name, last_name):
+        return f"{first_name} {last_name}"
+
     def __str__(self):
-        return f"{self.first_name} {self.last_name}"
+        return self.format_name(self.first_name, self.last_name)
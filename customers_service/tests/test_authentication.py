@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+ME_MANAGE_URL = reverse("customers_service:manage")
+TOKEN_URL = reverse("customers_service:token_obtain_pair")
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com",
+            password="1qazcde3",
+            first_name="Bob",
+            last_name="Smith",
+        )
+        response = self.client.post(
+            TOKEN_URL, {"email": "user@mail.com", "password": "1qazcde3"}
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZE=f"Bearer {response.data['access']}"
+        )
+
+    def test_user_loaded_once_per_cache_period(self):
+        with self.assertNumQueries(1):
+            self.client.get(ME_MANAGE_URL)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(ME_MANAGE_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["email"], "user@mail.com")
+
+    def test_update_through_api_invalidates_cached_user(self):
+        self.client.get(ME_MANAGE_URL)
+
+        self.client.patch(ME_MANAGE_URL, {"first_name": "Leo"})
+        response = self.client.get(ME_MANAGE_URL)
+
+        self.assertEqual(response.data["first_name"], "Leo")
+
+    def test_deactivated_user_rejected_immediately(self):
+        self.client.get(ME_MANAGE_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(ME_MANAGE_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_rejected_immediately(self):
+        self.client.get(ME_MANAGE_URL)
+
+        self.user.delete()
+        response = self.client.get(ME_MANAGE_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from library_service.testing import QueryBudgetMixin
+
+# Maximum queries per (URL name, method) with a cold user cache
+QUERY_BUDGETS = {
+    ("create", "post"): 3,
+    ("token_obtain_pair", "post"): 2,
+    ("token_refresh", "post"): 0,
+    ("token_verify", "post"): 0,
+    ("manage", "get"): 1,
+    ("manage", "patch"): 3,
+}
+
+
+class UserQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com", password="1qazcde3"
+        )
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZE=f"Bearer {self.refresh.access_token}"
+        )
+
+    def request(self, name, method, data=None):
+        budget = QUERY_BUDGETS[(name, method)]
+        url = reverse(f"customers_service:{name}")
+
+        with self.assertMaxQueries(budget):
+            response = getattr(self.client, method)(url, data, format="json")
+
+        self.assertLess(response.status_code, 400, response.data)
+
+        return response
+
+    def test_every_endpoint_declares_a_budget(self):
+        self.assertBudgetsCoverNamespace(
+            "customers_service", {name for name, _ in QUERY_BUDGETS}
+        )
+
+    def test_token_endpoints(self):
+        self.request(
+            "token_obtain_pair",
+            "post",
+            {"email": "user@mail.com", "password": "1qazcde3"},
+        )
+        self.request("token_refresh", "post", {"refresh": str(self.refresh)})
+        self.request(
+            "token_verify", "post", {"token": str(self.refresh.access_token)}
+        )
+
+    def test_user_endpoints(self):
+        self.request(
+            "create",
+            "post",
+            {"email": "new@mail.com", "password": "1qazcde3"},
+        )
+        self.request("manage", "get")
+        self.request("manage", "patch", {"first_name": "Bob"})
@@ -9,6 +9,7 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     queryset = get_user_model().objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
+    read_from_replicas = True
 
     def get_object(self):
         return self.request.user
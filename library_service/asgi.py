@@ -13,4 +13,18 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "library_service.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once the apps are loaded
+from books_service.availability import (  # noqa: E402
+    STREAM_PATH,
+    availability_stream,
+)
+
+
+async def application(scope, receive, send):
+    """Serve the availability event stream, everything else with Django"""
+    if scope["type"] == "http" and scope["path"] == STREAM_PATH:
+        return await availability_stream(scope, receive, send)
+
+    return await django_application(scope, receive, send)
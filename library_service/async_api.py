@@ -0,0 +1,148 @@
+"""Helpers for the native async read endpoints served under ASGI.
+
+DRF views are synchronous, so these endpoints are plain Django async
+views. They take the query parameters of their sync counterparts and
+reuse their querysets, paginator settings and serializers, so both
+return the same pages with the same cursors, while the rows are fetched
+with the async ORM.
+"""
+import functools
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.paginator import InvalidPage
+from django.http import JsonResponse
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from customers_service.authentication import CachedJWTAuthentication
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, encoder=JSONEncoder, status=status, safe=False)
+
+
+def error_response(detail, status):
+    if not isinstance(detail, dict):
+        detail = {"detail": detail}
+
+    return json_response(detail, status=status)
+
+
+def async_read_view(authentication_required=True):
+    """Serve a read-only async view to JWT-authenticated users"""
+
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in SAFE_METHODS:
+                return error_response(
+                    f'Method "{request.method}" not allowed.', 405
+                )
+
+            try:
+                result = await CachedJWTAuthentication().aauthenticate(
+                    request
+                )
+            except AuthenticationFailed as error:
+                return error_response(error.detail, 401)
+
+            request.user = result[0] if result else AnonymousUser()
+
+            if authentication_required and not request.user.is_authenticated:
+                return error_response(
+                    "Authentication credentials were not provided.", 401
+                )
+
+            try:
+                return await view(request, *args, **kwargs)
+            except APIException as error:
+                return error_response(error.detail, error.status_code)
+
+        return wrapper
+
+    return decorator
+
+
+async def _fetch(queryset):
+    return [row async for row in queryset.aiterator()]
+
+
+async def _cursor_page(request, queryset, serialize, paginator):
+    """Seek one page past the cursor's id with a single async query of
+    page_size + 1 rows, the extra row telling whether more follow"""
+    page_size = paginator.get_page_size(request)
+    cursor = paginator.decode_cursor(request)
+    reverse = cursor is not None and cursor.reverse
+    backwards = paginator.ordering.startswith("-") != reverse
+
+    queryset = queryset.order_by("-id" if backwards else "id")
+    if cursor is not None and cursor.position is not None:
+        try:
+            position = int(cursor.position)
+        except ValueError:
+            raise NotFound(paginator.invalid_cursor_message)
+        lookup = "id__lt" if backwards else "id__gt"
+        queryset = queryset.filter(**{lookup: position})
+
+    rows = await _fetch(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+        # Came back from the page after this one
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, cursor is not None
+
+    paginator.base_url = request.build_absolute_uri()
+    next_url = previous_url = None
+    if rows and has_next:
+        next_url = paginator.encode_cursor(Cursor(0, False, rows[-1].id))
+    if rows and has_previous:
+        previous_url = paginator.encode_cursor(Cursor(0, True, rows[0].id))
+
+    return {
+        "next": next_url,
+        "previous": previous_url,
+        "results": serialize(rows),
+    }
+
+
+async def _number_page(request, queryset, serialize, paginator):
+    """Count the rows and fetch the requested page with async queries"""
+    page_size = paginator.get_page_size(request)
+    count = await queryset.acount()
+    # Pages of the row positions check the page number without a query
+    positions = paginator.django_paginator_class(range(count), page_size)
+    page_number = paginator.get_page_number(request, positions)
+    try:
+        page = positions.page(page_number)
+    except InvalidPage as error:
+        raise NotFound(
+            paginator.invalid_page_message.format(
+                page_number=page_number, message=str(error)
+            )
+        )
+
+    offset = (page.number - 1) * page_size
+    rows = await _fetch(queryset[offset:offset + page_size])
+    paginator.page, paginator.request = page, request
+
+    return paginator.get_paginated_response(serialize(rows)).data
+
+
+async def paginate(request, queryset, serialize, pagination_class):
+    """Return the page of the queryset that pagination_class picks for
+    the request, with the links the sync views give, fetched with the
+    async ORM. Cursor pagination classes must order by the id."""
+    paginator = pagination_class()
+    request = Request(request)
+
+    if isinstance(paginator, CursorPagination):
+        return await _cursor_page(request, queryset, serialize, paginator)
+
+    return await _number_page(request, queryset, serialize, paginator)
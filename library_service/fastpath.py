@@ -0,0 +1,168 @@
+"""Render list pages from values_list() rows instead of model instances.
+
+A ValuesRenderer walks a serializer's fields once, turns every field into
+a column of a values_list() query plus a formatter, and then builds each
+output dict with plain indexing. It skips model instantiation and the
+per-field machinery of DRF serializers while producing the same data.
+"""
+import decimal
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+def _decimal_formatter(field):
+    coerce_to_string = getattr(
+        field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING
+    )
+    if field.localize or not coerce_to_string or field.decimal_places is None:
+        return field.to_representation
+
+    exponent = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def format_decimal(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+
+        return "{:f}".format(
+            value.quantize(exponent, rounding=rounding, context=context)
+        )
+
+    return format_decimal
+
+
+def _date_formatter(field):
+    output_format = getattr(field, "format", api_settings.DATE_FORMAT)
+
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+
+    def format_date(value):
+        return value if isinstance(value, str) else value.isoformat()
+
+    return format_date
+
+
+def _formatter(field):
+    """Return a callable formatting a column, or None to copy it as is"""
+    if isinstance(field, serializers.DecimalField):
+        return _decimal_formatter(field)
+
+    if isinstance(field, serializers.DateField):
+        return _date_formatter(field)
+
+    if isinstance(
+        field,
+        (
+            serializers.IntegerField,
+            serializers.CharField,
+            serializers.ChoiceField,
+            serializers.PrimaryKeyRelatedField,
+        ),
+    ):
+        return None
+
+    return field.to_representation
+
+
+class ValuesRenderer:
+    """Renders rows the way serializer_class renders instances.
+
+    computed maps field names that cannot be read from a single column,
+    such as StringRelatedField, to (columns, function) pairs; the
+    function receives the values of those columns.
+    """
+
+    def __init__(self, serializer_class, computed=None):
+        self.columns = []
+        self.build = self._compile(serializer_class(), "", computed or {})
+
+    def values(self, queryset):
+        """Turn a queryset into named rows carrying every needed column"""
+        return queryset.values_list(*self.columns, named=True)
+
+    def render(self, rows):
+        build = self.build
+        return [build(row) for row in rows]
+
+    def _column(self, path):
+        self.columns.append(path)
+        return len(self.columns) - 1
+
+    def _compile(self, serializer, prefix, computed):
+        accessors = []
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+
+            if name in computed:
+                columns, function = computed[name]
+                indexes = [self._column(prefix + path) for path in columns]
+                accessors.append(
+                    (name, self._computed_accessor(indexes, function))
+                )
+                continue
+
+            path = prefix + field.source.replace(".", "__")
+
+            if isinstance(field, serializers.BaseSerializer):
+                accessors.append(
+                    (name, self._compile(field, f"{path}__", {}))
+                )
+                continue
+
+            accessors.append(
+                (name, self._accessor(self._column(path), _formatter(field)))
+            )
+
+        def build(row):
+            return {name: accessor(row) for name, accessor in accessors}
+
+        return build
+
+    @staticmethod
+    def _accessor(index, formatter):
+        if formatter is None:
+            return lambda row: row[index]
+
+        def access(row):
+            value = row[index]
+            return None if value is None else formatter(value)
+
+        return access
+
+    @staticmethod
+    def _computed_accessor(indexes, function):
+        return lambda row: function(*(row[index] for index in indexes))
+
+
+class ValuesListModelMixin:
+    """List action rendering pages through a ValuesRenderer.
+
+    Views set values_renderer and may override use_values_renderer() to
+    fall back to their serializer for some requests.
+    """
+
+    values_renderer = None
+
+    def use_values_renderer(self):
+        return True
+
+    def list(self, request, *args, **kwargs):
+        if self.values_renderer is None or not self.use_values_renderer():
+            return super().list(request, *args, **kwargs)
+
+        renderer = self.values_renderer
+        rows = renderer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+
+        if page is not None:
+            return self.get_paginated_response(renderer.render(page))
+
+        return Response(renderer.render(rows))
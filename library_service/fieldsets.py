@@ -0,0 +1,70 @@
+"""Sparse fieldsets: ``?fields=`` picks the fields of each object and
+``?expand=`` opts into nested representations of relations."""
+from rest_framework import serializers
+
+
+def _parse_names(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def parse_fieldset(query_params, serializer_class):
+    """Read the requested fields and expansions.
+
+    Returns None when the client asked for neither, so the serializer
+    keeps its full representation, or a (fields, expand) pair of sets.
+    """
+    if "fields" not in query_params and "expand" not in query_params:
+        return None
+
+    available = list(serializer_class().fields)
+    expandable = set(serializer_class.expandable_fields)
+    fields = set(_parse_names(query_params.get("fields", ""))) or set(
+        available
+    )
+    expand = set(_parse_names(query_params.get("expand", "")))
+    errors = {}
+
+    if unknown := fields - set(available):
+        errors["fields"] = [
+            f"Unknown fields: {', '.join(sorted(unknown))}. "
+            f"Choose from: {', '.join(available)}."
+        ]
+    if unknown := expand - expandable:
+        errors["expand"] = [
+            f"Cannot expand: {', '.join(sorted(unknown))}. "
+            f"Choose from: {', '.join(sorted(expandable))}."
+        ]
+    if errors:
+        raise serializers.ValidationError(errors)
+
+    return fields, expand
+
+
+class SparseFieldsetSerializerMixin:
+    """Serializer mixin honouring the fieldset in context["fieldset"].
+
+    Relations listed in expandable_fields are rendered as primary keys
+    unless they are expanded.
+    """
+
+    expandable_fields = ()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get("fieldset")
+
+        if fieldset is None:
+            return fields
+
+        requested, expand = fieldset
+        for name in self.expandable_fields:
+            if name not in expand:
+                fields[name] = serializers.PrimaryKeyRelatedField(
+                    read_only=True
+                )
+
+        return {
+            name: field
+            for name, field in fields.items()
+            if name in requested
+        }
@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from library_service.routers import replica_reads
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryCountMiddleware:
+    """Report how many database queries a request ran in the
+    X-DB-Queries response header. Only active while DEBUG is on.
+
+    Queries run while a streaming response is consumed are not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    @staticmethod
+    def _count_queries(stack, counter):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        counter = QueryCounter()
+
+        with ExitStack() as stack:
+            self._count_queries(stack, counter)
+            response = self.get_response(request)
+
+        response["X-DB-Queries"] = str(counter.count)
+
+        return response
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        stack = ExitStack()
+
+        # Database connections belong to the thread the request's ORM
+        # calls run on, so the wrappers are installed there
+        await sync_to_async(self._count_queries)(stack, counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+
+        response["X-DB-Queries"] = str(counter.count)
+
+        return response
+
+
+class ReadReplicaMiddleware:
+    """Serve safe-method requests to views with read_from_replicas set
+    from the database replicas.
+
+    A client that made a successful write is pinned to the primary for
+    READ_YOUR_WRITES_SECONDS, so it reads its own writes while the
+    replicas catch up. Clients are told apart by their credentials.
+    Runs natively under both WSGI and ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if asyncio.iscoroutinefunction(get_response):
+            # Tells Django to await this middleware and its process_view
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+            self.process_view = self._aprocess_view
+
+    @staticmethod
+    def _pin_key(request):
+        credentials = request.META.get(
+            settings.SIMPLE_JWT["AUTH_HEADER_NAME"]
+        ) or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+
+        if not credentials:
+            return None
+
+        digest = hashlib.sha256(credentials.encode()).hexdigest()
+
+        return f"read-your-writes:{digest}"
+
+    def _pins(self, request, response):
+        """Return the key to pin the client by after a successful write"""
+        key = self._pin_key(request)
+
+        if (
+            key is not None
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            return key
+
+        return None
+
+    @staticmethod
+    def _exit_replica_reads(request):
+        context = getattr(request, "_replica_reads", None)
+        if context is not None:
+            context.__exit__(None, None, None)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        try:
+            response = self.get_response(request)
+        finally:
+            self._exit_replica_reads(request)
+
+        key = self._pins(request, response)
+        if key is not None:
+            cache.set(key, True, settings.READ_YOUR_WRITES_SECONDS)
+
+        return response
+
+    async def __acall__(self, request):
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._exit_replica_reads(request)
+
+        key = self._pins(request, response)
+        if key is not None:
+            await cache.aset(key, True, settings.READ_YOUR_WRITES_SECONDS)
+
+        return response
+
+    @staticmethod
+    def _reads_from_replicas(request, view_func):
+        view_class = getattr(view_func, "cls", None)
+
+        return (
+            request.method in SAFE_METHODS
+            and getattr(view_class, "read_from_replicas", False)
+            and settings.DATABASE_REPLICAS
+        )
+
+    @staticmethod
+    def _enter_replica_reads(request):
+        request._replica_reads = replica_reads()
+        request._replica_reads.__enter__()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self._reads_from_replicas(request, view_func):
+            return None
+
+        key = self._pin_key(request)
+        if key is None or not cache.get(key):
+            self._enter_replica_reads(request)
+
+        return None
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        """process_view for ASGI. It runs in the request's own context,
+        so the views see the replica reads it enters"""
+        if not self._reads_from_replicas(request, view_func):
+            return None
+
+        key = self._pin_key(request)
+        if key is None or not await cache.aget(key):
+            self._enter_replica_reads(request)
+
+        return None
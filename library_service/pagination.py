@@ -0,0 +1,135 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination over the primary key.
+
+    Every page is fetched with ``WHERE id > <cursor> ORDER BY id LIMIT n``,
+    so page N costs the same as page 1 and rows inserted concurrently never
+    shift the pages a client is walking through.
+    """
+
+    ordering = "id"
+    page_size_query_param = "page_size"
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+class NewestFirstCursorPagination(IdCursorPagination):
+    ordering = "-id"
+
+
+class KeysetCursorPagination(IdCursorPagination):
+    """Keyset pagination over a non-unique ordering, such as counts.
+
+    Rows are ordered by the first ordering field and then by the primary
+    key, in the order an index on the field alone keeps them, and the
+    cursor holds both values of the row a page ends at. Every page is
+    one range scan of that index, and rows changing their counts never
+    make a page repeat or skip rows by offset.
+    """
+
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        field = self.get_ordering(request, queryset, view)[0]
+        self.field = field.lstrip("-")
+        # Indexes keep equal values in primary key order, read backwards
+        # by an ascending scan of a descending index and the other way
+        self.descending = field.startswith("-")
+        cursor = self.decode_cursor(request)
+        self.reverse = cursor is not None and cursor["reverse"]
+
+        rows = list(
+            self._seek(queryset, self.descending != self.reverse, cursor)[
+                :self.page_size + 1
+            ]
+        )
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+
+        if self.reverse:
+            # Came back from the page after this one
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        return self.page
+
+    def _seek(self, queryset, descending, cursor):
+        """Order the rows by (field, pk) in the given direction and skip
+        the ones up to the cursor's row"""
+        field, pk = self.field, "pk"
+        if descending:
+            queryset = queryset.order_by(f"-{field}", pk)
+        else:
+            queryset = queryset.order_by(field, f"-{pk}")
+
+        if cursor is None:
+            return queryset
+
+        value, position = cursor["value"], cursor["pk"]
+        if descending:
+            seen = Q(**{field: value, "pk__lte": position})
+            return queryset.filter(Q(**{f"{field}__lte": value}) & ~seen)
+
+        seen = Q(**{field: value, "pk__gte": position})
+        return queryset.filter(Q(**{f"{field}__gte": value}) & ~seen)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        token = json.dumps(
+            [getattr(row, self.field), row.pk, reverse],
+            cls=DjangoJSONEncoder,
+        )
+        encoded = urlsafe_b64encode(token.encode()).decode()
+
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            value, pk, reverse = json.loads(urlsafe_b64decode(encoded))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return {"value": value, "pk": pk, "reverse": bool(reverse)}
+
+
+class RankedPageNumberPagination(PageNumberPagination):
+    """Page numbers for result sets ordered by relevance, which offer no
+    unique key a cursor could seek by"""
+
+    page_size_query_param = "page_size"
+    max_page_size = settings.MAX_PAGE_SIZE
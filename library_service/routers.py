@@ -0,0 +1,54 @@
+"""Send reads to the database replicas while replica_reads() is active.
+
+Writes always go to the primary. ReadReplicaMiddleware enables replica
+reads for safe-method requests to views that opt in with
+read_from_replicas = True, unless the client wrote recently.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+@contextmanager
+def replica_reads():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary even inside replica_reads(), for rows that
+    must be current, such as the authenticated user"""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def reading_from_replicas():
+    """Whether reads right now may be served by a lagging replica"""
+    return _replica_reads.get() and bool(settings.DATABASE_REPLICAS)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not reading_from_replicas():
+            return DEFAULT_DB_ALIAS
+
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold copies of the primary's rows
+        return True
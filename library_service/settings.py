@@ -42,9 +42,11 @@ INSTALLED_APPS = [
     "customers_service",
     "books_service",
     "borrowings_service",
+    "stats_service",
 ]
 
 MIDDLEWARE = [
+    "library_service.middleware.QueryCountMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -52,6 +54,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "library_service.middleware.ReadReplicaMiddleware",
 ]
 
 ROOT_URLCONF = "library_service.urls"
@@ -77,13 +80,94 @@ WSGI_APPLICATION = "library_service.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
-DATABASES = {
+# "tuned" runs SQLite in WAL mode, so readers do not block on writers,
+# lets writers wait for the lock instead of failing with "database is
+# locked" and keeps connections open between requests.
+# "default" is the stock Django configuration.
+DATABASE_PROFILES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
+    },
+    "tuned": {
+        "ENGINE": "library_service.sqlite",
+        "CONN_MAX_AGE": int(os.environ.get("CONN_MAX_AGE", 600)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            # Busy timeout in seconds
+            "timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT", 20)),
+            "transaction_mode": "IMMEDIATE",
+            "pragmas": {
+                "journal_mode": "WAL",
+                "synchronous": "NORMAL",
+                "mmap_size": 256 * 1024 * 1024,
+                # Negative sizes are in KiB
+                "cache_size": -64 * 1024,
+                "temp_store": "MEMORY",
+            },
+        },
+    },
+}
+DATABASE_PROFILE = os.environ.get("DATABASE_PROFILE", "tuned")
+
+DATABASES = {
+    "default": {
         "NAME": BASE_DIR / "db.sqlite3",
+        **DATABASE_PROFILES[DATABASE_PROFILE],
     }
 }
 
+# Comma-separated SQLite files holding copies of the primary database.
+# Safe-method reads of the views with read_from_replicas set are spread
+# across them
+DATABASE_REPLICAS = []
+for index, name in enumerate(
+    filter(None, os.environ.get("DATABASE_REPLICAS", "").split(",")),
+    start=1,
+):
+    DATABASES[f"replica_{index}"] = {
+        "NAME": name,
+        **DATABASE_PROFILES[DATABASE_PROFILE],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{index}")
+
+DATABASE_ROUTERS = ["library_service.routers.ReadReplicaRouter"]
+
+# Seconds a client reads from the primary after a write
+READ_YOUR_WRITES_SECONDS = int(
+    os.environ.get("READ_YOUR_WRITES_SECONDS", 10)
+)
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+
+# The catalog and user caches and the read-your-writes pins must be
+# shared by every worker process. The default in-memory cache is private
+# to one process, so only suits a single-process development server
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+
+# Seconds a serialized book catalog response stays cached; the catalog
+# version key invalidates it earlier whenever a book changes
+CATALOG_CACHE_TIMEOUT = int(os.environ.get("CATALOG_CACHE_TIMEOUT", 300))
+
+# Seconds an authenticated user record stays cached between requests;
+# changing or deleting the user drops it earlier
+USER_CACHE_TIMEOUT = int(os.environ.get("USER_CACHE_TIMEOUT", 60))
+
+# Seconds between a process's checks for new availability events, shared
+# by all its streams, and of silence before a stream sends a keep-alive
+AVAILABILITY_POLL_SECONDS = float(
+    os.environ.get("AVAILABILITY_POLL_SECONDS", 1)
+)
+AVAILABILITY_HEARTBEAT_SECONDS = 15
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -131,11 +215,29 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "customers_service.authentication.CachedJWTAuthentication",
     ),
-    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema"
+    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_PAGINATION_CLASS": "library_service.pagination."
+                                "IdCursorPagination",
+    "PAGE_SIZE": int(os.environ.get("PAGE_SIZE", 20)),
 }
 
+# Upper bound for the ?page_size= query parameter of paginated list endpoints
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", 100))
+
+# Upper bound for the number of items in one bulk borrowings request
+MAX_BULK_SIZE = int(os.environ.get("MAX_BULK_SIZE", 500))
+
+# Hours a copy is kept for a ready hold before it passes to the next user
+HOLD_PICKUP_HOURS = int(os.environ.get("HOLD_PICKUP_HOURS", 48))
+
+# Hours a checkout or return response is replayed for a retried request
+# with the same Idempotency-Key, and seconds the first request holds the
+# key against concurrent duplicates
+IDEMPOTENCY_KEY_HOURS = int(os.environ.get("IDEMPOTENCY_KEY_HOURS", 24))
+IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get("IDEMPOTENCY_LOCK_SECONDS", 30))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -0,0 +1,41 @@
+"""SQLite backend with per-connection tuning taken from OPTIONS.
+
+``pragmas`` maps PRAGMA names to values run on every new connection.
+``transaction_mode`` sets how atomic blocks BEGIN their transaction:
+with IMMEDIATE a transaction takes the write lock up front and waits
+for it within the busy timeout, instead of failing with "database is
+locked" when it later tries to upgrade a read lock that another writer
+holds.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop("pragmas", {})
+        self.transaction_mode = params.pop(
+            "transaction_mode", "DEFERRED"
+        ).upper()
+
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                "The SQLite transaction_mode option must be one of "
+                f"{', '.join(TRANSACTION_MODES)}."
+            )
+
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+
+        for name, value in self.pragmas.items():
+            connection.execute(f"PRAGMA {name} = {value}")
+
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f"BEGIN {self.transaction_mode}")
@@ -0,0 +1,16 @@
+"""Settings for the test suite, selected by manage.py test.
+
+Adds a replica database that, unlike the ones DATABASE_REPLICAS
+configures, is not a test mirror of the primary. The read replica tests
+put different rows in each, so a response shows which one served it.
+"""
+from library_service.settings import *  # noqa: F401,F403
+from library_service.settings import BASE_DIR, DATABASES
+
+DATABASES = {
+    **DATABASES,
+    "replica": {
+        **DATABASES["default"],
+        "NAME": BASE_DIR / "db-replica.sqlite3",
+    },
+}
@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver
+
+
+class QueryBudgetMixin:
+    """TestCase mixin asserting that code stays within a query budget.
+
+    Unlike assertNumQueries the budget is a ceiling, so an endpoint
+    getting cheaper does not break its test.
+    """
+
+    @contextmanager
+    def assertMaxQueries(self, budget, using=DEFAULT_DB_ALIAS):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = "\n".join(
+                f"{index}. {query['sql']}"
+                for index, query in enumerate(
+                    context.captured_queries, start=1
+                )
+            )
+            self.fail(
+                f"{executed} queries executed, the budget is {budget}\n"
+                f"Captured queries were:\n{queries}"
+            )
+
+    def assertBudgetsCoverNamespace(self, namespace, url_names):
+        """Fail when a URL name of the namespace has no declared budget"""
+        _, resolver = get_resolver().namespace_dict[namespace]
+        names = {
+            name
+            for name in resolver.reverse_dict
+            if isinstance(name, str) and name != "api-root"
+        }
+
+        self.assertEqual(
+            names - set(url_names),
+            set(),
+            f"Declare query budgets for every {namespace} endpoint",
+        )
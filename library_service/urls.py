@@ -20,6 +20,28 @@ urlpatterns = [
         "borrowings/",
         include("borrowings_service.urls", namespace="borrowings_service")
     ),
+    path(
+        "stats/",
+        include("stats_service.urls", namespace="stats_service")
+    ),
+    path(
+        "async/users/",
+        include(
+            "customers_service.async_urls",
+            namespace="customers_service_async",
+        )
+    ),
+    path(
+        "async/books/",
+        include("books_service.async_urls", namespace="books_service_async")
+    ),
+    path(
+        "async/borrowings/",
+        include(
+            "borrowings_service.async_urls",
+            namespace="borrowings_service_async",
+        )
+    ),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/schema/swagger-ui/",
@@ -0,0 +1,6 @@
+from django.contrib import admin
+
+from stats_service.models import BookCirculationStats, UserMonthlyLoans
+
+admin.site.register(BookCirculationStats)
+admin.site.register(UserMonthlyLoans)
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from borrowings_service.models import ArchivedBorrowing, Borrowing
+from stats_service.models import BookCirculationStats, UserMonthlyLoans
+from stats_service.rebuild import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the circulation statistics from all borrowings, "
+        "archived ones included"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            books, user_months = rebuild_stats(
+                [Borrowing, ArchivedBorrowing],
+                BookCirculationStats,
+                UserMonthlyLoans,
+                options["batch_size"],
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt statistics for {books} books and "
+                f"{user_months} user months"
+            )
+        )
@@ -0,0 +1,89 @@
+# Generated by Django 4.1.5 on 2026-10-18 19:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("books_service", "0003_book_title_author_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookCirculationStats",
+            fields=[
+                (
+                    "book",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="circulation_stats",
+                        serialize=False,
+                        to="books_service.book",
+                    ),
+                ),
+                ("total_loans", models.PositiveIntegerField(default=0)),
+                ("active_loans", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name_plural": "book circulation stats",
+            },
+        ),
+        migrations.CreateModel(
+            name="UserMonthlyLoans",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField()),
+                ("loans", models.PositiveIntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_loans",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "user monthly loans",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="bookcirculationstats",
+            index=models.Index(
+                fields=["-total_loans"], name="stats_book_total_loans_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bookcirculationstats",
+            index=models.Index(
+                fields=["-active_loans"], name="stats_book_active_loans_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="usermonthlyloans",
+            index=models.Index(
+                fields=["month", "-loans"], name="stats_month_loans_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="usermonthlyloans",
+            constraint=models.UniqueConstraint(
+                fields=("user", "month"), name="stats_user_month_unique"
+            ),
+        ),
+    ]
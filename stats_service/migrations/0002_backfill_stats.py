@@ -0,0 +1,28 @@
+from django.db import migrations
+
+from stats_service.rebuild import rebuild_stats
+
+
+def backfill_stats(apps, schema_editor):
+    rebuild_stats(
+        [
+            apps.get_model("borrowings_service", "Borrowing"),
+            apps.get_model("borrowings_service", "ArchivedBorrowing"),
+        ],
+        apps.get_model("stats_service", "BookCirculationStats"),
+        apps.get_model("stats_service", "UserMonthlyLoans"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stats_service", "0001_initial"),
+        ("borrowings_service", "0008_archivedborrowing"),
+    ]
+
+    operations = [
+        # Loans opened before the statistics existed would otherwise be
+        # missing from them, and their returns would close loans of others
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.5 on 2026-10-18 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stats_service", "0002_backfill_stats"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="bookcirculationstats",
+            name="stats_book_total_loans_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="bookcirculationstats",
+            name="stats_book_active_loans_idx",
+        ),
+        migrations.AddIndex(
+            model_name="bookcirculationstats",
+            index=models.Index(
+                fields=["-total_loans", "book"], name="stats_book_total_loans_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bookcirculationstats",
+            index=models.Index(
+                fields=["-active_loans", "book"], name="stats_book_active_loans_idx"
+            ),
+        ),
+    ]
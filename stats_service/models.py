@@ -0,0 +1,127 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest
+
+from books_service.models import Book
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def _amount_per_key(amounts, lookup):
+    return Case(
+        *[
+            When(lookup(key), then=Value(amount))
+            for key, amount in amounts.items()
+        ],
+        default=Value(0),
+        output_field=models.IntegerField(),
+    )
+
+
+class BookCirculationStatsQuerySet(models.QuerySet):
+    def record_checkouts(self, amounts):
+        """Add amounts[book_id] new loans to the books in two queries"""
+        self.bulk_create(
+            [BookCirculationStats(book_id=book_id) for book_id in amounts],
+            ignore_conflicts=True,
+        )
+        loans = _amount_per_key(amounts, lambda book_id: Q(pk=book_id))
+
+        return self.filter(pk__in=amounts).update(
+            total_loans=F("total_loans") + loans,
+            active_loans=F("active_loans") + loans,
+        )
+
+    def record_returns(self, amounts):
+        """Close amounts[book_id] active loans of the books in one query.
+
+        Never goes below zero, so a return of a loan the statistics
+        missed cannot fail on the positive active_loans check.
+        """
+        loans = _amount_per_key(amounts, lambda book_id: Q(pk=book_id))
+
+        return self.filter(pk__in=amounts).update(
+            active_loans=Greatest(F("active_loans") - loans, Value(0))
+        )
+
+
+class UserMonthlyLoansQuerySet(models.QuerySet):
+    def record_checkouts(self, amounts):
+        """Add amounts[(user_id, month)] new loans in two queries"""
+        self.bulk_create(
+            [
+                UserMonthlyLoans(user_id=user_id, month=month)
+                for user_id, month in amounts
+            ],
+            ignore_conflicts=True,
+        )
+        keys = Q()
+        for user_id, month in amounts:
+            keys |= Q(user_id=user_id, month=month)
+
+        return self.filter(keys).update(
+            loans=F("loans") + _amount_per_key(
+                amounts, lambda key: Q(user_id=key[0], month=key[1])
+            )
+        )
+
+
+class BookCirculationStats(models.Model):
+    book = models.OneToOneField(
+        Book,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="circulation_stats",
+    )
+    total_loans = models.PositiveIntegerField(default=0)
+    active_loans = models.PositiveIntegerField(default=0)
+
+    objects = BookCirculationStatsQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = "book circulation stats"
+        # The book ends the keys so that pages of equal counts seek by it
+        indexes = [
+            models.Index(
+                fields=["-total_loans", "book"],
+                name="stats_book_total_loans_idx",
+            ),
+            models.Index(
+                fields=["-active_loans", "book"],
+                name="stats_book_active_loans_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.book}: {self.total_loans} loans"
+
+
+class UserMonthlyLoans(models.Model):
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name="monthly_loans",
+    )
+    month = models.DateField()
+    loans = models.PositiveIntegerField(default=0)
+
+    objects = UserMonthlyLoansQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = "user monthly loans"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "month"], name="stats_user_month_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["month", "-loans"], name="stats_month_loans_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.month:%Y-%m}: {self.loans} loans"
@@ -0,0 +1,34 @@
+"""Keep the circulation statistics in step with borrowings.
+
+Call these inside the transaction that creates or returns the
+borrowings, so the counters commit or roll back together with them.
+"""
+from collections import Counter
+
+from stats_service.models import (
+    BookCirculationStats,
+    UserMonthlyLoans,
+    month_start,
+)
+
+
+def record_checkouts(borrowings):
+    books = Counter()
+    user_months = Counter()
+
+    for borrowing in borrowings:
+        books[borrowing.book_id] += 1
+        user_months[
+            (borrowing.user_id, month_start(borrowing.borrow_date))
+        ] += 1
+
+    if books:
+        BookCirculationStats.objects.record_checkouts(books)
+        UserMonthlyLoans.objects.record_checkouts(user_months)
+
+
+def record_returns(book_ids):
+    books = Counter(book_ids)
+
+    if books:
+        BookCirculationStats.objects.record_returns(books)
@@ -0,0 +1,30 @@
+from rest_framework import serializers
+
+from stats_service.models import BookCirculationStats, UserMonthlyLoans
+
+MONTH_FORMAT = "%Y-%m"
+
+
+class BookCirculationStatsSerializer(serializers.ModelSerializer):
+    title = serializers.CharField(source="book.title", read_only=True)
+    author = serializers.CharField(source="book.author", read_only=True)
+
+    class Meta:
+        model = BookCirculationStats
+        fields = ("book", "title", "author", "total_loans", "active_loans")
+
+
+class UserMonthlyLoansSerializer(serializers.ModelSerializer):
+    user_email = serializers.EmailField(source="user.email", read_only=True)
+    month = serializers.DateField(format=MONTH_FORMAT, read_only=True)
+
+    class Meta:
+        model = UserMonthlyLoans
+        fields = ("user", "user_email", "month", "loans")
+
+
+class UserMonthlyLoansFilterSerializer(serializers.Serializer):
+    user_id = serializers.IntegerField(required=False)
+    month = serializers.DateField(
+        required=False, input_formats=[MONTH_FORMAT]
+    )
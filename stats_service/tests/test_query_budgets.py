@@ -0,0 +1,69 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books_service.models import Book
+from library_service.testing import QueryBudgetMixin
+from stats_service.models import BookCirculationStats, UserMonthlyLoans
+
+# Maximum queries per (URL name, method), whatever the number of rows
+QUERY_BUDGETS = {
+    ("bookcirculationstats-list", "get"): 1,
+    ("bookcirculationstats-detail", "get"): 1,
+    ("usermonthlyloans-list", "get"): 1,
+    ("usermonthlyloans-detail", "get"): 1,
+}
+ROWS = 10
+
+
+class StatsQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_superuser(
+                email="admin@mail.com", password="1qazcde3"
+            )
+        )
+        for index in range(ROWS):
+            book = Book.objects.create(
+                title=f"Book {index}",
+                author="Author",
+                cover="Hard",
+                inventory=5,
+                daily_fee="1.00",
+            )
+            user = get_user_model().objects.create_user(
+                email=f"user{index}@mail.com", password="1qazcde3"
+            )
+            BookCirculationStats.objects.create(book=book, total_loans=index)
+            self.monthly = UserMonthlyLoans.objects.create(
+                user=user, month=date(2023, 1, 1), loans=index
+            )
+        self.book = book
+
+    def request(self, name, args=()):
+        url = reverse(f"stats_service:{name}", args=args)
+
+        with self.assertMaxQueries(QUERY_BUDGETS[(name, "get")]):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+
+        return response
+
+    def test_every_endpoint_declares_a_budget(self):
+        self.assertBudgetsCoverNamespace(
+            "stats_service", {name for name, _ in QUERY_BUDGETS}
+        )
+
+    def test_read_endpoints(self):
+        books = self.request("bookcirculationstats-list")
+        users = self.request("usermonthlyloans-list")
+        self.request("bookcirculationstats-detail", [self.book.id])
+        self.request("usermonthlyloans-detail", [self.monthly.id])
+
+        self.assertEqual(len(books.data["results"]), ROWS)
+        self.assertEqual(len(users.data["results"]), ROWS)
@@ -0,0 +1,373 @@
+from datetime import date
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books_service.models import Book
+from borrowings_service.models import Borrowing
+from stats_service.models import BookCirculationStats, UserMonthlyLoans
+
+BOOK_STATS_URL = reverse("stats_service:bookcirculationstats-list")
+USER_STATS_URL = reverse("stats_service:usermonthlyloans-list")
+BORROWINGS_URL = reverse("borrowings_service:borrowing-list")
+BORROWINGS_BULK_URL = reverse("borrowings_service:borrowing-bulk-checkout")
+BORROWINGS_BULK_RETURN_URL = reverse(
+    "borrowings_service:borrowing-bulk-return"
+)
+backfill_migration = import_module(
+    "stats_service.migrations.0002_backfill_stats"
+)
+
+
+def sample_book(**params):
+    defaults = {
+        "title": "sample",
+        "author": "sample",
+        "cover": "Hard",
+        "inventory": 5,
+        "daily_fee": 2.00,
+    }
+    defaults.update(params)
+
+    return Book.objects.create(**defaults)
+
+
+def return_url(borrowing_id):
+    return reverse(
+        "borrowings_service:borrowing-return-book", args=[borrowing_id]
+    )
+
+
+class CirculationStatsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@mail.com",
+            password="1qazcde3",
+        )
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@mail.com",
+            password="1qazcde3",
+        )
+        self.kobzar = sample_book(title="Kobzar")
+        self.eneida = sample_book(title="Eneida")
+
+    def checkout(self, book, borrow_date="2023-01-03"):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            BORROWINGS_URL,
+            {
+                "book": book.id,
+                "borrow_date": borrow_date,
+                "expected_return_date": "2023-03-31",
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        return response.data["id"]
+
+    def book_stats(self, book):
+        stats = BookCirculationStats.objects.get(book=book)
+
+        return stats.total_loans, stats.active_loans
+
+    def test_checkout_and_return_update_stats(self):
+        borrowing_id = self.checkout(self.kobzar)
+        self.checkout(self.kobzar, borrow_date="2023-02-10")
+
+        self.assertEqual(self.book_stats(self.kobzar), (2, 2))
+
+        self.client.post(
+            return_url(borrowing_id), {"actual_return_date": "2023-03-01"}
+        )
+
+        self.assertEqual(self.book_stats(self.kobzar), (2, 1))
+        self.assertEqual(
+            list(
+                UserMonthlyLoans.objects.filter(user=self.user)
+                .order_by("month")
+                .values_list("month", "loans")
+            ),
+            [(date(2023, 1, 1), 1), (date(2023, 2, 1), 1)],
+        )
+
+    def test_bulk_checkout_and_return_update_stats(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            BORROWINGS_BULK_URL,
+            {
+                "books": [self.kobzar.id, self.kobzar.id, self.eneida.id],
+                "borrow_date": "2023-01-03",
+                "expected_return_date": "2023-01-08",
+            },
+            format="json",
+        )
+        self.client.post(
+            BORROWINGS_BULK_RETURN_URL,
+            {
+                "borrowings": [response.data[0]["id"], response.data[2]["id"]],
+                "actual_return_date": "2023-01-05",
+            },
+            format="json",
+        )
+
+        self.assertEqual(self.book_stats(self.kobzar), (2, 1))
+        self.assertEqual(self.book_stats(self.eneida), (1, 0))
+        self.assertEqual(
+            UserMonthlyLoans.objects.get(user=self.user).loans, 3
+        )
+
+    def test_failed_checkout_leaves_stats_untouched(self):
+        sold_out = sample_book(title="Sold out", inventory=0)
+        self.client.force_authenticate(self.user)
+
+        self.client.post(
+            BORROWINGS_URL,
+            {
+                "book": sold_out.id,
+                "borrow_date": "2023-01-03",
+                "expected_return_date": "2023-01-08",
+            },
+        )
+
+        self.assertFalse(BookCirculationStats.objects.exists())
+        self.assertFalse(UserMonthlyLoans.objects.exists())
+
+    def test_rebuild_matches_incremental_stats(self):
+        borrowing_id = self.checkout(self.kobzar)
+        self.checkout(self.eneida, borrow_date="2023-02-10")
+        self.client.post(
+            return_url(borrowing_id), {"actual_return_date": "2023-03-01"}
+        )
+        incremental = (
+            list(BookCirculationStats.objects.order_by("book").values()),
+            list(
+                UserMonthlyLoans.objects.order_by("month")
+                .values("user", "month", "loans")
+            ),
+        )
+        BookCirculationStats.objects.update(total_loans=99)
+
+        out = StringIO()
+        call_command("rebuild_stats", stdout=out)
+
+        self.assertEqual(
+            (
+                list(BookCirculationStats.objects.order_by("book").values()),
+                list(
+                    UserMonthlyLoans.objects.order_by("month")
+                    .values("user", "month", "loans")
+                ),
+            ),
+            incremental,
+        )
+        self.assertIn("2 books and 2 user months", out.getvalue())
+
+    def legacy_borrowing(self, book):
+        """A loan opened before the statistics existed"""
+        return Borrowing.objects.create(
+            borrow_date="2023-01-02",
+            expected_return_date="2023-03-31",
+            book=book,
+            user=self.user,
+        )
+
+    def test_return_of_unrecorded_loan_keeps_stats_positive(self):
+        legacy = self.legacy_borrowing(self.kobzar)
+        self.checkout(self.kobzar)
+
+        response = self.client.post(
+            return_url(legacy.id), {"actual_return_date": "2023-03-01"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.book_stats(self.kobzar), (1, 0))
+
+    def test_migration_backfills_existing_loans(self):
+        self.legacy_borrowing(self.kobzar)
+        self.legacy_borrowing(self.eneida)
+
+        backfill_migration.backfill_stats(apps, None)
+
+        self.assertEqual(self.book_stats(self.kobzar), (1, 1))
+        self.assertEqual(self.book_stats(self.eneida), (1, 1))
+        self.assertEqual(
+            UserMonthlyLoans.objects.get(user=self.user).loans, 2
+        )
+
+    def test_stats_require_staff(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(BOOK_STATS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_top_borrowed_books(self):
+        self.checkout(self.eneida)
+        self.checkout(self.eneida)
+        self.checkout(self.kobzar)
+        self.client.force_authenticate(self.admin)
+
+        top = self.client.get(BOOK_STATS_URL)
+        by_active = self.client.get(
+            BOOK_STATS_URL, {"ordering": "-active_loans", "page_size": 1}
+        )
+
+        self.assertEqual(
+            [
+                (row["title"], row["total_loans"], row["active_loans"])
+                for row in top.data["results"]
+            ],
+            [("Eneida", 2, 2), ("Kobzar", 1, 1)],
+        )
+        self.assertEqual(by_active.data["results"][0]["title"], "Eneida")
+        self.assertIsNotNone(by_active.data["next"])
+
+    def test_book_stats_served_in_constant_queries(self):
+        for book in (self.kobzar, self.eneida):
+            self.checkout(book)
+        self.client.force_authenticate(self.admin)
+
+        with self.assertNumQueries(1):
+            self.client.get(BOOK_STATS_URL)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse(
+                    "stats_service:bookcirculationstats-detail",
+                    args=[self.kobzar.id],
+                )
+            )
+
+        self.assertEqual(response.data["total_loans"], 1)
+
+    def test_loans_per_user_per_month(self):
+        self.checkout(self.kobzar)
+        self.checkout(self.eneida)
+        self.checkout(self.kobzar, borrow_date="2023-02-10")
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.get(USER_STATS_URL, {"user_id": self.user.id})
+        january = self.client.get(USER_STATS_URL, {"month": "2023-01"})
+        invalid = self.client.get(USER_STATS_URL, {"month": "January"})
+
+        self.assertEqual(
+            [(row["month"], row["loans"]) for row in response.data["results"]],
+            [("2023-02", 1), ("2023-01", 2)],
+        )
+        self.assertEqual(
+            [row["user_email"] for row in january.data["results"]],
+            ["user@mail.com"],
+        )
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookStatsPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_superuser(
+                email="admin@mail.com", password="1qazcde3"
+            )
+        )
+        books = [sample_book(title=f"Book {index}") for index in range(7)]
+        BookCirculationStats.objects.bulk_create(
+            BookCirculationStats(
+                book=book, total_loans=loans, active_loans=index % 2
+            )
+            for index, (book, loans) in enumerate(
+                zip(books, [3, 5, 3, 3, 1, 5, 3])
+            )
+        )
+
+    def walk(self, params, link="next"):
+        response = self.client.get(BOOK_STATS_URL, params)
+        pages = [response.data["results"]]
+        while response.data[link]:
+            response = self.client.get(response.data[link])
+            pages.append(response.data["results"])
+
+        return pages, response
+
+    @staticmethod
+    def keys(pages):
+        return [
+            (row["total_loans"], row["book"])
+            for page in pages
+            for row in page
+        ]
+
+    def test_pages_follow_loans_then_book(self):
+        pages, _ = self.walk({"page_size": 2})
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        keys = self.keys(pages)
+        self.assertEqual(
+            keys, sorted(keys, key=lambda key: (-key[0], key[1]))
+        )
+
+    def test_previous_pages_mirror_next_pages(self):
+        forward, last = self.walk({"page_size": 3})
+
+        response = self.client.get(last.data["previous"])
+        backward = [response.data["results"]]
+        while response.data["previous"]:
+            response = self.client.get(response.data["previous"])
+            backward.append(response.data["results"])
+
+        self.assertEqual(backward, forward[-2::-1])
+
+    def test_ascending_ordering(self):
+        pages, _ = self.walk({"page_size": 2, "ordering": "total_loans"})
+
+        keys = self.keys(pages)
+        self.assertEqual(len(keys), 7)
+        self.assertEqual(
+            keys, sorted(keys, key=lambda key: (key[0], -key[1]))
+        )
+
+    def test_rows_changing_counts_do_not_shift_pages(self):
+        first = self.client.get(BOOK_STATS_URL, {"page_size": 2})
+        seen = {row["book"] for row in first.data["results"]}
+        BookCirculationStats.objects.exclude(book__in=seen).update(
+            total_loans=0
+        )
+        BookCirculationStats.objects.create(
+            book=sample_book(title="New"), total_loans=10
+        )
+
+        second = self.client.get(first.data["next"])
+
+        self.assertFalse(seen & {row["book"] for row in second.data["results"]})
+
+    def test_pages_seek_by_index_without_offset(self):
+        first = self.client.get(BOOK_STATS_URL, {"page_size": 2})
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(first.data["next"])
+
+        sql = context.captured_queries[0]["sql"]
+        self.assertNotIn("OFFSET", sql)
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertTrue(
+            any("stats_book_total_loans_idx" in detail for detail in plan),
+            plan,
+        )
+        self.assertFalse(any("TEMP B-TREE" in detail for detail in plan))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(BOOK_STATS_URL, {"cursor": "garbage"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,14 @@
+from rest_framework import routers
+
+from stats_service.views import (
+    BookCirculationStatsViewSet,
+    UserMonthlyLoansViewSet,
+)
+
+app_name = "stats_service"
+
+router = routers.DefaultRouter()
+router.register("books", BookCirculationStatsViewSet)
+router.register("users", UserMonthlyLoansViewSet)
+
+urlpatterns = router.urls
@@ -0,0 +1,75 @@
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from rest_framework import viewsets
+from rest_framework.filters import OrderingFilter
+from rest_framework.permissions import IsAdminUser
+
+from library_service.pagination import KeysetCursorPagination
+from stats_service.models import BookCirculationStats, UserMonthlyLoans
+from stats_service.serializers import (
+    BookCirculationStatsSerializer,
+    UserMonthlyLoansFilterSerializer,
+    UserMonthlyLoansSerializer,
+)
+
+
+class BookCirculationStatsViewSet(viewsets.ReadOnlyModelViewSet):
+    """Loans per book, most borrowed first"""
+
+    queryset = BookCirculationStats.objects.select_related("book")
+    serializer_class = BookCirculationStatsSerializer
+    permission_classes = [IsAdminUser]
+    filter_backends = [OrderingFilter]
+    ordering_fields = ["total_loans", "active_loans"]
+    ordering = "-total_loans"
+    pagination_class = KeysetCursorPagination
+
+
+class UserMonthlyLoansViewSet(viewsets.ReadOnlyModelViewSet):
+    """Loans per user per month, latest month first"""
+
+    queryset = UserMonthlyLoans.objects.select_related("user")
+    serializer_class = UserMonthlyLoansSerializer
+    permission_classes = [IsAdminUser]
+    filter_backends = [OrderingFilter]
+    ordering_fields = ["month", "loans"]
+    ordering = "-month"
+    pagination_class = KeysetCursorPagination
+
+    def get_queryset(self):
+        queryset = self.queryset
+
+        if self.action != "list":
+            return queryset
+
+        filters = UserMonthlyLoansFilterSerializer(
+            data=self.request.query_params
+        )
+        filters.is_valid(raise_exception=True)
+        user_id = filters.validated_data.get("user_id")
+        month = filters.validated_data.get("month")
+
+        if user_id is not None:
+            queryset = queryset.filter(user_id=user_id)
+
+        if month is not None:
+            queryset = queryset.filter(month=month)
+
+        return queryset
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "user_id",
+                type=OpenApiTypes.INT,
+                description="Filter by user id (ex. ?user_id=1)",
+            ),
+            OpenApiParameter(
+                "month",
+                type=OpenApiTypes.STR,
+                description="Filter by month (ex. ?month=2023-01)",
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)